@@ -0,0 +1,23 @@
+"""
+Admin configuration for audit app
+"""
+
+from django.contrib import admin
+from .models import AuditLogEntry
+
+
+@admin.register(AuditLogEntry)
+class AuditLogEntryAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'action', 'model', 'object_id', 'actor_repr', 'source']
+    list_filter = ['action', 'model', 'source']
+    search_fields = ['object_id', 'actor_repr', 'request_path']
+    date_hierarchy = 'created_at'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
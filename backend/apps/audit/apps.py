@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class AuditConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.audit'
+    verbose_name = 'Audit'
+    
+    def ready(self):
+        from . import signals
+        signals.connect_audited_models()
@@ -0,0 +1,43 @@
+"""
+Create upcoming monthly audit partitions and drop the expired ones
+
+Meant to be scheduled monthly (or daily, it is idempotent):
+
+    python manage.py audit_partitions --ahead 3 --retention-months 24
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.audit.partitions import ensure_partitions, drop_partitions_older_than
+
+
+class Command(BaseCommand):
+    help = "Crea le partizioni mensili future del registro di audit ed elimina quelle scadute"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=3,
+            help="Mesi futuri per cui creare le partizioni",
+        )
+        parser.add_argument(
+            '--retention-months',
+            type=int,
+            default=settings.AUDIT_RETENTION_MONTHS,
+            help="Mesi di audit da conservare (default: AUDIT_RETENTION_MONTHS)",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Il partizionamento del registro di audit richiede PostgreSQL")
+
+        for name in ensure_partitions(options['ahead']):
+            self.stdout.write(f"Creata partizione {name}")
+
+        for name in drop_partitions_older_than(options['retention_months']):
+            self.stdout.write(f"Eliminata partizione {name}")
+
+        self.stdout.write(self.style.SUCCESS("Partizioni di audit aggiornate"))
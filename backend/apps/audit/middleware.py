@@ -0,0 +1,29 @@
+"""
+Middleware for audit app
+"""
+
+from apps.core.middleware import HybridMiddleware
+from .recorder import set_current_request, reset_current_request
+
+
+class AuditContextMiddleware(HybridMiddleware):
+    """
+    Makes the current request (and so its authenticated user) available to
+    the audit recorder for the duration of the request
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = set_current_request(request)
+        try:
+            return self.get_response(request)
+        finally:
+            reset_current_request(token)
+
+    async def __acall__(self, request):
+        token = set_current_request(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            reset_current_request(token)
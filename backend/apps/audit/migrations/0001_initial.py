@@ -0,0 +1,173 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:44
+
+from datetime import date
+
+from django.db import migrations, models
+
+
+def create_audit_table(apps, schema_editor):
+    """
+    Create the audit table, range-partitioned by month on PostgreSQL
+
+    The primary key must include the partition key, hence (id, created_at).
+    A DEFAULT partition catches rows outside the pre-created months; the
+    `audit_partitions` command keeps future months created ahead of time.
+    """
+    AuditLogEntry = apps.get_model("audit", "AuditLogEntry")
+
+    if schema_editor.connection.vendor != "postgresql":
+        schema_editor.create_model(AuditLogEntry)
+        return
+
+    schema_editor.execute(
+        """
+        CREATE TABLE audit_auditlogentry (
+            id bigserial NOT NULL,
+            created_at timestamp with time zone NOT NULL,
+            model varchar(100) NOT NULL,
+            object_id varchar(64) NOT NULL,
+            action varchar(20) NOT NULL,
+            changes jsonb NOT NULL,
+            actor_id bigint NULL,
+            actor_repr varchar(150) NOT NULL,
+            source varchar(20) NOT NULL,
+            request_path varchar(255) NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    schema_editor.execute(
+        "CREATE INDEX audit_object_idx ON audit_auditlogentry (model, object_id, created_at)"
+    )
+    schema_editor.execute(
+        "CREATE INDEX audit_actor_idx ON audit_auditlogentry (actor_id, created_at)"
+    )
+
+    today = date.today()
+    year, month = today.year, today.month
+    for _ in range(3):
+        next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+        schema_editor.execute(
+            f"CREATE TABLE audit_auditlogentry_{year:04d}_{month:02d} "
+            f"PARTITION OF audit_auditlogentry "
+            f"FOR VALUES FROM ('{year:04d}-{month:02d}-01') TO ('{next_year:04d}-{next_month:02d}-01')"
+        )
+        year, month = next_year, next_month
+    schema_editor.execute(
+        "CREATE TABLE audit_auditlogentry_default PARTITION OF audit_auditlogentry DEFAULT"
+    )
+
+
+def drop_audit_table(apps, schema_editor):
+    AuditLogEntry = apps.get_model("audit", "AuditLogEntry")
+    schema_editor.delete_model(AuditLogEntry)
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="AuditLogEntry",
+                    fields=[
+                        (
+                            "id",
+                            models.BigAutoField(
+                                auto_created=True,
+                                primary_key=True,
+                                serialize=False,
+                                verbose_name="ID",
+                            ),
+                        ),
+                        ("created_at", models.DateTimeField(verbose_name="Data")),
+                        (
+                            "model",
+                            models.CharField(max_length=100, verbose_name="Modello"),
+                        ),
+                        (
+                            "object_id",
+                            models.CharField(max_length=64, verbose_name="ID Oggetto"),
+                        ),
+                        (
+                            "action",
+                            models.CharField(
+                                choices=[
+                                    ("create", "Creazione"),
+                                    ("update", "Modifica"),
+                                    ("bulk_update", "Modifica Bulk"),
+                                    ("delete", "Eliminazione"),
+                                    ("m2m_add", "Relazioni Aggiunte"),
+                                    ("m2m_remove", "Relazioni Rimosse"),
+                                    ("m2m_clear", "Relazioni Azzerate"),
+                                ],
+                                max_length=20,
+                                verbose_name="Azione",
+                            ),
+                        ),
+                        (
+                            "changes",
+                            models.JSONField(
+                                default=dict,
+                                help_text="{campo: [valore precedente, nuovo valore]}",
+                                verbose_name="Modifiche",
+                            ),
+                        ),
+                        (
+                            "actor_id",
+                            models.BigIntegerField(
+                                blank=True, null=True, verbose_name="ID Autore"
+                            ),
+                        ),
+                        (
+                            "actor_repr",
+                            models.CharField(
+                                blank=True, max_length=150, verbose_name="Autore"
+                            ),
+                        ),
+                        (
+                            "source",
+                            models.CharField(
+                                choices=[
+                                    ("api", "API"),
+                                    ("admin", "Admin"),
+                                    ("system", "Sistema"),
+                                ],
+                                default="system",
+                                max_length=20,
+                                verbose_name="Origine",
+                            ),
+                        ),
+                        (
+                            "request_path",
+                            models.CharField(
+                                blank=True,
+                                max_length=255,
+                                verbose_name="Percorso Richiesta",
+                            ),
+                        ),
+                    ],
+                    options={
+                        "verbose_name": "Voce di Audit",
+                        "verbose_name_plural": "Registro di Audit",
+                        "ordering": ["-created_at"],
+                        "indexes": [
+                            models.Index(
+                                fields=["model", "object_id", "created_at"],
+                                name="audit_object_idx",
+                            ),
+                            models.Index(
+                                fields=["actor_id", "created_at"],
+                                name="audit_actor_idx",
+                            ),
+                        ],
+                    },
+                ),
+            ],
+            database_operations=[],
+        ),
+        migrations.RunPython(create_audit_table, drop_audit_table),
+    ]
@@ -0,0 +1,65 @@
+"""
+Audit app models
+"""
+
+from django.db import models
+
+
+class AuditLogEntry(models.Model):
+    """
+    Append-only record of a change on an audited model
+
+    On PostgreSQL the table is range-partitioned by month on ``created_at``
+    (see the 0001 migration and the ``audit_partitions`` command), so retention
+    is a matter of dropping old partitions.
+    """
+    ACTION_CHOICES = [
+        ('create', 'Creazione'),
+        ('update', 'Modifica'),
+        ('bulk_update', 'Modifica Bulk'),
+        ('delete', 'Eliminazione'),
+        ('m2m_add', 'Relazioni Aggiunte'),
+        ('m2m_remove', 'Relazioni Rimosse'),
+        ('m2m_clear', 'Relazioni Azzerate'),
+    ]
+    
+    SOURCE_CHOICES = [
+        ('api', 'API'),
+        ('admin', 'Admin'),
+        ('system', 'Sistema'),
+    ]
+    
+    created_at = models.DateTimeField(verbose_name="Data")
+    model = models.CharField(max_length=100, verbose_name="Modello")
+    object_id = models.CharField(max_length=64, verbose_name="ID Oggetto")
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES, verbose_name="Azione")
+    changes = models.JSONField(
+        default=dict,
+        verbose_name="Modifiche",
+        help_text="{campo: [valore precedente, nuovo valore]}"
+    )
+    # Plain ids instead of foreign keys: the log must outlive purged users
+    actor_id = models.BigIntegerField(null=True, blank=True, verbose_name="ID Autore")
+    actor_repr = models.CharField(max_length=150, blank=True, verbose_name="Autore")
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='system', verbose_name="Origine")
+    request_path = models.CharField(max_length=255, blank=True, verbose_name="Percorso Richiesta")
+    
+    class Meta:
+        verbose_name = "Voce di Audit"
+        verbose_name_plural = "Registro di Audit"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['model', 'object_id', 'created_at'], name='audit_object_idx'),
+            models.Index(fields=['actor_id', 'created_at'], name='audit_actor_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_action_display()} {self.model}#{self.object_id}"
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Le voci di audit non possono essere modificate")
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise ValueError("Le voci di audit non possono essere eliminate")
@@ -0,0 +1,110 @@
+"""
+Monthly partition management for the audit table (PostgreSQL only)
+"""
+
+from datetime import date
+
+from django.db import connection, transaction
+
+from .models import AuditLogEntry
+
+TABLE = AuditLogEntry._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+
+def _add_months(year, month, months):
+    index = year * 12 + (month - 1) + months
+    return index // 12, index % 12 + 1
+
+
+def partition_name(year, month):
+    return f"{TABLE}_{year:04d}_{month:02d}"
+
+
+def list_partitions():
+    """Return the names of the existing monthly partitions, oldest first"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+            JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+            WHERE parent.relname = %s
+            """,
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    return sorted(name for name in names if name != DEFAULT_PARTITION)
+
+
+def create_partition(cursor, year, month):
+    """
+    Create the partition of ``year``/``month``
+
+    Rows of that month already in the DEFAULT partition (written before the
+    partition existed) would make CREATE TABLE ... PARTITION OF fail: the
+    DEFAULT partition is then detached, the partition created, the rows moved
+    and DEFAULT attached again, in one transaction. Writes to the audit table
+    wait for it.
+    """
+    name = partition_name(year, month)
+    next_year, next_month = _add_months(year, month, 1)
+    start, end = f"{year:04d}-{month:02d}-01", f"{next_year:04d}-{next_month:02d}-01"
+    create = f"CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES FROM ('{start}') TO ('{end}')"
+    in_range = f"FROM {DEFAULT_PARTITION} WHERE created_at >= %s AND created_at < %s"
+
+    with transaction.atomic():
+        cursor.execute(f"SELECT EXISTS (SELECT 1 {in_range})", [start, end])
+        if not cursor.fetchone()[0]:
+            cursor.execute(create)
+            return name
+
+        cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}")
+        cursor.execute(create)
+        cursor.execute(f"INSERT INTO {name} SELECT * {in_range}", [start, end])
+        cursor.execute(f"DELETE {in_range}", [start, end])
+        cursor.execute(f"ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT")
+    return name
+
+
+def ensure_partitions(months_ahead=3, today=None):
+    """
+    Create the partitions for the current month and the next ``months_ahead``
+
+    Returns:
+        list: Names of the partitions created
+    """
+    today = today or date.today()
+    existing = set(list_partitions())
+    created = []
+
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            year, month = _add_months(today.year, today.month, offset)
+            if partition_name(year, month) in existing:
+                continue
+            created.append(create_partition(cursor, year, month))
+
+    return created
+
+
+def drop_partitions_older_than(months, today=None):
+    """
+    Drop the monthly partitions entirely older than ``months`` months
+
+    Returns:
+        list: Names of the partitions dropped
+    """
+    today = today or date.today()
+    year, month = _add_months(today.year, today.month, -months)
+    oldest_kept = partition_name(year, month)
+    dropped = []
+
+    with connection.cursor() as cursor:
+        for name in list_partitions():
+            if name < oldest_kept:
+                cursor.execute(f"DROP TABLE {name}")
+                dropped.append(name)
+
+    return dropped
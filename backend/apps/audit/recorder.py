@@ -0,0 +1,177 @@
+"""
+Audit recording: request context and buffered asynchronous writer
+
+Entries are collected in memory once the surrounding transaction commits and
+written by a background thread with multi-row inserts, so audited writes do
+not pay for an extra INSERT each.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_current_request = ContextVar('audit_current_request', default=None)
+
+
+def set_current_request(request):
+    """Bind the request whose user is recorded as author of the changes"""
+    return _current_request.set(request)
+
+
+def reset_current_request(token):
+    _current_request.reset(token)
+
+
+def _get_context():
+    """Return actor id, actor repr, source and path for the current change"""
+    request = _current_request.get()
+    if request is None:
+        return None, '', 'system', ''
+
+    path = request.path[:255]
+    source = 'admin' if path.startswith('/admin/') else 'api'
+
+    # DRF authenticates inside the view and stores the user on the wrapped
+    # HttpRequest, so by the time a change is recorded it is available here.
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.pk, user.get_username()[:150], source, path
+    return None, '', source, path
+
+
+def _json_value(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_json_value(item) for item in value]
+    return str(value)
+
+
+class AuditBuffer:
+    """
+    In-memory buffer of audit entries flushed by a background thread
+
+    The thread wakes up every ``flush_interval`` seconds, or as soon as
+    ``batch_size`` entries are waiting. If the buffer ever reaches ``max_size``
+    (e.g. the database is slow) the caller flushes synchronously instead of
+    growing memory without bound.
+    """
+
+    def __init__(self, batch_size=500, flush_interval=2.0, max_size=10000, use_thread=True):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self.use_thread = use_thread
+        self._entries = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def add(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+            size = len(self._entries)
+
+        if not self.use_thread or size >= self.max_size:
+            self.flush()
+            return
+
+        self._ensure_thread()
+        if size >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write every buffered entry with multi-row inserts"""
+        from .models import AuditLogEntry
+
+        with self._flush_lock:
+            with self._lock:
+                entries, self._entries = self._entries, []
+            if not entries:
+                return
+
+            try:
+                AuditLogEntry.objects.bulk_create(
+                    [AuditLogEntry(**entry) for entry in entries],
+                    batch_size=self.batch_size,
+                )
+            except Exception:
+                logger.exception("Scrittura di %d voci di audit fallita", len(entries))
+                with self._lock:
+                    # Keep them for the next attempt, unless that would overflow
+                    if len(self._entries) + len(entries) <= self.max_size:
+                        self._entries[:0] = entries
+
+    def _ensure_thread(self):
+        # Started lazily and per process, so forking servers get their own writer
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Errore nel thread di scrittura audit")
+
+
+buffer = AuditBuffer(
+    batch_size=getattr(settings, 'AUDIT_BATCH_SIZE', 500),
+    flush_interval=getattr(settings, 'AUDIT_FLUSH_INTERVAL', 2.0),
+    max_size=getattr(settings, 'AUDIT_MAX_BUFFER', 10000),
+    use_thread=getattr(settings, 'AUDIT_ASYNC', True),
+)
+atexit.register(buffer.flush)
+
+
+def record(model, object_id, action, changes=None, using=None):
+    """
+    Record a change on an audited model
+
+    The entry is buffered only if the surrounding transaction commits.
+
+    Args:
+        model: Model class (or instance) that changed
+        object_id: Primary key of the changed object
+        action (str): One of AuditLogEntry.ACTION_CHOICES
+        changes (dict): {field: [old value, new value]}
+        using (str): Database alias of the write
+    """
+    if not getattr(settings, 'AUDIT_ENABLED', True):
+        return
+
+    actor_id, actor_repr, source, path = _get_context()
+    entry = {
+        'created_at': timezone.now(),
+        'model': model._meta.label_lower,
+        'object_id': str(object_id),
+        'action': action,
+        'changes': {
+            field: [_json_value(old), _json_value(new)]
+            for field, (old, new) in (changes or {}).items()
+        },
+        'actor_id': actor_id,
+        'actor_repr': actor_repr,
+        'source': source,
+        'request_path': path,
+    }
+    transaction.on_commit(lambda: buffer.add(entry), using=using)
@@ -0,0 +1,105 @@
+"""
+Signal handlers capturing changes on the models listed in AUDIT_MODELS
+"""
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models.signals import post_init, post_save, post_delete, m2m_changed
+
+from . import recorder
+
+# model class -> list of concrete audited fields
+registry = {}
+
+
+def get_audited_fields(model):
+    """Concrete fields audited for ``model`` (empty if it is not audited)"""
+    return registry.get(model, [])
+
+
+def _snapshot(sender, instance, **kwargs):
+    # Only fields already loaded: touching a deferred one would hit the database
+    instance._audit_snapshot = {
+        field.name: instance.__dict__[field.attname]
+        for field in registry[sender]
+        if field.attname in instance.__dict__
+    }
+
+
+def _on_save(sender, instance, created, raw, update_fields, using, **kwargs):
+    if raw:
+        return
+
+    fields = registry[sender]
+    if update_fields is not None:
+        fields = [field for field in fields if field.name in update_fields]
+
+    snapshot = getattr(instance, '_audit_snapshot', {})
+    current = {field.name: getattr(instance, field.attname) for field in fields}
+
+    if created:
+        changes = {name: (None, value) for name, value in current.items()}
+        recorder.record(sender, instance.pk, 'create', changes, using=using)
+    else:
+        changes = {
+            name: (snapshot.get(name), value)
+            for name, value in current.items()
+            if snapshot.get(name) != value
+        }
+        if changes:
+            recorder.record(sender, instance.pk, 'update', changes, using=using)
+
+    snapshot.update(current)
+    instance._audit_snapshot = snapshot
+
+
+def _on_delete(sender, instance, using, **kwargs):
+    recorder.record(sender, instance.pk, 'delete', using=using)
+
+
+def _make_m2m_handler(field_name):
+    actions = {'post_add': 'm2m_add', 'post_remove': 'm2m_remove', 'pre_clear': 'm2m_clear'}
+
+    def handler(sender, instance, action, reverse, model, pk_set, using, **kwargs):
+        if reverse or action not in actions:
+            return
+        if action == 'pre_clear':
+            pk_set = set(getattr(instance, field_name).values_list('pk', flat=True))
+        if not pk_set:
+            return
+        recorder.record(
+            instance.__class__, instance.pk, actions[action],
+            {field_name: (None, sorted(pk_set))}, using=using
+        )
+
+    return handler
+
+
+def connect_audited_models():
+    """
+    Connect the audit handlers for every model in settings.AUDIT_MODELS
+
+    AUDIT_MODELS maps a model label to the list of audited field names,
+    e.g. {'users.User': ['role', 'is_active', 'work_areas']}.
+    """
+    for label, field_names in getattr(settings, 'AUDIT_MODELS', {}).items():
+        model = apps.get_model(label)
+        concrete = []
+
+        for name in field_names:
+            field = model._meta.get_field(name)
+            if field.many_to_many:
+                through = getattr(model, name).through
+                m2m_changed.connect(
+                    _make_m2m_handler(name),
+                    sender=through,
+                    weak=False,
+                    dispatch_uid=f'audit_m2m_{label}_{name}',
+                )
+            else:
+                concrete.append(field)
+
+        registry[model] = concrete
+        post_init.connect(_snapshot, sender=model, dispatch_uid=f'audit_init_{label}')
+        post_save.connect(_on_save, sender=model, dispatch_uid=f'audit_save_{label}')
+        post_delete.connect(_on_delete, sender=model, dispatch_uid=f'audit_delete_{label}')
@@ -0,0 +1,104 @@
+"""
+The author of a change follows the request across sync_to_async and
+async_to_sync hops (the request is held in a ContextVar)
+"""
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import AsyncClient, RequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.audit.models import AuditLogEntry
+from apps.audit.recorder import _get_context, reset_current_request, set_current_request
+from apps.users.models import User
+
+
+@pytest.fixture
+def author():
+    return User(pk=42, username='mrossi')
+
+
+@pytest.fixture
+def bound_request(author):
+    request = RequestFactory().patch('/api/auth/users/1/')
+    request.user = author
+    token = set_current_request(request)
+    yield request
+    reset_current_request(token)
+
+
+@pytest.mark.parametrize('thread_sensitive', [True, False])
+def test_sync_to_async(bound_request, thread_sensitive):
+    async def view():
+        return await sync_to_async(_get_context, thread_sensitive=thread_sensitive)()
+
+    assert async_to_sync(view)() == (42, 'mrossi', 'api', '/api/auth/users/1/')
+
+
+def test_async_to_sync_inside_sync_to_async(bound_request):
+    async def inner():
+        return await sync_to_async(_get_context)()
+
+    async def outer():
+        return await sync_to_async(async_to_sync(inner), thread_sensitive=False)()
+
+    assert async_to_sync(outer)()[:2] == (42, 'mrossi')
+
+
+def test_bound_in_async_code(author):
+    async def middleware():
+        request = RequestFactory().get('/admin/users/user/')
+        request.user = author
+        token = set_current_request(request)
+        try:
+            return await sync_to_async(_get_context)()
+        finally:
+            reset_current_request(token)
+
+    assert async_to_sync(middleware)() == (42, 'mrossi', 'admin', '/admin/users/user/')
+    # Nothing leaks out of the request
+    assert _get_context() == (None, '', 'system', '')
+
+
+@pytest.mark.django_db
+def test_change_recorded_with_author(superadmin, django_capture_on_commit_callbacks):
+    request = RequestFactory().patch(f'/api/auth/users/{superadmin.pk}/')
+    request.user = superadmin
+    user = User.objects.create_user(username='giulia', email='giulia@example.com', password='password')
+
+    def change():
+        user.role = 'admin'
+        user.save(update_fields=['role'])
+
+    async def view():
+        await sync_to_async(change)()
+
+    token = set_current_request(request)
+    try:
+        with django_capture_on_commit_callbacks(execute=True):
+            async_to_sync(view)()
+    finally:
+        reset_current_request(token)
+
+    entry = AuditLogEntry.objects.filter(object_id=str(user.pk), action='update').get()
+    assert (entry.actor_id, entry.actor_repr, entry.source) == (superadmin.pk, 'superadmin', 'api')
+
+
+@pytest.mark.django_db
+def test_async_request_to_sync_view(superadmin, django_capture_on_commit_callbacks):
+    """Async middleware binds the request, the sync view saves in a worker hop"""
+    user = User.objects.create_user(username='giulia', email='giulia@example.com', password='password')
+    headers = {'Authorization': f'Bearer {AccessToken.for_user(superadmin)}'}
+
+    async def patch():
+        return await AsyncClient().patch(
+            f'/api/auth/users/{user.pk}/', {'role': 'admin'}, content_type='application/json', headers=headers,
+        )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = async_to_sync(patch)()
+    assert response.status_code == 200, response.content
+
+    entry = AuditLogEntry.objects.filter(object_id=str(user.pk), action='update').get()
+    assert (entry.actor_id, entry.actor_repr) == (superadmin.pk, 'superadmin')
+    assert entry.request_path == f'/api/auth/users/{user.pk}/'
@@ -0,0 +1,86 @@
+"""
+Audited bulk update() (apps/audit/query.py)
+"""
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.audit import query
+from apps.audit.models import AuditLogEntry
+from apps.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def volunteers():
+    return [
+        User.objects.create_user(username=f'volontario{index}', email=f'volontario{index}@example.com', password='password')
+        for index in range(5)
+    ]
+
+
+def bulk_entries():
+    return AuditLogEntry.objects.filter(action='bulk_update').order_by('object_id')
+
+
+def test_entry_per_changed_row(volunteers, django_capture_on_commit_callbacks, monkeypatch):
+    monkeypatch.setattr(query, 'BATCH_SIZE', 2)
+    User.objects.filter(pk=volunteers[0].pk).update(role='admin')
+    AuditLogEntry.objects.all().delete()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        rows = User.objects.filter(username__startswith='volontario').update(role='admin')
+
+    assert rows == 5
+    # The row that already had the value changed nothing
+    assert sorted(int(entry.object_id) for entry in bulk_entries()) == sorted(user.pk for user in volunteers[1:])
+    assert all(entry.changes == {'role': ['base', 'admin']} for entry in bulk_entries())
+
+
+def test_rows_locked_before_reading(volunteers):
+    if not connection.features.has_select_for_update:
+        pytest.skip("Il database non supporta SELECT ... FOR UPDATE")
+    with CaptureQueriesContext(connection) as context:
+        User.objects.filter(username__startswith='volontario').update(is_active_volunteer=False)
+    selects = [query['sql'] for query in context.captured_queries if query['sql'].startswith('SELECT')]
+    assert selects[0].endswith(f'FOR UPDATE OF "{User._meta.db_table}"')
+
+
+def test_row_matching_after_the_select_is_not_updated(volunteers, django_capture_on_commit_callbacks):
+    """
+    Another write makes a row match between the SELECT of the previous values
+    and the UPDATE: the update leaves it alone instead of changing it unaudited
+    """
+    late = User.objects.create_user(username='ritardatario', email='ritardatario@example.com', password='password')
+    written = []
+
+    def write_after_first_select(execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        if not written and sql.lstrip().startswith('SELECT'):
+            written.append(sql)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {User._meta.db_table} SET username = %s WHERE id = %s', ['volontario-tardivo', late.pk],
+                )
+        return result
+
+    with django_capture_on_commit_callbacks(execute=True):
+        with connection.execute_wrapper(write_after_first_select):
+            # Not the role: UserQuerySet.update() runs a SELECT of its own first
+            rows = User.objects.filter(username__startswith='volontario').update(is_active_volunteer=False)
+
+    assert written
+    assert rows == 5
+    late.refresh_from_db()
+    assert (late.username, late.is_active_volunteer) == ('volontario-tardivo', True)
+    assert str(late.pk) not in set(bulk_entries().values_list('object_id', flat=True))
+    assert bulk_entries().count() == 5
+
+
+def test_update_without_audited_fields(volunteers):
+    with CaptureQueriesContext(connection) as context:
+        rows = User.objects.filter(username__startswith='volontario').update(phone='0123456')
+    assert rows == 5
+    assert len(context.captured_queries) == 1
@@ -0,0 +1,106 @@
+"""
+Minimal async counterpart of DRF's APIView
+
+DRF views are synchronous: under ASGI each one occupies a worker thread for
+its whole duration. Views that mostly wait on I/O (SMTP, large uploads,
+streamed exports) subclass AsyncAPIView instead and run on the event loop,
+while reusing the project's DRF authentication, permission and parser classes.
+"""
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.http import JsonResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+
+def _release_connections():
+    for connection in connections.all(initialized_only=True):
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        # Per-endpoint timeout of the pooled backend, applied again on the next checkout
+        timeout = getattr(connection, 'statement_timeout', None)
+        connection.close_if_unusable_or_obsolete()
+        if timeout is not None and connection.connection is None:
+            connection.set_statement_timeout(timeout)
+
+
+async def release_connections():
+    """
+    Give the request's database connections back before awaiting slow I/O
+
+    An async view waiting on SMTP would otherwise keep a pooled connection
+    checked out for the whole wait, and a few dozen such requests exhaust the
+    pool. Connections are closed as at the end of a request (so only with
+    CONN_MAX_AGE = 0, as with the pooled backend), never inside a transaction.
+    """
+    await sync_to_async(_release_connections)()
+
+
+class AsyncAPIView(View):
+    """
+    Async class-based view with DRF authentication and permissions
+
+    Handlers receive a DRF ``Request`` and must return a Django response
+    (``JsonResponse``, ``StreamingHttpResponse``, ...). ``APIException``s are
+    turned into JSON error responses shaped like DRF's default handler.
+    """
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_classes = api_settings.DEFAULT_PERMISSION_CLASSES
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Token authentication only, as for every DRF view
+        view.csrf_exempt = True
+        return view
+
+    def get_permissions(self):
+        return [permission() for permission in self.permission_classes]
+
+    def check_permissions(self, request):
+        """Authenticate the request (hits the database) and check permissions"""
+        for permission in self.get_permissions():
+            if not permission.has_permission(request, self):
+                if request.authenticators and not request.successful_authenticator:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(getattr(permission, 'message', None))
+
+    async def dispatch(self, request, *args, **kwargs):
+        drf_request = Request(
+            request,
+            parsers=[parser() for parser in self.parser_classes],
+            authenticators=[auth() for auth in self.authentication_classes],
+        )
+        handler = getattr(self, request.method.lower(), None)
+        if handler is None or request.method.lower() not in self.http_method_names:
+            return await super().dispatch(request, *args, **kwargs)
+
+        try:
+            await sync_to_async(self.check_permissions)(drf_request)
+            return await handler(drf_request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc, drf_request)
+
+    def handle_exception(self, exc, request):
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {'detail': exc.detail}
+
+        response = JsonResponse(
+            data,
+            status=exc.status_code,
+            safe=False,
+            json_dumps_params={'ensure_ascii': False},
+        )
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            authenticators = request.authenticators
+            if authenticators:
+                response['WWW-Authenticate'] = authenticators[0].authenticate_header(request)
+            else:
+                response.status_code = 403
+        return response
@@ -0,0 +1,197 @@
+"""
+Multi-operation requests (POST /api/batch/)
+
+The PWA replays its offline queue (profile edits, password changes, user
+updates) as one request instead of one round trip per operation. Each
+operation names an existing API route; it is dispatched in-process to the
+route's view with the user authenticated once by the batch request, and its
+response data is returned as is, without rendering and parsing it again.
+
+- ``atomic: false`` (default): every operation runs as its own request would
+  (with its own transactions) and the batch goes on after a failure
+- ``atomic: true``: all or nothing, the first failing operation (status >= 400)
+  rolls back the whole batch and the following ones are not run (424)
+
+Each operation runs under the statement timeout of its own route
+(DB_STATEMENT_TIMEOUTS). Only database changes are rolled back: emails (e.g.
+``send_credentials``) are sent anyway. Per-operation Idempotency-Key headers
+are refused in atomic mode, as a rolled back operation would leave its
+response stored: send the key on the batch request instead.
+"""
+
+import asyncio
+import json
+import logging
+from io import BytesIO
+from urllib.parse import unquote
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.urls import Resolver404, resolve
+from rest_framework import serializers, status
+from rest_framework.response import Response
+
+from .db.timeouts import set_statement_timeout, timeout_for
+
+logger = logging.getLogger(__name__)
+
+BATCH_URL_NAME = 'api_batch'
+
+# Headers an operation may set, and response headers returned with its result
+OPERATION_HEADERS = ('If-Match', 'If-None-Match', 'If-Unmodified-Since', 'Idempotency-Key', 'Accept-Language')
+RESULT_HEADERS = ('ETag', 'Location', 'Idempotent-Replayed', 'Retry-After')
+
+NOT_RUN = {
+    'status': status.HTTP_424_FAILED_DEPENDENCY,
+    'body': {'detail': "Non eseguita: un'operazione precedente è fallita"},
+}
+
+
+class OperationSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
+    path = serializers.CharField(max_length=2000)
+    body = serializers.JSONField(required=False)
+    headers = serializers.DictField(child=serializers.CharField(), required=False)
+
+    def validate_path(self, value):
+        if not value.startswith('/api/'):
+            raise serializers.ValidationError("Indicare un percorso dell'API (/api/...)")
+        return value
+
+    def validate_headers(self, value):
+        allowed = {name.lower() for name in OPERATION_HEADERS}
+        invalid = [name for name in value if name.lower() not in allowed]
+        if invalid:
+            raise serializers.ValidationError(f"Header non consentiti: {', '.join(invalid)}")
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    operations = OperationSerializer(many=True)
+    atomic = serializers.BooleanField(default=False)
+
+    def validate_operations(self, value):
+        if not value:
+            raise serializers.ValidationError("Indicare almeno un'operazione")
+        if len(value) > settings.BATCH_MAX_OPERATIONS:
+            raise serializers.ValidationError(
+                f"Al massimo {settings.BATCH_MAX_OPERATIONS} operazioni per richiesta"
+            )
+        return value
+
+    def validate(self, attrs):
+        if attrs['atomic'] and any(
+            name.lower() == 'idempotency-key'
+            for operation in attrs['operations'] for name in operation.get('headers', {})
+        ):
+            raise serializers.ValidationError({
+                'operations': "Idempotency-Key non consentita nelle operazioni di un batch atomico: "
+                              "indicarla sulla richiesta del batch",
+            })
+        return attrs
+
+
+def build_request(request, operation):
+    """WSGI request for ``operation``, authenticated as ``request``"""
+    path, _, query = operation['path'].partition('?')
+    body = json.dumps(operation['body']).encode() if 'body' in operation else b''
+
+    environ = {
+        name: value for name, value in request.META.items()
+        if not name.startswith(('HTTP_IF_', 'HTTP_IDEMPOTENCY_', 'CONTENT_', 'wsgi.'))
+    }
+    environ.update({
+        'REQUEST_METHOD': operation['method'],
+        'SCRIPT_NAME': '',
+        # WSGI carries the path as latin-1 decoded bytes
+        'PATH_INFO': unquote(path).encode().decode('iso-8859-1'),
+        'QUERY_STRING': query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.input': BytesIO(body),
+        'wsgi.url_scheme': request.scheme,
+    })
+    for name, value in operation.get('headers', {}).items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = value
+
+    sub_request = WSGIRequest(environ)
+    sub_request.user = request.user
+    # Picked up by DRF's Request: the batch request is authenticated once
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+    return sub_request
+
+
+def _result(response):
+    if response.streaming:
+        return {
+            'status': status.HTTP_400_BAD_REQUEST,
+            'body': {'detail': "Risposta in streaming non disponibile in un batch"},
+        }
+    if isinstance(response, Response):
+        body = response.data
+    elif response.get('Content-Type', '').startswith('application/json'):
+        body = json.loads(response.content) if response.content else None
+    else:
+        body = response.content.decode(response.charset, errors='replace')
+    result = {'status': response.status_code, 'body': body}
+    headers = {name: response[name] for name in RESULT_HEADERS if response.has_header(name)}
+    if headers:
+        result['headers'] = headers
+    return result
+
+
+def dispatch(request, operation):
+    """
+    Run one operation through the view of its route
+
+    Returns:
+        dict: status, body and (when set) headers of its response
+    """
+    try:
+        match = resolve(unquote(operation['path'].partition('?')[0]))
+    except Resolver404:
+        return {'status': status.HTTP_404_NOT_FOUND, 'body': {'detail': "Endpoint non trovato"}}
+    if match.url_name == BATCH_URL_NAME:
+        return {'status': status.HTTP_400_BAD_REQUEST, 'body': {'detail': "Batch annidati non consentiti"}}
+
+    sub_request = build_request(request, operation)
+    sub_request.resolver_match = match
+    # The timeout of the operation's route, not the batch's: imports and
+    # exports get their longer ones. Each operation sets its own.
+    set_statement_timeout(timeout_for(match.url_name))
+    view = match.func
+    if asyncio.iscoroutinefunction(view):
+        view = async_to_sync(view)
+    try:
+        response = view(sub_request, *match.args, **match.kwargs)
+    except Exception:
+        logger.exception("Operazione %s %s del batch fallita", operation['method'], operation['path'])
+        return {'status': status.HTTP_500_INTERNAL_SERVER_ERROR, 'body': {'detail': "Errore interno del server"}}
+    return _result(response)
+
+
+def run_batch(request, operations, atomic=False):
+    """
+    Returns:
+        dict: results (one per operation, in order) and ``committed``,
+        true when every operation succeeded and its changes were kept
+    """
+    results = []
+    if atomic:
+        with transaction.atomic():
+            for operation in operations:
+                results.append(dispatch(request, operation))
+                if results[-1]['status'] >= 400:
+                    transaction.set_rollback(True)
+                    break
+        committed = results[-1]['status'] < 400
+        results.extend(NOT_RUN for _ in operations[len(results):])
+        return {'committed': committed, 'results': results}
+
+    for operation in operations:
+        results.append(dispatch(request, operation))
+    return {'committed': all(result['status'] < 400 for result in results), 'results': results}
@@ -0,0 +1,311 @@
+"""
+Cache backends
+"""
+
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django_redis.cache import RedisCache
+
+from .metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class InstrumentedRedisCache(RedisCache):
+    """
+    django_redis backend counting hits and misses into the request metrics
+    """
+
+    def get(self, key, default=None, version=None, client=None):
+        value = super().get(key, _MISSING, version=version, client=client)
+        if value is _MISSING:
+            record_cache(misses=1)
+            return default
+        record_cache(hits=1)
+        return value
+
+    def get_many(self, keys, version=None, client=None):
+        keys = list(keys)
+        found = super().get_many(keys, version=version, client=client)
+        record_cache(hits=len(found), misses=len(keys) - len(found))
+        return found
+
+
+class LocalLRU:
+    """
+    Bounded in-process LRU with per-entry expiry
+
+    Values are stored pickled, like LocMemCache, so callers never share (and
+    mutate) the cached object.
+    """
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Bumped by every invalidation, see set(generation=...)
+        self.generation = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return pickle.loads(entry[1])
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return _MISSING
+
+    def set(self, key, value, timeout, generation=None):
+        """
+        Store a value; with ``generation`` the value (read from Redis when the
+        LRU was at that generation) is dropped if an invalidation arrived since
+        """
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (time.monotonic() + timeout, pickled)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self.generation += 1
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TwoTierCache(InstrumentedRedisCache):
+    """
+    Per-process LRU (L1) in front of Redis (L2) for small, hot, read-mostly data
+
+    Reads are served from L1 when possible; writes go to Redis first, then to
+    L1, and publish the key on a Redis channel so that the other processes drop
+    their L1 copy. A listener thread per process applies those invalidations.
+    L1 entries also expire after ``L1_TIMEOUT`` seconds, which bounds staleness
+    if an invalidation message is lost (e.g. Redis restarted).
+
+    Extra OPTIONS:
+        L1_MAX_ENTRIES (int): Entries kept per process (default 1000)
+        L1_TIMEOUT (int): Maximum life of an L1 entry in seconds (default 60)
+        INVALIDATION_CHANNEL (str): Pub/sub channel (default "cache-invalidation:<alias>")
+    """
+
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        options = params.get('OPTIONS', {})
+        self.l1 = LocalLRU(options.get('L1_MAX_ENTRIES', 1000))
+        self.l1_timeout = options.get('L1_TIMEOUT', 60)
+        self.channel = options.get('INVALIDATION_CHANNEL', f"cache-invalidation:{params.get('KEY_PREFIX', '')}")
+        self._listener_lock = threading.Lock()
+        self._listener_pid = None
+        self._origin = None
+
+    # Invalidation
+
+    def _ensure_listener(self):
+        """Start the invalidation listener once per process (also after fork)"""
+        pid = os.getpid()
+        if self._listener_pid == pid:
+            return
+        with self._listener_lock:
+            if self._listener_pid == pid:
+                return
+            # A forked child may have inherited the parent's L1 contents
+            self.l1.clear()
+            self._origin = uuid.uuid4().hex
+            thread = threading.Thread(target=self._listen, name='cache-invalidation', daemon=True)
+            thread.start()
+            self._listener_pid = pid
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.get_client(write=False).pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # Anything may have changed while we were not subscribed
+                self.l1.clear()
+                for message in pubsub.listen():
+                    self._apply_invalidation(message['data'])
+            except Exception:
+                logger.warning("Listener di invalidazione cache disconnesso, nuovo tentativo", exc_info=True)
+                self.l1.clear()
+                time.sleep(1)
+
+    def _apply_invalidation(self, data):
+        if isinstance(data, bytes):
+            data = data.decode()
+        origin, _, key = data.partition(':')
+        if origin == self._origin:
+            return
+        if key == '*':
+            self.l1.clear()
+        else:
+            self.l1.delete(key)
+
+    def _publish(self, *keys):
+        self.l1_invalidate(*keys)
+        try:
+            client = self.client.get_client(write=True)
+            for key in keys:
+                client.publish(self.channel, f'{self._origin}:{key}')
+        except Exception:
+            # Other processes fall back on the L1 expiry
+            logger.warning("Invalidazione cache non pubblicata", exc_info=True)
+
+    def l1_invalidate(self, *keys):
+        for key in keys:
+            if key == '*':
+                self.l1.clear()
+            else:
+                self.l1.delete(key)
+
+    def stats(self):
+        """L1 counters of this process"""
+        return {
+            'entries': len(self.l1),
+            'hits': self.l1.hits,
+            'misses': self.l1.misses,
+            'evictions': self.l1.evictions,
+        }
+
+    def _l1_timeout(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            return self.l1_timeout
+        return min(timeout, self.l1_timeout)
+
+    # Reads
+
+    def get(self, key, default=None, version=None, client=None):
+        self._ensure_listener()
+        full_key = self.make_and_validate_key(key, version=version)
+        value = self.l1.get(full_key)
+        if value is not _MISSING:
+            record_cache(hits=1)
+            return value
+
+        generation = self.l1.generation
+        value = super().get(key, _MISSING, version=version, client=client)
+        if value is _MISSING:
+            return default
+        self.l1.set(full_key, value, self.l1_timeout, generation)
+        return value
+
+    def get_many(self, keys, version=None, client=None):
+        self._ensure_listener()
+        found = {}
+        remote = []
+        for key in keys:
+            value = self.l1.get(self.make_and_validate_key(key, version=version))
+            if value is _MISSING:
+                remote.append(key)
+            else:
+                found[key] = value
+        record_cache(hits=len(found))
+
+        if remote:
+            generation = self.l1.generation
+            fetched = super().get_many(remote, version=version, client=client)
+            for key, value in fetched.items():
+                self.l1.set(self.make_and_validate_key(key, version=version), value, self.l1_timeout, generation)
+            found.update(fetched)
+        return found
+
+    def has_key(self, key, version=None, client=None):
+        self._ensure_listener()
+        if self.l1.get(self.make_and_validate_key(key, version=version)) is not _MISSING:
+            return True
+        return super().has_key(key, version=version, client=client)
+
+    # Writes
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None, client=None, nx=False, xx=False):
+        self._ensure_listener()
+        result = super().set(key, value, timeout=timeout, version=version, client=client, nx=nx, xx=xx)
+        if not result:
+            # nx/xx not met (a lost add() race): Redis kept its value, no L1
+            # copy anywhere is stale
+            return result
+        full_key = self.make_and_validate_key(key, version=version)
+        self._publish(full_key)
+        l1_timeout = self._l1_timeout(timeout)
+        if l1_timeout > 0:
+            self.l1.set(full_key, value, l1_timeout)
+        return result
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None, client=None):
+        return self.set(key, value, timeout=timeout, version=version, client=client, nx=True)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None, client=None):
+        self._ensure_listener()
+        result = super().set_many(data, timeout=timeout, version=version, client=client)
+        full_keys = {key: self.make_and_validate_key(key, version=version) for key in data}
+        self._publish(*full_keys.values())
+        l1_timeout = self._l1_timeout(timeout)
+        if l1_timeout > 0:
+            for key, value in data.items():
+                self.l1.set(full_keys[key], value, l1_timeout)
+        return result
+
+    def delete(self, key, version=None, client=None):
+        self._ensure_listener()
+        result = super().delete(key, version=version, client=client)
+        self._publish(self.make_and_validate_key(key, version=version))
+        return result
+
+    def delete_many(self, keys, version=None, client=None):
+        self._ensure_listener()
+        keys = list(keys)
+        result = super().delete_many(keys, version=version, client=client)
+        self._publish(*(self.make_and_validate_key(key, version=version) for key in keys))
+        return result
+
+    def delete_pattern(self, *args, **kwargs):
+        self._ensure_listener()
+        result = super().delete_pattern(*args, **kwargs)
+        self._publish('*')
+        return result
+
+    def clear(self):
+        self._ensure_listener()
+        result = super().clear()
+        self._publish('*')
+        return result
+
+    def _incr(self, method, key, delta, version, client):
+        self._ensure_listener()
+        result = method(key, delta=delta, version=version, client=client)
+        # Counters change too often to be worth caching locally
+        self._publish(self.make_and_validate_key(key, version=version))
+        return result
+
+    def incr(self, key, delta=1, version=None, client=None):
+        return self._incr(super().incr, key, delta, version, client)
+
+    def decr(self, key, delta=1, version=None, client=None):
+        return self._incr(super().decr, key, delta, version, client)
@@ -0,0 +1,86 @@
+"""
+Response body encoders used by CompressionMiddleware
+
+brotli is optional: without it only gzip is offered.
+"""
+
+import re
+import zlib
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+_ACCEPT_ENCODING = re.compile(r'\s*([a-z*]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?', re.IGNORECASE)
+
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encoding, allowed):
+    """
+    Best content coding accepted by the client
+
+    Args:
+        accept_encoding (str): Accept-Encoding request header
+        allowed (tuple): Codings we can produce, in order of preference
+
+    Returns:
+        str: 'br', 'gzip' or None
+    """
+    accepted = {}
+    for part in accept_encoding.split(','):
+        match = _ACCEPT_ENCODING.match(part)
+        if match:
+            try:
+                quality = float(match.group(2)) if match.group(2) else 1.0
+            except ValueError:
+                continue
+            accepted[match.group(1).lower()] = quality
+
+    best, best_quality = None, 0.0
+    for coding in allowed:
+        quality = accepted.get(coding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class Encoder:
+    """Incremental encoder: ``compress`` chunks, ``flush`` when streaming, then ``finish``"""
+
+    def __init__(self, coding, gzip_level=6, brotli_quality=4):
+        self.coding = coding
+        if coding == 'br':
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits 31: gzip container
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        if self.coding == 'br':
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def flush(self):
+        """
+        Everything buffered so far, decodable without waiting for more data
+
+        Each flush ends a block early and costs bytes: call it every few KB,
+        not on every chunk.
+        """
+        if self.coding == 'br':
+            return self._compressor.flush()
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.coding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+def compress(data, coding, gzip_level=6, brotli_quality=4):
+    encoder = Encoder(coding, gzip_level, brotli_quality)
+    return encoder.compress(data) + encoder.finish()
@@ -0,0 +1,158 @@
+"""
+Optimistic concurrency control on updates (If-Match)
+
+Detail responses carry an ``ETag`` derived from the row's ``updated_at``,
+which every write already moves (save(), the timestamped update(), work area
+touches). A client sends it back in ``If-Match`` and the update becomes one
+
+    UPDATE ... SET <changed columns>, updated_at = %s WHERE id = %s AND updated_at = %s
+
+with no row lock: when another write got there first no row matches and the
+client gets 412 with the current representation and its ETag, to merge and
+retry. ``If-Match: *`` or no header at all update unconditionally, unless
+OPTIMISTIC_LOCKING_REQUIRED is set (428).
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import router
+from django.db.models.signals import post_save
+from django.utils import timezone
+from django.utils.http import parse_etags
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.response import Response
+
+HEADER = 'If-Match'
+
+IF_MATCH_PARAMETER = OpenApiParameter(
+    HEADER, str, OpenApiParameter.HEADER,
+    description=(
+        "ETag ricevuto con i dati letti: se nel frattempo sono stati modificati "
+        "la richiesta è rifiutata (412) con i dati correnti"
+    ),
+)
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "I dati sono stati modificati da un'altra richiesta: ricaricarli e riprovare"
+    default_code = 'precondition_failed'
+
+
+class PreconditionRequired(APIException):
+    status_code = status.HTTP_428_PRECONDITION_REQUIRED
+    default_detail = "Header If-Match obbligatorio per le modifiche"
+    default_code = 'precondition_required'
+
+
+def etag_for(instance):
+    """Strong ETag of the stored version of ``instance``"""
+    version = f'{instance.pk}:{instance.updated_at.isoformat()}'
+    return '"%s"' % hashlib.sha256(version.encode()).hexdigest()[:20]
+
+
+def check_if_match(request, instance):
+    """
+    Returns:
+        datetime: ``updated_at`` the row must still have when written, None
+        for an unconditional update
+
+    Raises:
+        PreconditionFailed: If-Match names another version
+        PreconditionRequired: No If-Match while OPTIMISTIC_LOCKING_REQUIRED
+    """
+    header = request.headers.get(HEADER)
+    if header is None:
+        if settings.OPTIMISTIC_LOCKING_REQUIRED:
+            raise PreconditionRequired()
+        return None
+    tags = parse_etags(header)
+    if '*' in tags:
+        return None
+    if etag_for(instance) not in tags:
+        raise PreconditionFailed()
+    return instance.updated_at
+
+
+def save_if_unmodified(instance, fields, updated_at=None):
+    """
+    Write ``fields`` of ``instance`` with one UPDATE of those columns only
+
+    post_save is sent as save(update_fields=...) would (audit entries).
+
+    Args:
+        instance: Model instance with ``updated_at``, attributes already set
+        fields: Names of the changed fields
+        updated_at: Value the row must still have, None to skip the check
+
+    Raises:
+        PreconditionFailed: The row changed (or was deleted) in the meantime
+    """
+    model = type(instance)
+    using = router.db_for_write(model, instance=instance)
+    instance.updated_at = timezone.now()
+    fields = [*fields, 'updated_at']
+    attnames = [model._meta.get_field(name).attname for name in fields]
+    values = {attname: getattr(instance, attname) for attname in attnames}
+
+    queryset = model._base_manager.using(using).filter(pk=instance.pk)
+    if updated_at is not None:
+        queryset = queryset.filter(updated_at=updated_at)
+    if not queryset.update(**values):
+        raise PreconditionFailed()
+    post_save.send(
+        sender=model, instance=instance, created=False,
+        update_fields=frozenset(fields), raw=False, using=using,
+    )
+
+
+class ConditionalUpdateMixin:
+    """
+    ETag on retrieve and If-Match on update for a generic view of a model
+    with ``updated_at``
+
+    The serializer's save() receives ``unmodified_since`` and passes it to
+    save_if_unmodified(); a 412 carries ``current_serializer_class`` data.
+    """
+    current_serializer_class = None
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        response = Response(self.get_serializer(instance).data)
+        response['ETag'] = etag_for(instance)
+        return response
+
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        try:
+            unmodified_since = check_if_match(request, instance)
+            serializer = self.get_serializer(instance, data=request.data, partial=partial)
+            serializer.is_valid(raise_exception=True)
+            serializer.save(unmodified_since=unmodified_since)
+        except PreconditionFailed as exc:
+            return self.precondition_failed(instance, exc)
+
+        if getattr(instance, '_prefetched_objects_cache', None):
+            instance._prefetched_objects_cache = {}
+        response = Response(serializer.data)
+        response['ETag'] = etag_for(instance)
+        return response
+
+    def precondition_failed(self, instance, exc):
+        """412 with the current representation of ``instance``"""
+        try:
+            instance.refresh_from_db()
+        except ObjectDoesNotExist:
+            raise NotFound()
+        serializer = self.current_serializer_class(instance, context=self.get_serializer_context())
+        response = Response(
+            {'detail': exc.detail, 'current': serializer.data},
+            status=status.HTTP_412_PRECONDITION_FAILED,
+        )
+        response['ETag'] = etag_for(instance)
+        return response
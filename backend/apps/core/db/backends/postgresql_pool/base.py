@@ -0,0 +1,111 @@
+"""
+PostgreSQL backend borrowing connections from a process-wide pool
+
+    DATABASES['default'] = {
+        'ENGINE': 'apps.core.db.backends.postgresql_pool',
+        ...
+        'CONN_MAX_AGE': 0,  # give the connection back at the end of each request
+        'POOL': {'MIN_SIZE': 2, 'MAX_SIZE': 10, 'TIMEOUT': 10},
+    }
+
+See apps/core/db/pool.py for the POOL options.
+"""
+
+import psycopg2.extensions
+import psycopg2.extras
+from django.db.backends.postgresql import base
+
+from ...pool import get_pool
+
+
+def _prepare_connection(connection):
+    # Same as Django does on every new psycopg2 connection: skip the
+    # json.loads()/json.dumps() round trip for JSONField with custom decoders
+    psycopg2.extras.register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # Statement timeout set for the current checkout, see set_statement_timeout()
+    statement_timeout = None
+    # Requested before the connection was opened: applied on checkout
+    pending_statement_timeout = None
+    # False after a rollback, which also undoes a SET run in the transaction
+    statement_timeout_applied = True
+
+    @property
+    def pool(self):
+        settings_dict = self.settings_dict
+        key = (self.alias, settings_dict['NAME'], settings_dict['HOST'], settings_dict['PORT'])
+        return get_pool(
+            key, self.alias, self.get_connection_params(),
+            settings_dict.get('POOL'), _prepare_connection,
+        )
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.checkout()
+        # Isolation level from OPTIONS, as in the stock backend
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        if isolation_level is not None:
+            self.isolation_level = base.IsolationLevel(isolation_level)
+            if connection.isolation_level != self.isolation_level:
+                connection.isolation_level = self.isolation_level
+        else:
+            self.isolation_level = base.IsolationLevel.READ_COMMITTED
+        return connection
+
+    def init_connection_state(self):
+        super().init_connection_state()
+        if self.pending_statement_timeout is not None:
+            milliseconds, self.pending_statement_timeout = self.pending_statement_timeout, None
+            self.set_statement_timeout(milliseconds)
+
+    def close_if_unusable_or_obsolete(self):
+        # Called at the start and end of every request
+        self.pending_statement_timeout = None
+        super().close_if_unusable_or_obsolete()
+
+    def set_statement_timeout(self, milliseconds):
+        """
+        Statement timeout for the rest of this checkout (or the next one, if
+        no connection is open: requests that never query pay nothing)
+
+        The session setting is reset when the connection goes back to the
+        pool, so it never leaks into the next request.
+        """
+        if self.connection is None:
+            self.pending_statement_timeout = milliseconds
+            return
+        if milliseconds == self.statement_timeout and self.statement_timeout_applied:
+            return
+        with self.cursor() as cursor:
+            cursor.execute('SET statement_timeout = %s', [int(milliseconds)])
+        self.statement_timeout = milliseconds
+        self.statement_timeout_applied = True
+
+    def _rollback(self):
+        super()._rollback()
+        self.statement_timeout_applied = False
+
+    def _savepoint_rollback(self, sid):
+        super()._savepoint_rollback(sid)
+        self.statement_timeout_applied = False
+
+    def _close(self):
+        if self.connection is None:
+            return
+        connection = self.connection
+        discard = False
+        if self.statement_timeout is not None:
+            self.statement_timeout = None
+            try:
+                idle = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+                if connection.info.transaction_status != idle:
+                    connection.rollback()
+                with connection.cursor() as cursor:
+                    cursor.execute('RESET statement_timeout')
+                if connection.info.transaction_status != idle:
+                    connection.commit()
+            except psycopg2.Error:
+                discard = True
+        with self.wrap_database_errors:
+            self.pool.checkin(connection, discard=discard)
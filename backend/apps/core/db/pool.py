@@ -0,0 +1,260 @@
+"""
+Process-wide pool of psycopg2 connections
+
+Used by the ``apps.core.db.backends.postgresql_pool`` backend: Django "opens"
+a connection by checking one out of the pool and "closes" it by checking it
+back in, so with CONN_MAX_AGE = 0 every request (or thread) borrows a
+connection only for as long as it needs it and the number of Postgres
+connections stays bounded by MAX_SIZE per process.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+import psycopg2.extensions
+
+from .. import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OPTIONS = {
+    'MIN_SIZE': 2,
+    'MAX_SIZE': 10,
+    # Seconds a checkout waits for a free connection before failing
+    'TIMEOUT': 10.0,
+    # Connections are replaced after this many seconds (e.g. after a failover)
+    'MAX_LIFETIME': 1800.0,
+    # Idle connections are checked with SELECT 1 before reuse after this many seconds
+    'CHECK_IDLE_AFTER': 5.0,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """No connection became available within TIMEOUT"""
+
+
+class ConnectionPool:
+    """
+    Bounded pool with blocking checkout and health-checked reuse
+
+    Args:
+        name (str): Label used in logs and metrics (the database alias)
+        conn_params (dict): Keyword arguments of psycopg2.connect()
+        options (dict): See DEFAULT_OPTIONS
+        on_connect (callable): Called once with every new raw connection
+    """
+
+    def __init__(self, name, conn_params, options=None, on_connect=None):
+        options = {**DEFAULT_OPTIONS, **(options or {})}
+        self.name = name
+        self.conn_params = conn_params
+        self.min_size = options['MIN_SIZE']
+        self.max_size = options['MAX_SIZE']
+        self.timeout = options['TIMEOUT']
+        self.max_lifetime = options['MAX_LIFETIME']
+        self.check_idle_after = options['CHECK_IDLE_AFTER']
+        self.on_connect = on_connect
+
+        self._idle = deque()  # (connection, created_at, returned_at)
+        self._created = {}  # id(connection) -> created_at, for checked out connections
+        self._size = 0
+        self._condition = threading.Condition()
+        self.stats = {'checkouts': 0, 'waits': 0, 'timeouts': 0, 'health_check_failures': 0, 'discarded': 0}
+
+    # Connections
+
+    def _connect(self):
+        connection = psycopg2.connect(**self.conn_params)
+        if self.on_connect is not None:
+            self.on_connect(connection)
+        return connection
+
+    def _discard(self, connection):
+        self.stats['discarded'] += 1
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+    def _is_healthy(self, connection, created_at, returned_at, now):
+        if connection.closed:
+            return False
+        if now - created_at > self.max_lifetime:
+            return False
+        if now - returned_at < self.check_idle_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if connection.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            return True
+        except psycopg2.Error:
+            self.stats['health_check_failures'] += 1
+            return False
+
+    def fill(self):
+        """Open connections up to MIN_SIZE"""
+        while True:
+            with self._condition:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                connection = self._connect()
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                raise
+            now = time.monotonic()
+            with self._condition:
+                self._idle.append((connection, now, now))
+                self._condition.notify()
+            self._report()
+
+    # Checkout / checkin
+
+    def checkout(self):
+        """Borrow a healthy connection, waiting up to TIMEOUT for one"""
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        waited = False
+
+        while True:
+            candidate = None
+            create = False
+            with self._condition:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats['timeouts'] += 1
+                        metrics.observe_pool_timeout(self.name)
+                        raise PoolTimeout(
+                            f"Nessuna connessione libera nel pool '{self.name}' "
+                            f"(max {self.max_size}) entro {self.timeout}s"
+                        )
+                    waited = True
+                    self._condition.wait(remaining)
+                if self._idle:
+                    # LIFO: the most recently used connection is the least likely to be stale
+                    candidate = self._idle.pop()
+                else:
+                    self._size += 1
+                    create = True
+
+            if create:
+                try:
+                    connection = self._connect()
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+                created_at = time.monotonic()
+                break
+
+            connection, created_at, returned_at = candidate
+            if self._is_healthy(connection, created_at, returned_at, time.monotonic()):
+                break
+            self._discard(connection)
+            with self._condition:
+                self._size -= 1
+
+        with self._condition:
+            self._created[id(connection)] = created_at
+            self.stats['checkouts'] += 1
+            if waited:
+                self.stats['waits'] += 1
+        metrics.observe_pool_acquire(self.name, time.perf_counter() - started)
+        self._report()
+        return connection
+
+    def checkin(self, connection, discard=False):
+        """Return a connection; broken or mid-transaction ones are cleaned up or dropped"""
+        with self._condition:
+            created_at = self._created.pop(id(connection), None)
+        if created_at is None:
+            # Not ours (e.g. pool recreated after a fork): just close it
+            self._discard(connection)
+            return
+
+        if not discard and not connection.closed:
+            status = connection.info.transaction_status
+            try:
+                if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                    discard = True
+                elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except psycopg2.Error:
+                discard = True
+        else:
+            discard = True
+
+        with self._condition:
+            if discard:
+                self._size -= 1
+            else:
+                self._idle.append((connection, created_at, time.monotonic()))
+            self._condition.notify()
+        if discard:
+            self._discard(connection)
+        self._report()
+
+    def close(self):
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+        for connection, _, _ in idle:
+            self._discard(connection)
+        self._report()
+
+    def status(self):
+        with self._condition:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'max_size': self.max_size,
+                **self.stats,
+            }
+
+    def _report(self):
+        with self._condition:
+            size, idle = self._size, len(self._idle)
+        metrics.observe_pool_size(self.name, in_use=size - idle, idle=idle)
+
+
+def get_pool(key, name, conn_params, options=None, on_connect=None):
+    """
+    Pool for ``key`` in this process, created on first use
+
+    Pools are per process: a forked worker must not share the parent's sockets.
+    """
+    pid = os.getpid()
+    pool = _pools.get(key)
+    if pool is not None and pool[0] == pid:
+        return pool[1]
+
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool[0] != pid:
+            pool = (pid, ConnectionPool(name, conn_params, options, on_connect))
+            _pools[key] = pool
+            try:
+                pool[1].fill()
+            except psycopg2.Error:
+                logger.warning("Impossibile aprire le connessioni minime del pool '%s'", name, exc_info=True)
+    return pool[1]
+
+
+def pool_status():
+    """Status of every pool of this process"""
+    pid = os.getpid()
+    return {pool.name: pool.status() for owner, pool in _pools.values() if owner == pid}
@@ -0,0 +1,148 @@
+"""
+Per-request read-replica routing state
+
+ReplicaRoutingMiddleware marks safe read-only requests (the URL names in
+REPLICA_READ_VIEWS) as replica-eligible; ReplicaRouter then sends their reads
+to a replica, unless:
+
+- the request, or a recent request of the same client (REPLICA_PIN_SECONDS),
+  wrote to the primary, so that clients always read their own writes;
+- every replica lags behind the primary more than REPLICA_MAX_LAG seconds.
+
+Scripts and reports can opt in explicitly with ``with use_replica(): ...``.
+"""
+
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import jwt
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+_state = ContextVar('replica_routing', default=None)
+
+# alias -> (checked at, healthy), refreshed every REPLICA_LAG_CHECK_INTERVAL seconds
+_health = {}
+
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+class RoutingState:
+    """Routing decisions of one request (or use_replica() block)"""
+    __slots__ = ('use_replica', 'wrote', 'alias')
+
+    def __init__(self, use_replica=False):
+        self.use_replica = use_replica
+        self.wrote = False
+        self.alias = None
+
+
+def replica_aliases():
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+def current():
+    return _state.get()
+
+
+def bind(state):
+    return _state.set(state)
+
+
+def unbind(token):
+    _state.reset(token)
+
+
+@contextmanager
+def use_replica():
+    """Route the reads of the enclosed block to a replica (if any is healthy)"""
+    token = bind(RoutingState(use_replica=True))
+    try:
+        yield
+    finally:
+        unbind(token)
+
+
+def replica_lag(alias):
+    """Replication delay of a replica in seconds"""
+    with connections[alias].cursor() as cursor:
+        cursor.execute(LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+def is_healthy(alias):
+    """Whether the replica is reachable and within REPLICA_MAX_LAG, cached per process"""
+    now = time.monotonic()
+    checked_at, healthy = _health.get(alias, (None, False))
+    if checked_at is not None and now - checked_at < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return healthy
+
+    try:
+        lag = replica_lag(alias)
+        healthy = lag <= settings.REPLICA_MAX_LAG
+        if not healthy:
+            logger.warning("Replica %s in ritardo di %.1fs, letture sul primario", alias, lag)
+    except DatabaseError:
+        logger.warning("Replica %s non raggiungibile, letture sul primario", alias, exc_info=True)
+        healthy = False
+    _health[alias] = (now, healthy)
+    return healthy
+
+
+def choose_replica(state):
+    """
+    Replica serving the reads of this request, or None for the primary
+
+    The choice is kept for the whole request so that its reads see a
+    consistent snapshot.
+    """
+    if state.alias is None:
+        aliases = replica_aliases()
+        healthy = [alias for alias in random.sample(aliases, len(aliases)) if is_healthy(alias)]
+        state.alias = healthy[0] if healthy else 'default'
+    return None if state.alias == 'default' else state.alias
+
+
+# Read-your-writes pinning
+
+def client_key(request):
+    """
+    Identify the client across requests: user id claim of the bearer token,
+    or the session key. The token is not verified here, DRF does it in the
+    view; a forged token can at most pin a client to the primary.
+    """
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if header.startswith('Bearer '):
+        try:
+            claims = jwt.decode(header[7:], options={'verify_signature': False})
+        except jwt.InvalidTokenError:
+            return None
+        user_id = claims.get(settings.SIMPLE_JWT.get('USER_ID_CLAIM', 'user_id'))
+        return f'user:{user_id}' if user_id is not None else None
+
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    return f'session:{session_key}' if session_key else None
+
+
+def _pin_key(client):
+    return f'replica-pin:{client}'
+
+
+def pin_to_primary(client):
+    cache.set(_pin_key(client), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(client):
+    return bool(cache.get(_pin_key(client)))
@@ -0,0 +1,37 @@
+"""
+Database routers
+"""
+
+from . import replicas
+
+
+class ReplicaRouter:
+    """
+    Writes always go to ``default``; reads go to a replica only inside a
+    replica-eligible request or block (see apps/core/db/replicas.py)
+    """
+
+    def db_for_read(self, model, **hints):
+        state = replicas.current()
+        if state is None or not state.use_replica or state.wrote:
+            return None
+        return replicas.choose_replica(state)
+
+    def db_for_write(self, model, **hints):
+        state = replicas.current()
+        if state is not None:
+            # Later reads of the request (and of the client, for a while)
+            # must see this write
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *replicas.replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replicas.replica_aliases():
+            return False
+        return None
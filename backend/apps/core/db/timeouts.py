@@ -0,0 +1,28 @@
+"""
+Postgres statement timeouts of API requests
+
+DB_STATEMENT_TIMEOUTS maps URL names to milliseconds, with 'default' for
+every other route (0: no timeout). Only the pooled backend supports them: it
+sends the SET with the first query after the value changes and resets it when
+the connection goes back to the pool. Elsewhere these are no-ops.
+"""
+
+from django.conf import settings
+from django.db import connections
+
+
+def timeout_for(url_name):
+    """Statement timeout of the route named ``url_name`` (milliseconds, 0 for none)"""
+    timeouts = getattr(settings, 'DB_STATEMENT_TIMEOUTS', {})
+    return timeouts.get(url_name) or timeouts.get('default') or 0
+
+
+def set_statement_timeout(milliseconds):
+    """Statement timeout for the rest of the current request, on every alias"""
+    if not milliseconds:
+        return
+    # Replicas included: exports may be read from one
+    for alias in settings.DATABASES:
+        connection = connections[alias]
+        if hasattr(connection, 'set_statement_timeout'):
+            connection.set_statement_timeout(milliseconds)
@@ -0,0 +1,326 @@
+"""
+Read-only fast path for ModelSerializer output
+
+DRF serializers run a Field object, attribute lookups and to_representation
+per field and per row. For large read-only pages FastSerializer compiles the
+serializer's fields once into column accessors over ``values_list()`` rows
+and builds the output dicts directly. The output is the same, field for
+field; ``python -m benchmarks serializers`` checks the rendered bytes of both
+paths and measures rows per second.
+
+Only fields whose representation is known to be a plain copy or one of the
+conversions below are compiled, anything else raises ImproperlyConfigured
+instead of silently diverging; SerializerMethodField and custom fields are
+given explicitly through ``computed``.
+
+``subset()`` compiles the same serializer restricted to some fields (sparse
+fieldsets, see apps/core/fieldsets.py): only their columns are fetched and
+nested relations that are left out are not queried at all.
+"""
+
+import time
+from operator import itemgetter
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import fields as drf_fields
+from rest_framework.response import Response
+from rest_framework.serializers import ListSerializer
+from rest_framework.settings import api_settings
+
+from . import metrics
+
+# to_representation methods returning the database value unchanged
+_PLAIN = {
+    drf_fields.CharField.to_representation,
+    drf_fields.IntegerField.to_representation,
+    drf_fields.BooleanField.to_representation,
+    drf_fields.ReadOnlyField.to_representation,
+    drf_fields.JSONField.to_representation,
+}
+
+# Subsets kept compiled per FastSerializer; other shapes are compiled per request
+MAX_SUBSETS = 64
+
+
+def _freeze(selection):
+    """Hashable form of a field selection"""
+    if selection is None:
+        return None
+    return tuple((name, _freeze(nested)) for name, nested in selection.items())
+
+
+def _is_exactly(field, base):
+    """``field`` is a ``base`` whose representation was not customised"""
+    return isinstance(field, base) and type(field).to_representation is base.to_representation
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None:
+        return None
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+
+    def convert(value):
+        if field_timezone is not None:
+            if timezone.is_aware(value):
+                value = value.astimezone(field_timezone)
+            else:
+                value = timezone.make_aware(value, field_timezone)
+        if output_format.lower() == drf_fields.ISO_8601:
+            value = value.isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return value.strftime(output_format)
+    return convert
+
+
+def _date_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+    if output_format is None:
+        return None
+    if output_format.lower() == drf_fields.ISO_8601:
+        return lambda value: value.isoformat()
+    return lambda value: value.strftime(output_format)
+
+
+def _file_converter(field, model_field, context):
+    storage = model_field.storage
+    if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+        return lambda name: name
+    request = context.get('request')
+    if request is None:
+        return storage.url
+    return lambda name: request.build_absolute_uri(storage.url(name))
+
+
+class Nested:
+    """
+    Many-to-many relation rendered with another FastSerializer
+
+    Rows are fetched with one query on the through table and one on the
+    related model, in the related model's default ordering like
+    ``obj.relation.all()``. With ``ids_only`` the related model is not
+    queried and the relation renders as a list of primary keys.
+    """
+
+    def __init__(self, relation, serializer):
+        self.relation = relation
+        self.serializer = serializer
+
+    def fetch(self, model, ids, context, ids_only=False):
+        """
+        Returns:
+            dict: {source pk: [representation or pk, ...]}
+        """
+        field = model._meta.get_field(self.relation)
+        through = field.remote_field.through
+        source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+        related = field.related_model
+
+        ordering = [
+            f'-{target}__{name[1:]}' if name.startswith('-') else f'{target}__{name}'
+            for name in related._meta.ordering
+        ]
+        pairs = list(
+            through.objects.filter(**{f'{source}__in': ids})
+            .order_by(*ordering, 'pk')
+            .values_list(f'{source}_id', f'{target}_id')
+        )
+        if ids_only:
+            grouped = {}
+            for source_id, target_id in pairs:
+                grouped.setdefault(source_id, []).append(target_id)
+            return grouped
+
+        targets = {pair[1] for pair in pairs}
+        rendered = {}
+        if targets:
+            rows = list(self.serializer.rows(related._default_manager.filter(pk__in=targets)))
+            for row, item in zip(rows, self.serializer.serialize(rows, context)):
+                rendered[row[0]] = item
+
+        grouped = {}
+        for source_id, target_id in pairs:
+            grouped.setdefault(source_id, []).append(rendered[target_id])
+        return grouped
+
+
+class FastSerializer:
+    """
+    Compiled, read-only equivalent of a ModelSerializer
+
+    Args:
+        serializer_class: The ModelSerializer to reproduce
+        computed (dict): {field name: (columns, factory)} for fields that
+            cannot be compiled; ``factory(context)`` returns a function
+            taking the column values
+        nested (dict): {field name: Nested} for many-to-many relations
+        selection (dict): {field name: selection of the nested relation or
+            None for all of it} to render, None for every field
+        collapsed: Nested relations rendered as lists of primary keys
+    """
+
+    def __init__(self, serializer_class, computed=None, nested=None, selection=None, collapsed=()):
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        self.computed = computed or {}
+        self.nested = nested or {}
+        self.selection = selection
+        self.collapsed = frozenset(collapsed)
+        self._plan = None
+        self._subsets = {}
+
+    def _compile(self):
+        """Columns to fetch and, per output field, how to produce it"""
+        serializer = self.serializer_class()
+        columns = ['pk']
+        plan = []
+
+        def column(name):
+            if name == self.model._meta.pk.name:
+                name = 'pk'
+            if name not in columns:
+                columns.append(name)
+            return columns.index(name)
+
+        for name, field in serializer.fields.items():
+            if field.write_only or (self.selection is not None and name not in self.selection):
+                continue
+            if name in self.computed:
+                sources, factory = self.computed[name]
+                plan.append((name, 'computed', [column(source) for source in sources], factory))
+            elif name in self.nested:
+                nested = self.nested[name]
+                if name in self.collapsed:
+                    plan.append((name, 'ids', None, nested))
+                    continue
+                if self.selection is not None and self.selection[name] is not None:
+                    nested = Nested(nested.relation, nested.serializer.subset(self.selection[name]))
+                plan.append((name, 'nested', None, nested))
+            elif isinstance(field, ListSerializer):
+                raise ImproperlyConfigured(f"{name}: le relazioni annidate vanno dichiarate in 'nested'")
+            elif _is_exactly(field, drf_fields.DateTimeField):
+                plan.append((name, 'convert', column(field.source), lambda context, f=field: _datetime_converter(f)))
+            elif _is_exactly(field, drf_fields.DateField):
+                plan.append((name, 'convert', column(field.source), lambda context, f=field: _date_converter(f)))
+            elif _is_exactly(field, drf_fields.FileField):
+                model_field = self.model._meta.get_field(field.source)
+                plan.append((
+                    name, 'convert', column(field.source),
+                    lambda context, f=field, m=model_field: _file_converter(f, m, context),
+                ))
+            elif type(field).to_representation in _PLAIN:
+                plan.append((name, 'plain', column(field.source), None))
+            elif isinstance(field, drf_fields.ChoiceField) and all(isinstance(key, str) for key in field.choices):
+                plan.append((name, 'plain', column(field.source), None))
+            else:
+                raise ImproperlyConfigured(
+                    f"{self.serializer_class.__name__}.{name} ({type(field).__name__}) "
+                    f"non ha un equivalente compilato: usare 'computed'"
+                )
+        return columns, plan
+
+    @property
+    def columns(self):
+        if self._plan is None:
+            self._plan = self._compile()
+        return self._plan[0]
+
+    def subset(self, selection=None, collapsed=()):
+        """
+        This serializer restricted to some fields
+
+        Args:
+            selection (dict): {field name: selection of the nested relation
+                or None}, None for every field
+            collapsed: Nested relations rendered as lists of primary keys
+
+        Returns:
+            FastSerializer: Compiled once per shape (up to MAX_SUBSETS)
+        """
+        key = (_freeze(selection), frozenset(collapsed))
+        if key == (None, frozenset()):
+            return self
+        subset = self._subsets.get(key)
+        if subset is None:
+            subset = FastSerializer(self.serializer_class, self.computed, self.nested, selection, collapsed)
+            if len(self._subsets) < MAX_SUBSETS:
+                self._subsets[key] = subset
+        return subset
+
+    def rows(self, queryset, *extra):
+        """
+        ``queryset`` as the values_list rows ``serialize`` expects
+
+        Args:
+            extra: Columns appended after the serializer's, ignored by ``serialize``
+        """
+        return queryset.values_list(*self.columns, *extra)
+
+    def _accessors(self, context, nested_values):
+        accessors = []
+        for name, kind, index, extra in self._plan[1]:
+            if kind == 'plain':
+                accessors.append((name, itemgetter(index)))
+            elif kind == 'convert':
+                convert = extra(context)
+                if convert is None:
+                    accessors.append((name, itemgetter(index)))
+                else:
+                    # Like the DRF fields: empty values render as None
+                    accessors.append((name, lambda row, i=index, c=convert: c(row[i]) if row[i] else None))
+            elif kind == 'computed':
+                function = extra(context)
+                accessors.append((name, lambda row, i=index, f=function: f(*(row[j] for j in i))))
+            else:
+                values = nested_values.get(name, {})
+                accessors.append((name, lambda row, v=values: v.get(row[0], [])))
+        return accessors
+
+    def serialize(self, rows, context=None):
+        """
+        Args:
+            rows: Rows from ``rows()`` (a queryset or a page of it)
+            context (dict): Serializer context ('request' for absolute URLs)
+
+        Returns:
+            list: One dict per row, as the serializer would render it
+        """
+        context = context or {}
+        self.columns  # Compile the plan on first use
+        rows = list(rows)
+        nested_values = {}
+        if rows:
+            ids = [row[0] for row in rows]
+            for name, kind, index, nested in self._plan[1]:
+                if kind in ('nested', 'ids'):
+                    nested_values[name] = nested.fetch(self.model, ids, context, ids_only=kind == 'ids')
+
+        current = metrics.current()
+        started = time.perf_counter()
+        accessors = self._accessors(context, nested_values)
+        data = [{name: get(row) for name, get in accessors} for row in rows]
+        if current is not None and not current.serialize_depth:
+            current.serialize_time += time.perf_counter() - started
+        return data
+
+
+class FastListMixin:
+    """
+    ``list`` action rendered through ``fast_serializer`` instead of the
+    serializer class; the other actions are left untouched
+    """
+    fast_serializer = None
+
+    def get_fast_serializer(self):
+        return self.fast_serializer
+
+    def list(self, request, *args, **kwargs):
+        fast_serializer = self.get_fast_serializer()
+        rows = fast_serializer.rows(self.filter_queryset(self.get_queryset()))
+        context = self.get_serializer_context()
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(fast_serializer.serialize(page, context))
+        return Response(fast_serializer.serialize(rows, context))
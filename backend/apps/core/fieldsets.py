@@ -0,0 +1,198 @@
+"""
+Sparse fieldsets on read endpoints
+
+Clients shape the response with query parameters:
+
+- ``fields=id,full_name``: only these fields
+- ``omit=work_areas,phone``: every field but these
+- ``expand=work_areas``: relations rendered as nested objects; when the
+  parameter is given, the relations not listed render as lists of ids
+
+Nested fields are addressed with a dot (``fields=id,work_areas.name``,
+``omit=work_areas.description``); selecting nested fields expands the
+relation. Without any parameter the response is unchanged.
+
+On the compiled list/sync path (FastSerializer) the selection shrinks the
+columns fetched and relations left out are not queried; on ``retrieve`` the
+serializer fields are trimmed, so relations left out are not queried either.
+The single object of ``retrieve`` is still read whole: permissions, the ETag
+and updates work on the full instance from ``get_object``.
+"""
+
+from functools import lru_cache
+
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+FIELDSET_PARAMETERS = [
+    OpenApiParameter('fields', str, description="Campi da restituire, separati da virgola (es. id,full_name)"),
+    OpenApiParameter('omit', str, description="Campi da escludere, separati da virgola"),
+    OpenApiParameter(
+        'expand', str,
+        description="Relazioni da restituire come oggetti; le altre come elenco di id",
+    ),
+]
+
+
+def _nested_serializer(field):
+    if isinstance(field, serializers.ListSerializer):
+        field = field.child
+    return field if isinstance(field, serializers.Serializer) else None
+
+
+def _tree(serializer):
+    tree = {}
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        nested = _nested_serializer(field)
+        tree[name] = _tree(nested) if nested is not None else None
+    return tree
+
+
+@lru_cache(maxsize=None)
+def field_tree(serializer_class):
+    """
+    Returns:
+        dict: {readable field name: tree of the nested serializer or None}
+    """
+    return _tree(serializer_class())
+
+
+def _paths(value):
+    return [tuple(part.strip() for part in item.split('.')) for item in value.split(',') if item.strip()]
+
+
+def _check(tree, path, invalid, prefix):
+    name = path[0]
+    if name not in tree or (len(path) > 1 and tree[name] is None):
+        invalid.append(prefix + '.'.join(path))
+        return False
+    return True
+
+
+def _select(tree, fields, omit, invalid, prefix=''):
+    """
+    Args:
+        tree (dict): From ``field_tree``
+        fields (list): Paths to keep, None for every field
+        omit (list): Paths to drop
+        invalid (list): Collects the unknown paths
+
+    Returns:
+        dict: {field name: selection of the nested relation or None for
+        all of it}, in the serializer order
+    """
+    wanted = None
+    if fields is not None:
+        wanted = {}
+        for path in fields:
+            if not _check(tree, path, invalid, prefix):
+                continue
+            if len(path) == 1:
+                wanted[path[0]] = None
+            elif wanted.get(path[0], []) is not None:
+                wanted.setdefault(path[0], []).append(path[1:])
+
+    dropped, nested_omit = set(), {}
+    for path in omit:
+        if not _check(tree, path, invalid, prefix):
+            continue
+        if len(path) == 1:
+            dropped.add(path[0])
+        else:
+            nested_omit.setdefault(path[0], []).append(path[1:])
+
+    selection = {}
+    for name, subtree in tree.items():
+        if (wanted is not None and name not in wanted) or name in dropped:
+            continue
+        nested_fields = wanted[name] if wanted is not None else None
+        if subtree is None or (nested_fields is None and name not in nested_omit):
+            selection[name] = None
+        else:
+            selection[name] = _select(
+                subtree, nested_fields, nested_omit.get(name, []), invalid, f'{prefix}{name}.'
+            )
+    return selection
+
+
+def parse_fieldset(request, serializer_class):
+    """
+    Fieldset requested through the query parameters
+
+    Returns:
+        tuple: (selection, collapsed relations); selection is None when
+        every field is requested
+
+    Raises:
+        ValidationError: Unknown fields or relations
+    """
+    params = request.query_params
+    fields, omit, expand = params.get('fields'), params.get('omit'), params.get('expand')
+    tree = field_tree(serializer_class)
+
+    invalid = []
+    selection = None
+    if fields or omit:
+        selection = _select(tree, _paths(fields) if fields else None, _paths(omit or ''), invalid)
+    if invalid:
+        raise ValidationError({'fields': [f"Campo sconosciuto: {path}" for path in invalid]})
+
+    collapsed = set()
+    if expand is not None:
+        expanded = set()
+        for path in _paths(expand):
+            if len(path) > 1 or tree.get(path[0], None) is None:
+                invalid.append('.'.join(path))
+            else:
+                expanded.add(path[0])
+        if invalid:
+            raise ValidationError({'expand': [f"Relazione sconosciuta: {path}" for path in invalid]})
+        collapsed = {
+            name for name, subtree in tree.items()
+            if subtree is not None and name not in expanded
+            # Nested fields requested: the relation is expanded
+            and not (selection is not None and selection.get(name) is not None)
+        }
+    return selection, collapsed
+
+
+def trim_serializer(serializer, selection, collapsed=()):
+    """Drop the fields outside ``selection`` and collapse relations to ids"""
+    for name, field in list(serializer.fields.items()):
+        if field.write_only:
+            continue
+        if selection is not None and name not in selection:
+            del serializer.fields[name]
+        elif name in collapsed:
+            serializer.fields[name] = serializers.PrimaryKeyRelatedField(
+                many=True, read_only=True,
+                **({'source': field.source} if field.source != name else {})
+            )
+        elif selection is not None and selection[name] is not None:
+            trim_serializer(_nested_serializer(field), selection[name])
+
+
+class SparseFieldsMixin:
+    """
+    ``fields``/``omit``/``expand`` query parameters on the list and sync
+    actions (compiled through ``fast_serializer``, see FastListMixin) and on
+    ``retrieve``
+    """
+
+    def get_fieldset(self, serializer_class):
+        return parse_fieldset(self.request, serializer_class)
+
+    def get_fast_serializer(self):
+        fast_serializer = super().get_fast_serializer()
+        selection, collapsed = self.get_fieldset(fast_serializer.serializer_class)
+        return fast_serializer.subset(selection, collapsed)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.action == 'retrieve':
+            selection, collapsed = self.get_fieldset(type(serializer))
+            trim_serializer(serializer, selection, collapsed)
+        return serializer
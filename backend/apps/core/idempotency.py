@@ -0,0 +1,213 @@
+"""
+Idempotency-Key support for write endpoints
+
+Clients retry a POST when the connection drops before the response arrives.
+With an ``Idempotency-Key`` header (any unique string, e.g. a UUID generated
+per operation) the first response is stored in the cache and every retry
+with the same key gets it back, marked ``Idempotent-Replayed: true``,
+instead of running the operation again.
+
+One cache entry per key, scoped to the user, method and path:
+
+- ``cache.add`` of a pending record is the lock: only one request runs, a
+  concurrent duplicate polls until the response is stored (or answers 409
+  after IDEMPOTENCY_WAIT_SECONDS)
+- the stored record replaces the pending one for IDEMPOTENCY_TTL seconds
+- a fingerprint of the body tells a retry from a different request reusing
+  the key (422)
+
+The first request pays one ``add`` and one ``set``, a retry one ``add`` and
+one ``get``. Exceptions and 5xx responses are not stored: the key is released
+and a retry runs again. Without the header nothing changes.
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import UploadedFile
+from django.http import HttpResponse, StreamingHttpResponse
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.05
+
+_PENDING = 'pending'
+
+IDEMPOTENCY_PARAMETER = OpenApiParameter(
+    HEADER, str, OpenApiParameter.HEADER,
+    description=(
+        "Chiave univoca dell'operazione: i tentativi ripetuti con la stessa chiave "
+        "ricevono la prima risposta senza eseguirla di nuovo"
+    ),
+)
+
+
+class IdempotencyConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Una richiesta con la stessa Idempotency-Key è ancora in corso, riprovare più tardi"
+    default_code = 'idempotency_conflict'
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "Idempotency-Key già usata per una richiesta diversa"
+    default_code = 'idempotency_key_reused'
+
+
+def _update(digest, value):
+    if isinstance(value, UploadedFile):
+        for chunk in value.chunks():
+            digest.update(chunk)
+        value.seek(0)
+    else:
+        digest.update(json.dumps(value, sort_keys=True, default=str).encode())
+
+
+def fingerprint(request):
+    """Digest of the request body (uploaded files included)"""
+    digest = hashlib.sha256()
+    data = request.data
+    if hasattr(data, 'lists'):
+        for name, values in sorted(data.lists(), key=lambda item: item[0]):
+            digest.update(name.encode())
+            for value in values:
+                _update(digest, value)
+    else:
+        _update(digest, data)
+    return digest.hexdigest()
+
+
+def cache_key(request, key):
+    scope = f'{request.user.pk}|{request.method}|{request.path}|{key}'
+    return 'idempotency:' + hashlib.sha256(scope.encode()).hexdigest()
+
+
+def _request_key(request):
+    """
+    Returns:
+        str: The Idempotency-Key header, None when absent
+
+    Raises:
+        ValidationError: Key too long
+    """
+    key = request.headers.get(HEADER)
+    if key is not None and not 0 < len(key) <= MAX_KEY_LENGTH:
+        raise ValidationError({HEADER: f"Deve essere lunga da 1 a {MAX_KEY_LENGTH} caratteri"})
+    return key
+
+
+def _claim(key, request_fingerprint):
+    """
+    Take the key or read its record
+
+    Returns:
+        dict: None when this request now holds the key, else the record
+        found (pending or stored)
+    """
+    pending = {'state': _PENDING, 'fingerprint': request_fingerprint}
+    if cache.add(key, pending, settings.IDEMPOTENCY_LOCK_TIMEOUT):
+        return None
+    record = cache.get(key)
+    if record is None:
+        # Released (or expired) in the meantime: try once more
+        return None if cache.add(key, pending, settings.IDEMPOTENCY_LOCK_TIMEOUT) else cache.get(key)
+    return record
+
+
+def _store(key, request_fingerprint, response):
+    """Keep ``response`` for the retries, or release the key"""
+    if response.status_code >= 500 or isinstance(response, StreamingHttpResponse):
+        cache.delete(key)
+        return
+    record = {'state': 'done', 'fingerprint': request_fingerprint, 'status': response.status_code}
+    if isinstance(response, Response):
+        record['data'] = response.data
+    else:
+        record['content'] = response.content
+        record['content_type'] = response['Content-Type']
+    cache.set(key, record, settings.IDEMPOTENCY_TTL)
+
+
+def _replay(record, request_fingerprint):
+    if record['fingerprint'] != request_fingerprint:
+        raise IdempotencyKeyReused()
+    if 'data' in record:
+        response = Response(record['data'], status=record['status'])
+    else:
+        response = HttpResponse(record['content'], status=record['status'], content_type=record['content_type'])
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def idempotent(handler):
+    """
+    Decorator for the POST handler of a view (sync or async) honouring the
+    Idempotency-Key header
+    """
+    if asyncio.iscoroutinefunction(handler):
+        @functools.wraps(handler)
+        async def async_wrapper(view, request, *args, **kwargs):
+            key = _request_key(request)
+            if key is None:
+                return await handler(view, request, *args, **kwargs)
+            key = cache_key(request, key)
+            request_fingerprint = await sync_to_async(fingerprint)(request)
+
+            deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+            while True:
+                record = await sync_to_async(_claim)(key, request_fingerprint)
+                if record is None:
+                    break
+                if record['fingerprint'] != request_fingerprint or record['state'] != _PENDING:
+                    return _replay(record, request_fingerprint)
+                if time.monotonic() >= deadline:
+                    raise IdempotencyConflict()
+                await asyncio.sleep(POLL_INTERVAL)
+
+            try:
+                response = await handler(view, request, *args, **kwargs)
+            except BaseException:
+                await sync_to_async(cache.delete)(key)
+                raise
+            await sync_to_async(_store)(key, request_fingerprint, response)
+            return response
+        return async_wrapper
+
+    @functools.wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        key = _request_key(request)
+        if key is None:
+            return handler(view, request, *args, **kwargs)
+        key = cache_key(request, key)
+        request_fingerprint = fingerprint(request)
+
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            record = _claim(key, request_fingerprint)
+            if record is None:
+                break
+            if record['fingerprint'] != request_fingerprint or record['state'] != _PENDING:
+                return _replay(record, request_fingerprint)
+            if time.monotonic() >= deadline:
+                raise IdempotencyConflict()
+            time.sleep(POLL_INTERVAL)
+
+        try:
+            response = handler(view, request, *args, **kwargs)
+        except BaseException:
+            cache.delete(key)
+            raise
+        _store(key, request_fingerprint, response)
+        return response
+    return wrapper
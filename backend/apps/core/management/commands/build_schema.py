@@ -0,0 +1,25 @@
+"""
+Generate the OpenAPI schema artifacts served by api/schema/
+
+Run at build or deploy time (see the Dockerfile), after any API change:
+
+    python manage.py build_schema
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.core.schema import build_schema
+
+
+class Command(BaseCommand):
+    help = "Genera lo schema OpenAPI (YAML e JSON) servito da api/schema/"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output-dir',
+            help="Cartella di destinazione (default: API_SCHEMA_DIR)",
+        )
+
+    def handle(self, *args, **options):
+        for path in build_schema(options['output_dir']):
+            self.stdout.write(self.style.SUCCESS(f"Schema scritto in {path}"))
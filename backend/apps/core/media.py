@@ -0,0 +1,155 @@
+"""
+Media file delivery
+
+Django only decides whether a file may be served. With MEDIA_DELIVERY set to
+'x-accel' (nginx) or 'x-sendfile' (Apache, lighttpd, Caddy) the transfer is
+handed to the front proxy, which also takes care of ranges and conditional
+requests. With 'django' the file is served by FileResponse: whole files use
+the server's zero-copy wsgi.file_wrapper, single byte ranges and
+If-None-Match / If-Modified-Since are handled here.
+
+nginx configuration for 'x-accel' (MEDIA_ACCEL_PREFIX = '/protected-media/'):
+
+    location /protected-media/ {
+        internal;
+        alias /app/media/;
+    }
+"""
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def access_rule(path):
+    """Access rule ('public', 'authenticated' or 'admin') of a media path"""
+    for prefix, rule in settings.MEDIA_ACCESS.items():
+        if path.startswith(prefix):
+            return rule
+    return settings.MEDIA_DEFAULT_ACCESS
+
+
+def file_etag(stat):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range ``Range`` header
+
+    Returns:
+        tuple: (start, end) inclusive, None to serve the whole file, or
+            False if the range cannot be satisfied
+    """
+    match = _RANGE.match(header.strip()) if header else None
+    if match is None:
+        # Missing, malformed or multi-range: the whole file is a valid answer
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+class RangeFile:
+    """Read-only view of ``length`` bytes of a file starting at ``start``"""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _set_common_headers(response, path, stat, etag, cache_control):
+    content_type, encoding = mimetypes.guess_type(path)
+    response['Content-Type'] = content_type or 'application/octet-stream'
+    if encoding:
+        # e.g. .gz files are served as they are, never decompressed by the client
+        response['Content-Type'] = 'application/octet-stream'
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    response['Accept-Ranges'] = 'bytes'
+    response['X-Content-Type-Options'] = 'nosniff'
+
+
+def serve_file(request, path, cache_control):
+    """
+    Response delivering MEDIA_ROOT/``path`` (already checked to exist)
+
+    Args:
+        path (str): Normalised path relative to MEDIA_ROOT
+        cache_control (str): Cache-Control header value
+    """
+    full_path = os.path.join(settings.MEDIA_ROOT, path)
+    stat = os.stat(full_path)
+    etag = file_etag(stat)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if not_modified is not None:
+        not_modified['Cache-Control'] = cache_control
+        return not_modified
+
+    delivery = settings.MEDIA_DELIVERY
+    if delivery in ('x-accel', 'x-sendfile'):
+        response = HttpResponse()
+        _set_common_headers(response, path, stat, etag, cache_control)
+        if delivery == 'x-accel':
+            response['X-Accel-Redirect'] = quote(settings.MEDIA_ACCEL_PREFIX + path)
+        else:
+            response['X-Sendfile'] = full_path
+        return response
+
+    byte_range = None
+    if request.method in ('GET', 'HEAD'):
+        # If-Range: only honour the range if the client's copy is current
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if not if_range or if_range == etag or parse_http_date_safe(if_range) == int(stat.st_mtime):
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), stat.st_size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+
+    file = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(RangeFile(file, start, length), status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Content-Length'] = str(length)
+    _set_common_headers(response, path, stat, etag, cache_control)
+    return response
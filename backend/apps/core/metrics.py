@@ -0,0 +1,188 @@
+"""
+Per-request instrumentation
+
+RequestMetricsMiddleware binds a RequestMetrics to the current context; the
+database wrapper, the instrumented cache backends and TimedSerializerMixin add
+to it while the request is served. At the end of the request the numbers are
+sent as a Server-Timing header and aggregated into Prometheus histograms
+labelled by the resolved URL name.
+
+prometheus_client is optional: without it only the header is produced.
+"""
+
+import os
+import time
+from contextvars import ContextVar
+
+try:
+    import prometheus_client
+except ImportError:  # pragma: no cover - optional dependency
+    prometheus_client = None
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Counters collected while a single request is served"""
+    __slots__ = (
+        'started', 'db_time', 'db_queries', 'cache_hits', 'cache_misses',
+        'serialize_time', 'serialize_depth',
+    )
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.serialize_time = 0.0
+        self.serialize_depth = 0
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        """connection.execute_wrapper() hook timing every query"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.db_queries += 1
+
+    def server_timing(self, total):
+        """Value of the Server-Timing header (durations in milliseconds)"""
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_queries} queries"',
+            f'cache;desc="hit={self.cache_hits} miss={self.cache_misses}"',
+            f'serialize;dur={self.serialize_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+def start_request():
+    """Bind fresh metrics to the current context, returns (metrics, token)"""
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def current():
+    """Metrics of the request being served, or None outside a request"""
+    return _current.get()
+
+
+def record_cache(hits=0, misses=0):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+class TimedSerializerMixin:
+    """
+    Serializer mixin adding representation time to the request metrics
+
+    Only the outermost serializer is timed, nested serializers are part of it.
+    """
+
+    def to_representation(self, instance):
+        metrics = _current.get()
+        if metrics is None or metrics.serialize_depth:
+            return super().to_representation(instance)
+
+        metrics.serialize_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serialize_time += time.perf_counter() - started
+            metrics.serialize_depth -= 1
+
+
+if prometheus_client is not None:
+    LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+
+    REQUEST_DURATION = prometheus_client.Histogram(
+        'http_request_duration_seconds', 'Total time to serve the request',
+        ['view', 'method'], buckets=LATENCY_BUCKETS,
+    )
+    DB_DURATION = prometheus_client.Histogram(
+        'http_request_db_duration_seconds', 'Time spent in database queries per request',
+        ['view'], buckets=LATENCY_BUCKETS,
+    )
+    DB_QUERIES = prometheus_client.Histogram(
+        'http_request_db_queries', 'Database queries per request',
+        ['view'], buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+    )
+    SERIALIZE_DURATION = prometheus_client.Histogram(
+        'http_request_serialize_duration_seconds', 'Serializer time per request',
+        ['view'], buckets=LATENCY_BUCKETS,
+    )
+    CACHE_REQUESTS = prometheus_client.Counter(
+        'http_request_cache_total', 'Cache lookups made while serving requests',
+        ['view', 'result'],
+    )
+    POOL_ACQUIRE_DURATION = prometheus_client.Histogram(
+        'db_pool_acquire_seconds', 'Time to check a connection out of the pool',
+        ['alias'], buckets=(.0001, .0005, .001, .005, .01, .05, .1, .5, 1, 5, 10),
+    )
+    POOL_TIMEOUTS = prometheus_client.Counter(
+        'db_pool_timeouts_total', 'Checkouts failed because the pool was exhausted',
+        ['alias'],
+    )
+    POOL_CONNECTIONS = prometheus_client.Gauge(
+        'db_pool_connections', 'Pooled database connections by state',
+        ['alias', 'state'], multiprocess_mode='livesum',
+    )
+
+
+def observe(view, method, metrics, total):
+    """Aggregate the metrics of a finished request into the histograms"""
+    if prometheus_client is None:
+        return
+
+    REQUEST_DURATION.labels(view, method).observe(total)
+    DB_DURATION.labels(view).observe(metrics.db_time)
+    DB_QUERIES.labels(view).observe(metrics.db_queries)
+    SERIALIZE_DURATION.labels(view).observe(metrics.serialize_time)
+    if metrics.cache_hits:
+        CACHE_REQUESTS.labels(view, 'hit').inc(metrics.cache_hits)
+    if metrics.cache_misses:
+        CACHE_REQUESTS.labels(view, 'miss').inc(metrics.cache_misses)
+
+
+def observe_pool_acquire(alias, seconds):
+    if prometheus_client is not None:
+        POOL_ACQUIRE_DURATION.labels(alias).observe(seconds)
+
+
+def observe_pool_timeout(alias):
+    if prometheus_client is not None:
+        POOL_TIMEOUTS.labels(alias).inc()
+
+
+def observe_pool_size(alias, in_use, idle):
+    if prometheus_client is not None:
+        POOL_CONNECTIONS.labels(alias, 'in_use').set(in_use)
+        POOL_CONNECTIONS.labels(alias, 'idle').set(idle)
+
+
+def render_latest():
+    """
+    Current metrics in the Prometheus text format
+
+    Returns:
+        tuple: (payload bytes, content type)
+    """
+    from prometheus_client import CollectorRegistry, generate_latest, CONTENT_TYPE_LATEST
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        # Several gunicorn workers: merge the per-process files
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
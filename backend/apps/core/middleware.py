@@ -0,0 +1,417 @@
+"""
+Middleware shared by all apps
+"""
+
+import asyncio
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from . import compression, metrics
+from .db import replicas
+from .db.timeouts import set_statement_timeout, timeout_for
+
+
+class HybridMiddleware:
+    """
+    Base of the project middleware: runs in sync (WSGI) and async (ASGI) chains
+
+    Django runs a sync-only middleware under ASGI, and with it everything
+    below it, in a worker thread: a single one in MIDDLEWARE is enough for
+    async views to hold a thread for the whole request. Subclasses implement
+    ``__call__`` and ``__acall__``; the handler calls the one matching the
+    mode of the rest of the chain.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            # Makes Django await this instance instead of adapting it
+            markcoroutinefunction(self)
+
+
+class RequestMetricsMiddleware(HybridMiddleware):
+    """
+    Measures database, cache and serializer time of every request
+
+    Adds a ``Server-Timing`` header (visible in the browser dev tools) and
+    feeds the Prometheus histograms exposed on ``/metrics``. Keep it first in
+    MIDDLEWARE so that the total covers the whole stack. The header goes to
+    every client only with SERVER_TIMING_HEADER (default: DEBUG), otherwise
+    to staff users alone.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        server_timing = getattr(settings, 'SERVER_TIMING_HEADER', None)
+        self.server_timing = settings.DEBUG if server_timing is None else server_timing
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        request_metrics, token = metrics.start_request()
+        try:
+            with ExitStack() as stack:
+                self._wrap_connections(stack, request_metrics)
+                response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self._finish(request, request_metrics, response)
+
+    async def __acall__(self, request):
+        request_metrics, token = metrics.start_request()
+        try:
+            with ExitStack() as stack:
+                # The views' sync_to_async() threads inherit this context and
+                # so use these connection objects
+                self._wrap_connections(stack, request_metrics)
+                response = await self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self._finish(request, request_metrics, response)
+
+    @staticmethod
+    def _wrap_connections(stack, request_metrics):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(request_metrics.db_wrapper))
+
+    def _finish(self, request, request_metrics, response):
+        total = time.perf_counter() - request_metrics.started
+        match = getattr(request, 'resolver_match', None)
+        view = match.url_name if match and match.url_name else 'unresolved'
+
+        if self.server_timing or self._is_staff(request):
+            response['Server-Timing'] = request_metrics.server_timing(total)
+        metrics.observe(view, request.method, request_metrics, total)
+
+        return response
+
+    @staticmethod
+    def _is_staff(request):
+        # DRF sets the user it authenticated on the HttpRequest as well
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_authenticated and user.is_staff
+
+
+class CompressionMiddleware(HybridMiddleware):
+    """
+    brotli / gzip compression of text responses (JSON, CSV, HTML, ...)
+
+    Configured by settings.COMPRESSION: minimum size, content-type allow-list,
+    gzip level and brotli quality. Streaming responses (exports) are compressed
+    and flushed to the client in blocks of STREAM_FLUSH_SIZE bytes, or earlier
+    when the source stalls for STREAM_FLUSH_INTERVAL seconds: flushing every
+    chunk (one CSV line) would cost most of the compression.
+    Already compressed bodies, ranges, media types outside the allow-list and
+    responses marked ``Cache-Control: no-transform`` are left untouched.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        config = getattr(settings, 'COMPRESSION', {})
+        self.min_size = config.get('MIN_SIZE', 1024)
+        self.content_types = tuple(config.get('CONTENT_TYPES', ('application/json', 'text/')))
+        self.gzip_level = config.get('GZIP_LEVEL', 6)
+        self.brotli_quality = config.get('BROTLI_QUALITY', 4)
+        self.stream_flush_size = config.get('STREAM_FLUSH_SIZE', 32 * 1024)
+        self.stream_flush_interval = config.get('STREAM_FLUSH_INTERVAL', 1.0)
+        self.encodings = tuple(
+            coding for coding in config.get('ENCODINGS', ('br', 'gzip'))
+            if coding in compression.available_encodings()
+        )
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self._compress_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._compress_response(request, await self.get_response(request))
+
+    def _compress_response(self, request, response):
+        if not self._compressible(response):
+            return response
+        # The representation now depends on Accept-Encoding, compressed or not
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        coding = compression.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.encodings)
+        if coding is None:
+            return response
+
+        encoder = compression.Encoder(coding, self.gzip_level, self.brotli_quality)
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self._compress_async(encoder, response.streaming_content)
+            else:
+                response.streaming_content = self._compress(encoder, response.streaming_content)
+            del response['Content-Length']
+        else:
+            if len(response.content) < self.min_size:
+                return response
+            compressed = encoder.compress(response.content) + encoder.finish()
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # The compressed body is a different representation of the same resource
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = coding
+        return response
+
+    def _compressible(self, response):
+        if response.has_header('Content-Encoding') or response.status_code in (206, 304):
+            return False
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return False
+        if response.has_header('X-Accel-Redirect') or response.has_header('X-Sendfile'):
+            return False
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        return content_type.startswith(self.content_types)
+
+    @staticmethod
+    def _encode_block(encoder, buffer):
+        # One call per block: brotli at low qualities compresses each input
+        # separately, so single lines would barely shrink
+        data = encoder.compress(b''.join(buffer)) + encoder.flush()
+        buffer.clear()
+        return data
+
+    def _compress(self, encoder, chunks):
+        # A sync iterator cannot be watched while it blocks: the buffer is
+        # flushed by the first chunk arriving after the interval instead
+        buffer, size = [], 0
+        flushed_at = time.monotonic()
+        for chunk in chunks:
+            if not chunk:
+                continue
+            buffer.append(chunk)
+            size += len(chunk)
+            if size >= self.stream_flush_size or time.monotonic() - flushed_at >= self.stream_flush_interval:
+                yield self._encode_block(encoder, buffer)
+                size, flushed_at = 0, time.monotonic()
+        yield encoder.compress(b''.join(buffer)) + encoder.finish()
+
+    async def _compress_async(self, encoder, chunks):
+        # The source is read by its own task, so a stall is noticed while it
+        # lasts; chunks already read are taken without waiting
+        queue = asyncio.Queue(maxsize=256)
+        end = object()
+
+        async def read():
+            try:
+                async for chunk in chunks:
+                    if chunk:
+                        await queue.put(chunk)
+            except Exception as exc:
+                await queue.put(exc)
+            else:
+                await queue.put(end)
+
+        reader = asyncio.ensure_future(read())
+        buffer, size = [], 0
+        try:
+            while True:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    if not buffer:
+                        item = await queue.get()
+                    else:
+                        try:
+                            item = await asyncio.wait_for(queue.get(), self.stream_flush_interval)
+                        except asyncio.TimeoutError:
+                            size = 0
+                            yield self._encode_block(encoder, buffer)
+                            continue
+                if item is end:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                buffer.append(item)
+                size += len(item)
+                if size >= self.stream_flush_size:
+                    size = 0
+                    yield self._encode_block(encoder, buffer)
+        finally:
+            # Also when the client went away mid-stream
+            reader.cancel()
+        yield encoder.compress(b''.join(buffer)) + encoder.finish()
+
+
+class QueryInspectorMiddleware(HybridMiddleware):
+    """
+    Development/test middleware reporting N+1 patterns and slow queries
+
+    In strict mode (QUERY_INSPECTOR['STRICT']) a request exceeding the query
+    budget of its endpoint raises QueryBudgetExceeded.
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        from .querywatch import QueryInspector
+
+        inspector = QueryInspector()
+        with inspector.watch():
+            response = self.get_response(request)
+        return self._report(request, inspector, response)
+
+    async def __acall__(self, request):
+        from .querywatch import QueryInspector
+
+        inspector = QueryInspector()
+        with inspector.watch():
+            response = await self.get_response(request)
+        return self._report(request, inspector, response)
+
+    @staticmethod
+    def _report(request, inspector, response):
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.url_name if match and match.url_name else request.path
+        inspector.report(f'{request.method} {url_name}')
+        if inspector.config['STRICT']:
+            inspector.check_budget(url_name)
+
+        return response
+
+
+class StatementTimeoutMiddleware(HybridMiddleware):
+    """
+    Per-request Postgres statement timeouts (see apps/core/db/timeouts.py)
+
+    The timeout is set per request, not per connection, so migrations,
+    management commands and background threads run without one. It is
+    recorded on the connection wrappers and sent with one SET when the request
+    first queries: requests that never query pay nothing.
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        # Also covers the queries of the middleware below
+        set_statement_timeout(timeout_for('default'))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # Connections belong to the request's thread: set in process_view(),
+        # which Django already runs there
+        return await self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        set_statement_timeout(timeout_for(request.resolver_match.url_name))
+        return None
+
+
+class ReplicaRoutingMiddleware(HybridMiddleware):
+    """
+    Sends the reads of safe read-only requests to a replica
+
+    A GET/HEAD request to one of REPLICA_READ_VIEWS is replica-eligible unless
+    its client wrote to the primary in the last REPLICA_PIN_SECONDS. Requests
+    that write pin their client to the primary for that window. A no-op when
+    no replica is configured.
+    """
+
+    SAFE_METHODS = ('GET', 'HEAD')
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.views = set(getattr(settings, 'REPLICA_READ_VIEWS', []))
+        self.enabled = bool(replicas.replica_aliases())
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        state = replicas.RoutingState()
+        request.replica_routing = state
+        token = replicas.bind(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            replicas.unbind(token)
+
+        client = replicas.client_key(request) if state.wrote else None
+        if client:
+            replicas.pin_to_primary(client)
+        return self._bind_streaming(state, response)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        state = replicas.RoutingState()
+        request.replica_routing = state
+        # Seen by the views' sync_to_async() threads, which copy this context
+        token = replicas.bind(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            replicas.unbind(token)
+
+        client = replicas.client_key(request) if state.wrote else None
+        if client:
+            # Cache round trip
+            await sync_to_async(replicas.pin_to_primary)(client)
+        return self._bind_streaming(state, response)
+
+    def _bind_streaming(self, state, response):
+        if response.streaming and state.use_replica:
+            # Streamed rows (e.g. exports) are read after this middleware returned
+            if response.is_async:
+                response.streaming_content = self._bind_async(state, response.streaming_content)
+            else:
+                response.streaming_content = self._bind(state, response.streaming_content)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = getattr(request, 'replica_routing', None)
+        if (
+            state is None
+            or request.method not in self.SAFE_METHODS
+            or request.resolver_match.url_name not in self.views
+        ):
+            return None
+        client = replicas.client_key(request)
+        if client is None or not replicas.is_pinned(client):
+            state.use_replica = True
+        return None
+
+    @staticmethod
+    def _bind(state, iterator):
+        iterator = iter(iterator)
+        while True:
+            token = replicas.bind(state)
+            try:
+                chunk = next(iterator, None)
+            finally:
+                replicas.unbind(token)
+            if chunk is None:
+                return
+            yield chunk
+
+    @staticmethod
+    async def _bind_async(state, iterator):
+        iterator = aiter(iterator)
+        while True:
+            token = replicas.bind(state)
+            try:
+                chunk = await anext(iterator, None)
+            finally:
+                replicas.unbind(token)
+            if chunk is None:
+                return
+            yield chunk
@@ -7,6 +7,19 @@ from django.conf import settings
 from django.utils import timezone
 
 
+class TimeStampedQuerySet(models.QuerySet):
+    """
+    QuerySet whose update() also bumps ``updated_at``
+
+    auto_now only applies to save(); bulk updates must move the timestamp
+    too, or delta sync clients (apps/core/sync.py) would miss the change.
+    """
+    
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', timezone.now())
+        return super().update(**kwargs)
+
+
 class TimeStampedModel(models.Model):
     """
     Abstract base class with automatic timestamp fields
@@ -81,7 +94,7 @@ class SoftDeleteModel(models.Model):
         self.deleted_at = timezone.now()
         if user:
             self.deleted_by = user
-        self.save(update_fields=['is_deleted', 'deleted_at', 'deleted_by'])
+        self.save(update_fields=self._soft_delete_fields())
     
     def restore(self):
         """
@@ -90,4 +103,11 @@ class SoftDeleteModel(models.Model):
         self.is_deleted = False
         self.deleted_at = None
         self.deleted_by = None
-        self.save(update_fields=['is_deleted', 'deleted_at', 'deleted_by'])
+        self.save(update_fields=self._soft_delete_fields())
+    
+    def _soft_delete_fields(self):
+        fields = ['is_deleted', 'deleted_at', 'deleted_by']
+        if isinstance(self, TimeStampedModel):
+            # Deletions and restores must reach delta sync clients
+            fields.append('updated_at')
+        return fields
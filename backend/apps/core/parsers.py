@@ -0,0 +1,55 @@
+"""
+JSON parser backed by orjson
+
+Same results as DRF's JSONParser (NaN and Infinity are rejected, as with
+STRICT_JSON). Only UTF-8 bodies (the default charset) are handed to orjson.
+Payloads orjson refuses are parsed again by JSONParser, so that what it
+accepts (e.g. lone surrogates) still parses and invalid JSON reports the
+same error as before. orjson turns integers over 64 bits into floats, so
+bodies with 19 or more consecutive digits go to JSONParser too.
+
+orjson is optional: without it the parser is DRF's JSONParser.
+"""
+
+import codecs
+from io import BytesIO
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+from .renderers import ORJSONRenderer, orjson
+
+# Digits mapped to '0' so a long run of them is a plain substring search
+# (much faster than a regular expression on number-heavy bodies)
+_DIGITS = bytes.maketrans(b'123456789', b'000000000')
+_LONG_NUMBER = b'0' * 19
+
+
+class ORJSONParser(JSONParser):
+    """
+    JSONParser using orjson; set it per view in ``parser_classes`` or
+    globally in DEFAULT_PARSER_CLASSES
+    """
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            utf8 = codecs.lookup(encoding).name == 'utf-8'
+        except LookupError:
+            utf8 = False
+        if not utf8:
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        # A long run of digits may be an integer orjson would not parse exactly
+        if _LONG_NUMBER not in body.translate(_DIGITS):
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                pass
+        return super().parse(BytesIO(body), media_type, parser_context)
@@ -0,0 +1,158 @@
+"""
+N+1 and slow query detection for development and test runs
+
+QueryInspector hooks ``connection.execute_wrapper`` for the duration of a
+request, fingerprints every statement and reports:
+
+- statements with the same shape repeated within the request (N+1 patterns),
+- statements slower than a threshold,
+
+with the line of project code that issued them. In strict mode a request
+issuing more queries than its endpoint budget raises QueryBudgetExceeded, so
+that the test performing it fails.
+
+Configured through settings.QUERY_INSPECTOR (see config/settings/development.py).
+"""
+
+import logging
+import re
+import time
+import traceback
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'N_PLUS_ONE_THRESHOLD': 5,
+    'SLOW_QUERY_MS': 100,
+    'STRICT': False,
+    'BUDGETS': {},
+    'DEFAULT_BUDGET': None,
+}
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*%s\s*,?)+\)', re.IGNORECASE)
+_SPACES = re.compile(r'\s+')
+
+# Instrumentation modules wrapping the execution of every query
+_WRAPPER_MODULES = ('querywatch.py', 'metrics.py')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request issued more queries than the budget of its endpoint"""
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'QUERY_INSPECTOR', {})}
+
+
+def fingerprint(sql):
+    """
+    Shape of a statement: literals and IN lists of any length are collapsed,
+    so the same query issued for different rows gets the same fingerprint
+    """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def query_origin():
+    """The innermost frame of project code (apps/, config/) issuing the query"""
+    base_dir = str(Path(settings.BASE_DIR))
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        filename = frame.filename
+        if (
+            filename.startswith(base_dir)
+            and 'site-packages' not in filename
+            and not filename.endswith(_WRAPPER_MODULES)
+        ):
+            return f'{Path(filename).relative_to(base_dir)}:{frame.lineno} in {frame.name}'
+    return 'origine sconosciuta'
+
+
+class QueryInspector:
+    """execute_wrapper collecting the statements of one request (or block)"""
+
+    def __init__(self, config=None):
+        self.config = config or get_config()
+        self.count = 0
+        self.shapes = Counter()
+        self.examples = {}
+        self.origins = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            self.count += 1
+
+            shape = fingerprint(sql)
+            self.shapes[shape] += 1
+            self.examples.setdefault(shape, sql)
+            # The stack is only inspected when it is going to be reported
+            if self.shapes[shape] == self.config['N_PLUS_ONE_THRESHOLD']:
+                self.origins[shape] = query_origin()
+
+            if duration_ms >= self.config['SLOW_QUERY_MS']:
+                logger.warning(
+                    "Query lenta (%.1f ms) da %s: %s",
+                    duration_ms, query_origin(), sql[:500]
+                )
+
+    @contextmanager
+    def watch(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+    def repeated(self):
+        """[(fingerprint, count)] of the shapes above the N+1 threshold"""
+        threshold = self.config['N_PLUS_ONE_THRESHOLD']
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def report(self, label):
+        for shape, count in self.repeated():
+            logger.warning(
+                "Possibile N+1 in %s: %d query con la stessa forma da %s: %s",
+                label, count, self.origins.get(shape, 'origine sconosciuta'),
+                self.examples[shape][:500]
+            )
+
+    def budget_for(self, url_name):
+        return self.config['BUDGETS'].get(url_name, self.config['DEFAULT_BUDGET'])
+
+    def check_budget(self, url_name):
+        budget = self.budget_for(url_name)
+        if budget is not None and self.count > budget:
+            repeated = ', '.join(f'{count}x {self.origins.get(shape, "?")}' for shape, count in self.repeated())
+            raise QueryBudgetExceeded(
+                f"{url_name}: {self.count} query, budget {budget}"
+                + (f" (ripetute: {repeated})" if repeated else '')
+            )
+
+
+@contextmanager
+def assert_max_queries(budget, label='blocco'):
+    """
+    Fail if the enclosed block issues more than ``budget`` queries
+
+    Usage in tests:
+
+        with assert_max_queries(5):
+            client.get('/api/auth/users/')
+    """
+    inspector = QueryInspector({**get_config(), 'BUDGETS': {label: budget}})
+    with inspector.watch():
+        yield inspector
+    inspector.report(label)
+    inspector.check_budget(label)
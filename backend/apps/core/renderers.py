@@ -0,0 +1,59 @@
+"""
+JSON renderer backed by orjson
+
+Drop-in replacement for DRF's JSONRenderer with the same output: types orjson
+does not encode the DRF way (datetimes, Decimal, lazy translation strings,
+querysets, ...) are handed to DRF's JSONEncoder, and U+2028/U+2029 are
+escaped. Pretty-printed output (``; indent=N``, browsable API) and anything
+orjson refuses (e.g. integers over 64 bits) go through DRF's implementation.
+
+Known differences, both outside what the API produces: floats needing an
+exponent are spelled the shortest way (``1e16`` instead of ``1e+16``, same
+value) and NaN/Infinity are written as null instead of raising.
+
+orjson is optional: without it the renderer is DRF's JSONRenderer.
+"""
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+if orjson is not None:
+    ORJSON_OPTIONS = (
+        orjson.OPT_PASSTHROUGH_DATETIME  # DRF's isoformat rules, not RFC 3339
+        | orjson.OPT_PASSTHROUGH_DATACLASS  # The stdlib encoder refuses them
+        | orjson.OPT_NON_STR_KEYS  # {1: ...} -> {"1": ...} like json.dumps
+    )
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer using orjson; set it per view in ``renderer_classes`` or
+    globally in DEFAULT_RENDERER_CLASSES
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # Let the stdlib encode it or raise the usual error
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same escaping as JSONRenderer: output stays a strict JavaScript subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,75 @@
+"""
+Prebuilt OpenAPI schema
+
+Generating the schema introspects every view and serializer, so it is done
+once at build/deploy time (``manage.py build_schema``) and the artifacts are
+served as they are by CachedSpectacularAPIView.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+from django.conf import settings
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+
+# Renderer format -> (renderer, file name)
+ARTIFACTS = {
+    'yaml': (OpenApiYamlRenderer, 'schema.yaml'),
+    'json': (OpenApiJsonRenderer, 'schema.json'),
+}
+
+# path -> (mtime_ns, content, etag)
+_loaded = {}
+
+
+def artifact_path(fmt):
+    return Path(settings.API_SCHEMA_DIR) / ARTIFACTS[fmt][1]
+
+
+def build_schema(directory=None):
+    """
+    Generate the schema and write one artifact per format
+
+    Returns:
+        list: Paths written
+    """
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=spectacular_settings.SERVE_PUBLIC)
+
+    directory = Path(directory or settings.API_SCHEMA_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    written = []
+    for renderer_class, filename in ARTIFACTS.values():
+        path = directory / filename
+        content = renderer_class().render(schema, renderer_context={})
+        # Write then rename: a running server never reads a half-written file
+        temporary = path.with_suffix(path.suffix + '.tmp')
+        temporary.write_bytes(content)
+        os.replace(temporary, path)
+        written.append(path)
+    return written
+
+
+def load_artifact(fmt):
+    """
+    Prebuilt schema in ``fmt`` ('yaml' or 'json')
+
+    Returns:
+        tuple: (content bytes, ETag) or None if the artifact does not exist
+    """
+    if fmt not in ARTIFACTS:
+        return None
+    path = artifact_path(fmt)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    cached = _loaded.get(path)
+    if cached is None or cached[0] != mtime:
+        content = path.read_bytes()
+        etag = '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+        cached = _loaded[path] = (mtime, content, etag)
+    return cached[1], cached[2]
@@ -0,0 +1,208 @@
+"""
+Incremental (delta) sync of a collection
+
+Clients keep a local copy of a collection and call its ``sync/`` endpoint
+with the opaque cursor of the previous response. Rows are walked in
+``(updated_at, id)`` order (indexed), so each change after the cursor is
+returned once. Rows that changed but are no longer visible to the client
+(soft-deleted, deactivated, out of the caller's scope) come back as
+tombstones.
+
+Two things invalidate a cursor and make the response a ``reset`` (the client
+drops its copy and starts over from the rows returned):
+
+- a hard delete of a row the client may still hold, which leaves no
+  tombstone behind: it bumps the collection epoch (``bump_epoch``) stored in
+  the cache and carried by every cursor
+- a cursor older than ``max_age`` (e.g. the purge retention: tombstones of
+  purged rows are gone)
+
+Rows updated in the last SYNC_SETTLE_SECONDS are held back until the next
+call, so a transaction committing after a newer one cannot slip behind the
+cursor. This holds as long as a row commits within that window of its
+``updated_at``: writes running longer than half of it (CSV import, roster
+sync, work area changes) call ``restamp()`` just before committing. Rows
+written by a long atomic /api/batch/ outside those operations, or by a
+single statement running longer than the window, can still be missed until
+their next change.
+
+The cursor also carries a fingerprint of the caller's scope (``scope``, e.g.
+role and work areas): when it changes, rows that entered the scope without
+being modified would never be sent, so the response is a ``reset``.
+
+Tombstones are only sent for rows in ``changed``. When ``changed`` is limited
+to the caller's scope, so that a caller does not page through every change
+outside it, rows leaving the scope must change the fingerprint instead: the
+users sync of area admins includes an epoch bumped whenever a user may have
+left their scope (apps/users/signals.py).
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+import uuid
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+EPOCH_KEY = 'sync-epoch:{}'
+
+_datetime_field = serializers.DateTimeField()
+
+
+def get_epoch(label):
+    """Current epoch of the ``label`` collection (created on first use)"""
+    return cache.get_or_set(EPOCH_KEY.format(label), lambda: uuid.uuid4().hex[:12], None)
+
+
+def bump_epoch(label):
+    """Invalidate every cursor of the ``label`` collection"""
+    cache.set(EPOCH_KEY.format(label), uuid.uuid4().hex[:12], None)
+
+
+def scope_fingerprint(*parts):
+    """Short stable hash of what defines the rows a caller can see"""
+    encoded = json.dumps(parts, separators=(',', ':'), default=str).encode()
+    return hashlib.sha1(encoded).hexdigest()[:12]
+
+
+def encode_cursor(position, epoch, scope=None):
+    """
+    Args:
+        position (tuple): (updated_at, id) of the last row seen, or None
+        epoch (str): Collection epoch
+        scope (str): Fingerprint of the caller's scope (``scope_fingerprint``)
+    """
+    data = {'e': epoch}
+    if position is not None:
+        data['t'] = position[0].isoformat()
+        data['i'] = position[1]
+    if scope is not None:
+        data['s'] = scope
+    encoded = json.dumps(data, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(encoded).decode().rstrip('=')
+
+
+def decode_cursor(value):
+    """
+    Returns:
+        tuple: (position or None, epoch, scope or None)
+
+    Raises:
+        ValidationError: Malformed cursor
+    """
+    try:
+        padded = value + '=' * (-len(value) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        position = None
+        if 't' in data:
+            position = (datetime.fromisoformat(data['t']), int(data['i']))
+        scope = data.get('s')
+        return position, str(data['e']), None if scope is None else str(scope)
+    except (binascii.Error, ValueError, TypeError, KeyError, AttributeError):
+        raise ValidationError({'since': 'Cursore non valido'})
+
+
+def restamp(queryset, ids, started, batch_size=1000):
+    """
+    Bump ``updated_at`` of the rows a long transaction wrote, last thing
+    before it commits
+
+    Rows keep the timestamp of their write; if the transaction commits more
+    than SYNC_SETTLE_SECONDS later, a client may already have synced past it.
+    Skipped when the transaction started less than half the window ago.
+
+    Args:
+        queryset: Timestamped queryset (or manager) of the rows
+        ids: Primary keys written
+        started (datetime): When the transaction started
+    """
+    window = timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+    if timezone.now() - started < window / 2:
+        return
+    ids = list(ids)
+    now = timezone.now()
+    for start in range(0, len(ids), batch_size):
+        queryset.filter(pk__in=ids[start:start + batch_size]).update(updated_at=now)
+
+
+def page_size(request):
+    """``limit`` query parameter, capped at SYNC_MAX_PAGE_SIZE"""
+    try:
+        limit = int(request.query_params.get('limit', settings.SYNC_PAGE_SIZE))
+    except ValueError:
+        raise ValidationError({'limit': 'Deve essere un numero intero'})
+    return max(1, min(limit, settings.SYNC_MAX_PAGE_SIZE))
+
+
+def sync_page(request, label, changed, visible, serializer, max_age=None, scope=None):
+    """
+    One page of changes of a collection since the ``since`` query parameter
+
+    Args:
+        label (str): Collection name (epoch key)
+        changed (QuerySet): Every row that may have to reach the client,
+            including soft-deleted and no longer visible ones (see above for
+            rows leaving the caller's scope)
+        visible (QuerySet): Rows the client may see
+        serializer (FastSerializer): Compiled serializer of the visible rows
+        max_age (timedelta): Oldest cursor accepted without a reset
+        scope (str): Fingerprint of the caller's scope, when the visible rows
+            depend on who asks (``scope_fingerprint``)
+
+    Returns:
+        dict: results, deleted (tombstones), cursor, has_more, reset
+    """
+    epoch = get_epoch(label)
+    since = request.query_params.get('since')
+    position, reset = None, True
+    if since:
+        position, cursor_epoch, cursor_scope = decode_cursor(since)
+        reset = cursor_epoch != epoch or cursor_scope != scope
+        if position is not None and max_age is not None and position[0] < timezone.now() - max_age:
+            reset = True
+        if reset:
+            position = None
+
+    limit = page_size(request)
+    horizon = timezone.now() - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+    rows = changed.filter(updated_at__lte=horizon)
+    if position is not None:
+        updated_at, pk = position
+        rows = rows.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, pk__gt=pk))
+    fields = ['pk', 'updated_at']
+    soft_delete = any(field.name == 'deleted_at' for field in changed.model._meta.concrete_fields)
+    if soft_delete:
+        fields.append('deleted_at')
+    rows = list(rows.order_by('updated_at', 'pk').values_list(*fields)[:limit + 1])
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    ids = [row[0] for row in rows]
+    visible_rows = []
+    if ids:
+        visible_rows = list(serializer.rows(visible.filter(pk__in=ids).order_by('updated_at', 'pk')))
+    visible_ids = {row[0] for row in visible_rows}
+
+    deleted = []
+    for row in rows:
+        if row[0] not in visible_ids and not reset:
+            # A client starting over has nothing to delete
+            removed_at = row[2] if soft_delete and row[2] else row[1]
+            deleted.append({'id': row[0], 'deleted_at': _datetime_field.to_representation(removed_at)})
+
+    if rows:
+        position = (rows[-1][1], rows[-1][0])
+    return {
+        'results': serializer.serialize(visible_rows, {'request': request}),
+        'deleted': deleted,
+        'cursor': encode_cursor(position, epoch, scope),
+        'has_more': has_more,
+        'reset': reset,
+    }
@@ -0,0 +1,43 @@
+"""
+TwoTierCache writes: what reaches the local LRU and the other processes
+
+Redis is replaced by the result of its SET, so no server is needed.
+"""
+
+from unittest import mock
+
+import pytest
+
+from apps.core.cache import InstrumentedRedisCache, TwoTierCache
+
+
+@pytest.fixture
+def cache():
+    cache = TwoTierCache('redis://127.0.0.1:6379/0', {'OPTIONS': {'L1_TIMEOUT': 60}})
+    with mock.patch.object(cache, '_ensure_listener'), mock.patch.object(cache, '_publish') as publish:
+        cache.published = publish
+        yield cache
+
+
+def redis_set(result):
+    return mock.patch.object(InstrumentedRedisCache, 'set', return_value=result)
+
+
+def test_failed_add_publishes_nothing(cache):
+    with redis_set(False):
+        assert not cache.add('lock', 'owner')
+    cache.published.assert_not_called()
+    assert len(cache.l1) == 0
+
+
+def test_add_publishes_and_caches_locally(cache):
+    with redis_set(True):
+        assert cache.add('lock', 'owner')
+    cache.published.assert_called_once_with(cache.make_key('lock'))
+    assert cache.l1.get(cache.make_key('lock')) == 'owner'
+
+
+def test_set_publishes(cache):
+    with redis_set(True):
+        cache.set('areas', [1, 2])
+    cache.published.assert_called_once_with(cache.make_key('areas'))
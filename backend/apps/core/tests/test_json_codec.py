@@ -0,0 +1,129 @@
+"""
+ORJSONRenderer and ORJSONParser give the same results as DRF's JSONRenderer
+and JSONParser
+"""
+
+import datetime
+import decimal
+import uuid
+from io import BytesIO
+
+import pytest
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from apps.core.parsers import ORJSONParser
+from apps.core.renderers import ORJSONRenderer
+
+ROME = datetime.timezone(datetime.timedelta(hours=2))
+
+RENDER_CASES = {
+    'decimal': [decimal.Decimal('1.10'), decimal.Decimal('-3'), decimal.Decimal('12345.678')],
+    'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'lazy string': gettext_lazy('Utente'),
+    'datetime utc': datetime.datetime(2024, 5, 1, 10, 30, tzinfo=datetime.timezone.utc),
+    'datetime with offset and microseconds': datetime.datetime(2024, 5, 1, 10, 30, 5, 123456, tzinfo=ROME),
+    'naive datetime': datetime.datetime(2024, 5, 1, 10, 30),
+    'date': datetime.date(2024, 5, 1),
+    'time': datetime.time(8, 15, 0, 500),
+    'line separators': 'a\u2028b\u2029c',
+    'integers over 64 bits': [2 ** 63 - 1, -2 ** 63, 2 ** 64, -2 ** 70],
+    'non-string keys': {1: 'a', None: 'b', False: 'c'},
+    'unicode': 'àèìòù € 😀 \x00\x1f "\\/',
+    'nested': {'users': [{'id': 1, 'joined': datetime.date(2020, 1, 31), 'score': decimal.Decimal('0.5')}]},
+}
+
+PARSE_CASES = {
+    'object': b'{"user_ids": [1, 2, 3], "action": "activate"}',
+    'unicode': '{"nome": "Niccolò 😀 \\u2028"}'.encode(),
+    'integer over 64 bits': b'{"n": 123456789012345678901234567890}',
+    'negative integer over 64 bits': b'[-98765432109876543210]',
+    'lone surrogate': b'{"s": "\\ud800"}',
+    'duplicate keys': b'{"a": 1, "a": 2}',
+}
+
+INVALID_CASES = {
+    'nan': b'{"n": NaN}',
+    'infinity': b'[Infinity]',
+    'invalid json': b'{"a": }',
+    'invalid utf-8': b'{"a": "\xff"}',
+    'empty': b'',
+}
+
+
+@pytest.mark.parametrize('data', RENDER_CASES.values(), ids=RENDER_CASES.keys())
+def test_render_matches_drf(data):
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+def test_render_escapes_line_separators():
+    assert ORJSONRenderer().render('a\u2028b\u2029c') == b'"a\\u2028b\\u2029c"'
+
+
+def test_render_none():
+    assert ORJSONRenderer().render(None) == b''
+
+
+def test_render_nan_is_null():
+    # Known difference: DRF's strict encoder raises instead
+    assert ORJSONRenderer().render({'n': float('nan')}) == b'{"n":null}'
+    with pytest.raises(ValueError):
+        JSONRenderer().render({'n': float('nan')})
+
+
+@pytest.mark.parametrize('media_type', ['application/json; indent=4', 'application/json; indent=0'])
+def test_render_indent_falls_back_to_drf(media_type):
+    data = RENDER_CASES['nested']
+    assert ORJSONRenderer().render(data, media_type) == JSONRenderer().render(data, media_type)
+
+
+def test_render_ensure_ascii_falls_back_to_drf():
+    class AsciiORJSONRenderer(ORJSONRenderer):
+        ensure_ascii = True
+
+    class AsciiJSONRenderer(JSONRenderer):
+        ensure_ascii = True
+
+    data = RENDER_CASES['unicode']
+    assert AsciiORJSONRenderer().render(data) == AsciiJSONRenderer().render(data)
+    assert AsciiORJSONRenderer().render(data).isascii()
+
+
+def test_render_not_compact_falls_back_to_drf():
+    class SpacedORJSONRenderer(ORJSONRenderer):
+        compact = False
+
+    class SpacedJSONRenderer(JSONRenderer):
+        compact = False
+
+    data = RENDER_CASES['nested']
+    assert SpacedORJSONRenderer().render(data) == SpacedJSONRenderer().render(data)
+
+
+def parse(parser, body, encoding='utf-8'):
+    return parser.parse(BytesIO(body), 'application/json', {'encoding': encoding})
+
+
+@pytest.mark.parametrize('body', PARSE_CASES.values(), ids=PARSE_CASES.keys())
+def test_parse_matches_drf(body):
+    assert parse(ORJSONParser(), body) == parse(JSONParser(), body)
+
+
+def test_parse_keeps_big_integers_exact():
+    assert parse(ORJSONParser(), PARSE_CASES['integer over 64 bits']) == {'n': 123456789012345678901234567890}
+
+
+def test_parse_latin_1():
+    body = '{"nome": "Niccolò"}'.encode('latin-1')
+    assert parse(ORJSONParser(), body, 'latin-1') == parse(JSONParser(), body, 'latin-1') == {'nome': 'Niccolò'}
+
+
+@pytest.mark.parametrize('body', INVALID_CASES.values(), ids=INVALID_CASES.keys())
+def test_parse_errors_match_drf(body):
+    with pytest.raises(ParseError) as expected:
+        parse(JSONParser(), body)
+    with pytest.raises(ParseError) as actual:
+        parse(ORJSONParser(), body)
+    assert str(actual.value.detail) == str(expected.value.detail)
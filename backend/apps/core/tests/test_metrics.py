@@ -0,0 +1,47 @@
+"""
+Server-Timing header: only for staff users unless enabled for everyone
+"""
+
+import pytest
+from rest_framework.test import APIClient
+
+pytestmark = pytest.mark.django_db
+
+URL = '/api/auth/bootstrap/'
+
+
+@pytest.fixture
+def staff_client(superadmin):
+    superadmin.is_staff = True
+    superadmin.save()
+    client = APIClient()
+    client.force_authenticate(superadmin)
+    return client
+
+
+def test_anonymous_without_header(client):
+    assert not client.get(URL).has_header('Server-Timing')
+
+
+def test_authenticated_non_staff_without_header(api_client):
+    assert not api_client.get(URL).has_header('Server-Timing')
+
+
+def test_staff_with_header(staff_client):
+    assert 'db;' in staff_client.get(URL)['Server-Timing']
+
+
+def test_debug_default(client, settings):
+    settings.DEBUG = True
+    assert client.get(URL).has_header('Server-Timing')
+
+
+def test_enabled_for_everyone(client, settings):
+    settings.SERVER_TIMING_HEADER = True
+    assert client.get(URL).has_header('Server-Timing')
+
+
+def test_disabled_keeps_staff(staff_client, settings):
+    settings.DEBUG = True
+    settings.SERVER_TIMING_HEADER = False
+    assert staff_client.get(URL).has_header('Server-Timing')
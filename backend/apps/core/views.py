@@ -0,0 +1,157 @@
+"""
+Views for core app
+"""
+
+import hmac
+import os
+import posixpath
+
+from django.conf import settings
+from django.http import HttpResponse, Http404
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_safe
+from drf_spectacular.utils import extend_schema, inline_serializer
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+from rest_framework import generics, serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from . import metrics as request_metrics
+from .batch import BatchSerializer, run_batch
+from .idempotency import IDEMPOTENCY_PARAMETER, idempotent
+from .media import access_rule, serve_file
+from .schema import load_artifact
+
+
+def metrics(request):
+    """
+    Prometheus metrics, protected by the METRICS_TOKEN bearer token
+
+    Answers 404 while METRICS_TOKEN is not configured.
+    """
+    if not settings.METRICS_TOKEN or request_metrics.prometheus_client is None:
+        raise Http404
+    
+    expected = f'Bearer {settings.METRICS_TOKEN}'
+    provided = request.META.get('HTTP_AUTHORIZATION', '')
+    if not hmac.compare_digest(provided.encode(), expected.encode()):
+        response = HttpResponse('Unauthorized', status=401, content_type='text/plain')
+        response['WWW-Authenticate'] = 'Bearer realm="metrics"'
+        return response
+    
+    payload, content_type = request_metrics.render_latest()
+    return HttpResponse(payload, content_type=content_type)
+
+
+
+def _media_user(request):
+    """User of a media request: JWT bearer token, else the session (admin site)"""
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    if authenticated is not None:
+        return authenticated[0]
+    user = getattr(request, 'user', None)
+    return user if user is not None and user.is_authenticated else None
+
+
+@require_safe
+def media(request, path):
+    """
+    Serve an uploaded file after checking MEDIA_ACCESS
+
+    Public files (avatars) are served to anyone, the others require a logged
+    in user or an admin. The transfer itself is left to the front proxy when
+    MEDIA_DELIVERY allows it (see apps/core/media.py).
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    if path.startswith('..') or path in ('', '.'):
+        raise Http404
+    full_path = os.path.join(settings.MEDIA_ROOT, path)
+    
+    rule = access_rule(path)
+    if rule != 'public':
+        user = _media_user(request)
+        if user is None:
+            response = HttpResponse('Unauthorized', status=401, content_type='text/plain')
+            response['WWW-Authenticate'] = 'Bearer realm="media"'
+            return response
+        if rule == 'admin' and not user.is_admin:
+            return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    
+    if not os.path.isfile(full_path):
+        raise Http404
+    
+    cache_control = 'public, max-age=86400' if rule == 'public' else 'private, no-cache'
+    return serve_file(request, path, cache_control)
+
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """
+    OpenAPI schema served from the artifacts written by ``build_schema``
+
+    Falls back to generating the schema on the fly when the artifact is
+    missing, or for a specific ``version`` / ``lang``.
+    """
+    
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        artifact = None
+        if not (request.GET.get('version') or request.GET.get('lang')):
+            artifact = load_artifact(request.accepted_renderer.format)
+        if artifact is None:
+            return super().get(request, *args, **kwargs)
+        
+        content, etag = artifact
+        cache_control = f'public, max-age={settings.API_SCHEMA_MAX_AGE}'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            content_type = request.accepted_media_type
+            if request.accepted_renderer.charset:
+                content_type += f'; charset={request.accepted_renderer.charset}'
+            response = HttpResponse(content, content_type=content_type)
+            response['Content-Disposition'] = (
+                f'inline; filename="{self._get_filename(request, None)}"'
+            )
+        response['ETag'] = etag
+        response['Cache-Control'] = cache_control
+        return response
+
+
+class BatchView(generics.GenericAPIView):
+    """
+    Several API operations in one request (see apps/core/batch.py)
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = BatchSerializer
+    
+    @extend_schema(
+        summary="Batch",
+        description=(
+            "Esegue in ordine più operazioni sulle API esistenti (metodo, percorso, corpo JSON). "
+            "Con atomic=true la prima operazione fallita annulla tutte le modifiche e le "
+            "successive non vengono eseguite (424)."
+        ),
+        parameters=[IDEMPOTENCY_PARAMETER],
+        responses={200: inline_serializer('BatchResult', {
+            'committed': serializers.BooleanField(),
+            'results': inline_serializer('BatchOperationResult', {
+                'status': serializers.IntegerField(),
+                'body': serializers.JSONField(),
+                'headers': serializers.DictField(child=serializers.CharField(), required=False),
+            }, many=True),
+        })},
+    )
+    @idempotent
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(run_batch(
+            request,
+            serializer.validated_data['operations'],
+            atomic=serializer.validated_data['atomic'],
+        ))
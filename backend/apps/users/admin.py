@@ -5,7 +5,8 @@ Admin configuration for users app
 from django import forms
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, WorkArea
+from .models import User, WorkArea, ArchivedUser
+from .avatars import schedule_avatar_processing
 
 
 class NotificationPreferencesWidget(forms.Widget):
@@ -139,4 +140,21 @@ class UserAdmin(BaseUserAdmin):
     
     def get_queryset(self, request):
         """Include soft-deleted users in admin"""
-        return self.model.all_objects.all()
\ No newline at end of file
+        return self.model.all_objects.all()
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if 'avatar' in form.changed_data:
+            schedule_avatar_processing(obj)
+
+@admin.register(ArchivedUser)
+class ArchivedUserAdmin(admin.ModelAdmin):
+    list_display = ['username', 'email', 'role', 'deleted_at', 'archived_at']
+    list_filter = ['role']
+    search_fields = ['username', 'email', 'first_name', 'last_name']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
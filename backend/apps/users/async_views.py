@@ -0,0 +1,222 @@
+"""
+Async views for the I/O-bound users endpoints
+
+Used instead of their DRF counterparts when ASYNC_VIEWS is enabled (ASGI
+deployment, see README): SMTP round trips, CSV parsing and streamed exports
+then wait on the event loop instead of holding a worker thread.
+"""
+
+import asyncio
+import csv
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+
+from apps.core.async_views import AsyncAPIView, release_connections
+from apps.core.idempotency import idempotent
+from .models import User
+from .permissions import IsAdmin
+from .views import BulkActionsView, EXPORT_HEADER, scope_users, filter_export_users
+
+EXPORT_CHUNK_SIZE = 500
+
+
+def _json(data, status_code=status.HTTP_200_OK):
+    return JsonResponse(data, status=status_code, json_dumps_params={'ensure_ascii': False})
+
+
+class AsyncBulkActionsView(AsyncAPIView):
+    """
+    Bulk actions on users (admin only)
+
+    ``send_credentials`` hashes passwords in worker threads and sends the
+    emails concurrently; the other actions are single UPDATE statements and
+    reuse BulkActionsView.perform_action.
+    """
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    @idempotent
+    async def post(self, request):
+        from .bulk_serializers import BulkActionSerializer
+
+        serializer = BulkActionSerializer(data=await sync_to_async(lambda: request.data)())
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
+
+        user_ids = serializer.validated_data['user_ids']
+        action = serializer.validated_data['action']
+        role = serializer.validated_data.get('role')
+        work_area_ids = serializer.validated_data.get('work_area_ids')
+
+        users = scope_users(request.user, User.objects.filter(id__in=user_ids))
+
+        if not await users.aexists():
+            return _json({
+                'error': 'Nessun utente trovato o permessi insufficienti'
+            }, status.HTTP_400_BAD_REQUEST)
+
+        if action == 'send_credentials':
+            return _json(await self.send_credentials(users))
+
+        data, status_code = await sync_to_async(BulkActionsView().perform_action)(
+            request, users, action, role, work_area_ids
+        )
+        return _json(data, status_code)
+
+    async def send_credentials(self, users):
+        from .utils import generate_random_password, asend_bulk_credentials_emails
+
+        hash_password = sync_to_async(make_password, thread_sensitive=False)
+
+        users = [user async for user in users]
+        passwords = [generate_random_password() for _ in users]
+
+        # Hashing and SMTP wait on worker threads: no connection is kept
+        # checked out from the pool meanwhile
+        await release_connections()
+        hashes = await asyncio.gather(*[hash_password(password) for password in passwords])
+
+        for user, hashed in zip(users, hashes):
+            user.password = hashed
+        # One UPDATE; the timestamped update() bumps updated_at
+        await sync_to_async(User.objects.bulk_update)(users, ['password'])
+        users_with_passwords = list(zip(users, passwords))
+
+        await release_connections()
+        email_results = await asend_bulk_credentials_emails(users_with_passwords)
+        results = {
+            'success': email_results['success_count'],
+            'failed': email_results['failed_count'],
+            'errors': email_results['failed_emails'],
+        }
+
+        return {
+            'message': (
+                f"Credenziali inviate: {email_results['success_count']} successi, "
+                f"{email_results['failed_count']} falliti"
+            ),
+            'results': results,
+        }
+
+
+class AsyncCSVImportPreviewView(AsyncAPIView):
+    """
+    Preview CSV import before confirming
+
+    Reading and parsing the upload runs in the request's thread, so the event
+    loop keeps serving other requests meanwhile.
+    """
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    async def post(self, request):
+        from .bulk_serializers import CSVImportSerializer, UserCSVPreviewSerializer
+
+        def preview():
+            serializer = CSVImportSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+
+            users_data, errors = serializer.parse_csv()
+
+            return {
+                'preview': UserCSVPreviewSerializer(users_data, many=True).data,
+                'errors': errors,
+                'valid_count': len(users_data),
+                'error_count': len(errors),
+            }
+
+        # parse_csv() queries the database: in the request's thread, its
+        # connection goes back to the pool at the end of the request and it
+        # sees the outer transaction of an atomic /api/batch/
+        return _json(await sync_to_async(preview)())
+
+
+class _Echo:
+    """File-like object returning what is written, for csv.writer streaming"""
+
+    def write(self, value):
+        return value
+
+
+class AsyncExportUsersView(AsyncAPIView):
+    """
+    Export users to CSV, streamed while the rows are read
+
+    Users are read in chunks with a server-side cursor and the work areas of
+    each chunk are fetched with a single query, so memory stays flat and the
+    query count grows with the number of chunks rather than of users.
+    """
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    async def get(self, request):
+        from .bulk_serializers import ExportFilterSerializer
+
+        filter_serializer = ExportFilterSerializer(data=request.query_params)
+        await sync_to_async(filter_serializer.is_valid)(raise_exception=True)
+
+        filters = filter_serializer.validated_data
+        if filters.get('format', 'csv') != 'csv':
+            return _json({
+                'error': 'Formato Excel non ancora implementato. Usa CSV.'
+            }, status.HTTP_400_BAD_REQUEST)
+
+        queryset = filter_export_users(
+            scope_users(request.user, User.objects.all()),
+            filters
+        )
+
+        response = StreamingHttpResponse(
+            self.stream_rows(queryset),
+            content_type='text/csv; charset=utf-8'
+        )
+        response['Content-Disposition'] = 'attachment; filename="users_export.csv"'
+        return response
+
+    async def stream_rows(self, queryset):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(EXPORT_HEADER)
+
+        # Model instances rather than values_list(): on Django 4.2 only the
+        # model iterable is fetched lazily by aiterator().
+        users = queryset.only(
+            'id', 'username', 'email', 'first_name', 'last_name', 'role',
+            'phone', 'is_active_volunteer', 'joined_date', 'created_at'
+        )
+
+        chunk = []
+        async for user in users.aiterator(chunk_size=EXPORT_CHUNK_SIZE):
+            chunk.append(user)
+            if len(chunk) >= EXPORT_CHUNK_SIZE:
+                for line in await self.render_chunk(writer, chunk):
+                    yield line
+                chunk = []
+
+        if chunk:
+            for line in await self.render_chunk(writer, chunk):
+                yield line
+
+    async def render_chunk(self, writer, chunk):
+        area_names = {}
+        memberships = User.work_areas.through.objects.filter(
+            user_id__in=[user.id for user in chunk]
+        ).order_by('workarea__name').values_list('user_id', 'workarea__name')
+        async for user_id, name in memberships:
+            area_names.setdefault(user_id, []).append(name)
+
+        return [
+            writer.writerow([
+                user.id,
+                user.username,
+                user.email,
+                user.first_name,
+                user.last_name,
+                user.get_role_display(),
+                user.phone,
+                ', '.join(area_names.get(user.id, [])),
+                'Sì' if user.is_active_volunteer else 'No',
+                user.joined_date.strftime('%Y-%m-%d') if user.joined_date else '',
+                user.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            ])
+            for user in chunk
+        ]
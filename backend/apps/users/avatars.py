@@ -0,0 +1,150 @@
+"""
+Avatar renditions
+
+Uploaded avatars are usually multi-megabyte phone photos, while the UI shows
+them as small bubbles. After an upload the image is decoded once, rotated
+according to its EXIF orientation, center-cropped to a square and saved in a
+few fixed sizes (AVATAR_RENDITION_SIZES) as WebP without any metadata.
+The work runs in a small background thread pool once the upload is committed;
+``User.avatar_thumbnails`` maps each size to the stored rendition.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image, ImageOps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = 'avatars/renditions'
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Thread pool of this process (recreated after a fork)"""
+    global _executor, _executor_pid
+    pid = os.getpid()
+    if _executor_pid != pid:
+        with _executor_lock:
+            if _executor_pid != pid:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.AVATAR_WORKERS, thread_name_prefix='avatars'
+                )
+                _executor_pid = pid
+    return _executor
+
+
+def render(image_file, sizes=None, image_format=None, quality=None):
+    """
+    Build the renditions of an image
+
+    Args:
+        image_file: File-like object with the original image
+        sizes (list): Side lengths in pixels (default AVATAR_RENDITION_SIZES)
+
+    Returns:
+        dict: {size: encoded bytes}
+    """
+    sizes = sizes or settings.AVATAR_RENDITION_SIZES
+    image_format = image_format or settings.AVATAR_RENDITION_FORMAT
+    quality = quality or settings.AVATAR_RENDITION_QUALITY
+
+    with Image.open(image_file) as original:
+        # Decode at most at the largest size needed (JPEG can downscale while decoding)
+        largest = max(sizes)
+        original.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(original)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        if image_format == 'JPEG' and image.mode == 'RGBA':
+            image = image.convert('RGB')
+
+        renditions = {}
+        # Largest first: each smaller size is resampled from the previous one
+        for size in sorted(sizes, reverse=True):
+            image = ImageOps.fit(image, (size, size), Image.LANCZOS)
+            buffer = BytesIO()
+            # A fresh image carries no EXIF, ICC or XMP metadata
+            image.save(buffer, image_format, quality=quality, method=4 if image_format == 'WEBP' else 0)
+            renditions[size] = buffer.getvalue()
+    return renditions
+
+
+def process_avatar(user_id, avatar_name):
+    """
+    Generate and store the renditions of a user's avatar
+
+    Skipped if the avatar changed in the meantime (a newer upload schedules
+    its own processing); the renditions just stored are deleted then.
+
+    Returns:
+        dict: The new ``avatar_thumbnails`` map, or None if skipped
+    """
+    try:
+        with default_storage.open(avatar_name, 'rb') as image_file:
+            renditions = render(image_file)
+
+        extension = settings.AVATAR_RENDITION_FORMAT.lower()
+        digest = hashlib.sha1(avatar_name.encode()).hexdigest()[:12]
+        thumbnails = {}
+        for size, content in sorted(renditions.items()):
+            name = f'{RENDITIONS_DIR}/{user_id}/{digest}_{size}.{extension}'
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            thumbnails[str(size)] = default_storage.save(name, ContentFile(content))
+
+        current = User.all_objects.filter(pk=user_id, avatar=avatar_name)
+        user = current.only('avatar_thumbnails').first()
+        if user is None or not current.update(avatar_thumbnails=thumbnails, updated_at=timezone.now()):
+            # The avatar changed meanwhile: nothing refers to these files
+            delete_renditions(thumbnails.values())
+            return None
+        previous = user.avatar_thumbnails or {}
+        delete_renditions(name for name in previous.values() if name not in thumbnails.values())
+        return thumbnails
+    except Exception:
+        logger.exception("Generazione delle miniature dell'avatar fallita (utente %s)", user_id)
+        return None
+    finally:
+        close_old_connections()
+
+
+def delete_renditions(names):
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except OSError:
+            logger.warning("Impossibile eliminare la miniatura %s", name, exc_info=True)
+
+
+def schedule_avatar_processing(user):
+    """
+    Generate the renditions of ``user.avatar`` in the background once the
+    current transaction commits; clears them if the avatar was removed
+    """
+    if not user.avatar:
+        previous = user.avatar_thumbnails or {}
+        if previous:
+            User.all_objects.filter(pk=user.pk).update(avatar_thumbnails={}, updated_at=timezone.now())
+            user.avatar_thumbnails = {}
+            transaction.on_commit(lambda: delete_renditions(previous.values()))
+        return
+
+    user_id, avatar_name = user.pk, user.avatar.name
+    if settings.AVATAR_ASYNC:
+        transaction.on_commit(lambda: get_executor().submit(process_avatar, user_id, avatar_name))
+    else:
+        transaction.on_commit(lambda: process_avatar(user_id, avatar_name))
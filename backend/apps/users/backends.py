@@ -0,0 +1,36 @@
+"""
+Authentication backends for users app
+"""
+
+from django.contrib.auth.backends import ModelBackend
+
+from .models import User
+
+
+class EmailOrUsernameBackend(ModelBackend):
+    """
+    Login with username or email, both case-insensitive
+
+    The lookup is one query on the functional unique indexes of
+    ``LOWER(username)`` and ``LOWER(email)``. Soft-deleted users cannot log in.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        users = list(User.objects.by_login(username).order_by()[:2])
+        # One user's username may be another user's email: the username wins
+        user = next((user for user in users if user.username.lower() == username.lower()), None)
+        if user is None and users:
+            user = users[0]
+
+        if user is None:
+            # Hash anyway, so response times don't tell which logins exist
+            User().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
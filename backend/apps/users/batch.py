@@ -0,0 +1,100 @@
+"""
+Batch lookup of users by id (users/batch/)
+
+Resolves many ids with one scoped query instead of one users/<id>/ request
+per id. Results keep the order of the request; ids the caller cannot see are
+reported apart as ``missing`` (no such user, or deleted) or ``forbidden``
+(outside the caller's scope).
+
+GET responses carry an ETag computed from the caller, the request and the
+``updated_at`` of the rows (work area changes touch their users, see
+signals.py), so a revalidation is answered with a 304 before serializing.
+"""
+
+import hashlib
+
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+
+from .bootstrap import user_digest
+from .models import User
+
+SHAPE_PARAMETERS = ('fields', 'omit', 'expand')
+
+
+def parse_ids(request):
+    """
+    Ids from ``?ids=1,2,3`` (GET) or ``{"ids": [1, 2, 3]}`` (POST), without
+    duplicates and in request order
+
+    Raises:
+        ValidationError: Missing, malformed or too many ids
+    """
+    if request.method == 'POST':
+        values = request.data.get('ids') if hasattr(request.data, 'get') else None
+        if not isinstance(values, list):
+            raise ValidationError({'ids': "Indicare un elenco di id"})
+    else:
+        values = [value for value in request.query_params.get('ids', '').split(',') if value.strip()]
+
+    ids, seen, invalid = [], set(), []
+    for value in values:
+        try:
+            if isinstance(value, bool):
+                raise ValueError
+            pk = int(value)
+        except (TypeError, ValueError):
+            invalid.append(str(value))
+            continue
+        if pk < 1:
+            invalid.append(str(value))
+        elif pk not in seen:
+            seen.add(pk)
+            ids.append(pk)
+    if invalid:
+        raise ValidationError({'ids': f"Id non validi: {', '.join(invalid[:10])}"})
+    if not ids:
+        raise ValidationError({'ids': "Indicare almeno un id"})
+    if len(ids) > settings.USER_BATCH_MAX_IDS:
+        raise ValidationError({'ids': f"Al massimo {settings.USER_BATCH_MAX_IDS} id per richiesta"})
+    return ids
+
+
+def lookup_users(request, ids, visible, fast_serializer):
+    """
+    Args:
+        ids (list): From ``parse_ids``
+        visible (QuerySet): Users the caller can see
+        fast_serializer (FastSerializer): Shape of the results
+
+    Returns:
+        tuple: (rows by id, missing ids, forbidden ids, etag); render the
+        rows with ``serialize_batch``
+    """
+    stamp = len(fast_serializer.columns)
+    rows = {row[0]: row for row in fast_serializer.rows(visible.filter(pk__in=ids).order_by(), 'updated_at')}
+
+    missing, forbidden = [], []
+    unresolved = [pk for pk in ids if pk not in rows]
+    if unresolved:
+        existing = set(User.objects.filter(pk__in=unresolved).values_list('pk', flat=True))
+        for pk in unresolved:
+            (forbidden if pk in existing else missing).append(pk)
+
+    digest = hashlib.sha256(repr([
+        user_digest(request.user, request),
+        [(name, request.query_params.get(name)) for name in SHAPE_PARAMETERS],
+        [(pk, rows[pk][stamp]) for pk in ids if pk in rows],
+        missing,
+        forbidden,
+    ]).encode()).hexdigest()[:16]
+    return rows, missing, forbidden, f'"{digest}"'
+
+
+def serialize_batch(ids, rows, missing, forbidden, fast_serializer, context):
+    """Response payload, results in request order"""
+    return {
+        'results': fast_serializer.serialize([rows[pk] for pk in ids if pk in rows], context),
+        'missing': missing,
+        'forbidden': forbidden,
+    }
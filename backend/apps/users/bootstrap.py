@@ -0,0 +1,146 @@
+"""
+Start-up payload of the PWA (GET bootstrap/)
+
+The response is assembled from two entries of the 'hot' cache:
+
+- the active work areas, shared by every user, with a content version
+- the serialized user, keyed by user id and validated against a digest of
+  the user row the authentication already loaded, so bulk update() calls
+  (which send no signals) still invalidate it
+
+A warm request costs no query beyond the authentication one; a cold one
+adds at most two (active work areas, the user's work areas). Signal
+handlers in signals.py drop the entries when areas or memberships change;
+the WorkArea queryset does it for update() and bulk_update(), which send
+no signals.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import prefetch_related_objects
+
+from .models import User, WorkArea
+
+AREAS_KEY = 'bootstrap:work-areas'
+USER_KEY = 'bootstrap:user:{}'
+TIMEOUT = 60 * 60 * 24
+
+# Fields left out of the user digest: never part of the payload
+_DIGEST_EXCLUDE = {'password'}
+
+
+def _cache():
+    return caches['hot']
+
+
+def _version(data):
+    encoded = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def user_key(user_id):
+    return USER_KEY.format(user_id)
+
+
+def user_digest(user, request):
+    """
+    Digest of the loaded user row and of the host the URLs are built for
+    """
+    values = [request.build_absolute_uri('/')]
+    values.extend(
+        getattr(user, field.attname)
+        for field in User._meta.concrete_fields
+        if field.name not in _DIGEST_EXCLUDE
+    )
+    return hashlib.sha256(repr(values).encode()).hexdigest()[:16]
+
+
+def server_config():
+    """Settings the client needs at start-up"""
+    return {
+        'roles': [{'value': value, 'label': label} for value, label in User.ROLE_CHOICES],
+        'page_size': settings.REST_FRAMEWORK.get('PAGE_SIZE'),
+        'access_token_lifetime': int(settings.SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'].total_seconds()),
+        'avatar_max_upload_size': settings.AVATAR_MAX_UPLOAD_SIZE,
+        'avatar_sizes': settings.AVATAR_RENDITION_SIZES,
+    }
+
+
+def _load_areas(cache):
+    from .serializers import WorkAreaSerializer
+
+    entry = cache.get(AREAS_KEY)
+    if entry is None:
+        areas = WorkAreaSerializer(WorkArea.objects.filter(is_active=True), many=True).data
+        areas = json.loads(json.dumps(areas, cls=DjangoJSONEncoder))
+        entry = {'version': _version(areas), 'areas': areas}
+        cache.set(AREAS_KEY, entry, TIMEOUT)
+    return entry
+
+
+def _load_user(cache, user, request, areas_version, entry):
+    from .serializers import UserDetailSerializer
+
+    digest = user_digest(user, request)
+    if entry is not None and entry['digest'] == digest and entry['areas_version'] == areas_version:
+        return entry
+
+    prefetch_related_objects([user], 'work_areas')
+    data = UserDetailSerializer(user, context={'request': request}).data
+    data = json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+    entry = {
+        'digest': digest,
+        'areas_version': areas_version,
+        'version': _version(data),
+        'user': data,
+    }
+    cache.set(user_key(user.pk), entry, TIMEOUT)
+    return entry
+
+
+def build_bootstrap(user, request):
+    """
+    Start-up payload of ``user``
+
+    Returns:
+        tuple: (payload dict, ETag)
+    """
+    cache = _cache()
+    found = cache.get_many([AREAS_KEY, user_key(user.pk)])
+
+    areas = found.get(AREAS_KEY) or _load_areas(cache)
+    entry = _load_user(cache, user, request, areas['version'], found.get(user_key(user.pk)))
+
+    if user.is_superadmin:
+        managed = [area['id'] for area in areas['areas']]
+    elif user.is_admin:
+        managed = [area['id'] for area in entry['user']['work_areas'] if area['is_active']]
+    else:
+        managed = []
+
+    config = server_config()
+    payload = {
+        'user': entry['user'],
+        'work_areas': areas['areas'],
+        'capabilities': {
+            'is_admin': user.is_admin,
+            'is_superadmin': user.is_superadmin,
+            'managed_area_ids': managed,
+        },
+        'config': config,
+    }
+    etag = '"%s"' % _version([entry['version'], areas['version'], config])
+    return payload, etag
+
+
+def invalidate_areas():
+    _cache().delete(AREAS_KEY)
+
+
+def invalidate_users(user_ids):
+    if user_ids:
+        _cache().delete_many([user_key(user_id) for user_id in user_ids])
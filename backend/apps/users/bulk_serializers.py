@@ -5,10 +5,13 @@ Serializers for bulk operations and CSV import/export
 import csv
 import io
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
 from django.core.validators import validate_email
 from django.db import transaction
+from .memberships import WORK_AREA_ACTIONS
 from .models import User, WorkArea
+from .roster import REQUIRED_COLUMNS, read_roster
 
 
 class BulkActionSerializer(serializers.Serializer):
@@ -21,6 +24,9 @@ class BulkActionSerializer(serializers.Serializer):
         ('delete', 'Elimina'),
         ('send_credentials', 'Invia Credenziali'),
         ('assign_role', 'Assegna Ruolo'),
+        ('add_work_areas', 'Aggiungi Aree di Lavoro'),
+        ('remove_work_areas', 'Rimuovi Aree di Lavoro'),
+        ('replace_work_areas', 'Sostituisci Aree di Lavoro'),
     ]
     
     user_ids = serializers.ListField(
@@ -40,6 +46,11 @@ class BulkActionSerializer(serializers.Serializer):
         required=False,
         help_text="Ruolo da assegnare (solo per assign_role)"
     )
+    work_area_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        help_text="Aree di lavoro da aggiungere, rimuovere o con cui sostituire quelle attuali"
+    )
     
     def validate(self, attrs):
         action = attrs.get('action')
@@ -51,13 +62,42 @@ class BulkActionSerializer(serializers.Serializer):
                 'role': 'Il ruolo è obbligatorio per l\'azione assign_role'
             })
         
+        if action in WORK_AREA_ACTIONS:
+            attrs['work_area_ids'] = self.validate_action_work_areas(action, attrs.get('work_area_ids'))
+        
         return attrs
+    
+    def validate_action_work_areas(self, action, work_area_ids):
+        """
+        Check the areas of the work area actions with one query
+        
+        Returns:
+            set: Area ids (may be empty only to replace with no areas)
+        """
+        if work_area_ids is None or (not work_area_ids and action != 'replace_work_areas'):
+            raise serializers.ValidationError({
+                'work_area_ids': f"Le aree di lavoro sono obbligatorie per l'azione {action}"
+            })
+        
+        ids = set(work_area_ids)
+        areas = WorkArea.objects.filter(pk__in=ids)
+        if action != 'remove_work_areas':
+            # Removing memberships of a deactivated area is still allowed
+            areas = areas.filter(is_active=True)
+        unknown = ids - set(areas.values_list('pk', flat=True))
+        if unknown:
+            raise serializers.ValidationError({
+                'work_area_ids': f"Aree di lavoro non trovate: {', '.join(str(pk) for pk in sorted(unknown))}"
+            })
+        return ids
 
 
 class CSVImportSerializer(serializers.Serializer):
     """
     Serializer for CSV import
     """
+    MAX_FILE_SIZE = 5 * 1024 * 1024
+    
     file = serializers.FileField(
         required=True,
         help_text="File CSV da importare"
@@ -72,9 +112,11 @@ class CSVImportSerializer(serializers.Serializer):
         if not file.name.endswith('.csv'):
             raise serializers.ValidationError('Il file deve essere in formato CSV')
         
-        # Check file size (max 5MB)
-        if file.size > 5 * 1024 * 1024:
-            raise serializers.ValidationError('Il file non può superare i 5MB')
+        # Check file size
+        if file.size > self.MAX_FILE_SIZE:
+            raise serializers.ValidationError(
+                f'Il file non può superare i {self.MAX_FILE_SIZE // (1024 * 1024)}MB'
+            )
         
         return file
     
@@ -99,6 +141,7 @@ class CSVImportSerializer(serializers.Serializer):
         
         users_data = []
         errors = []
+        file_usernames, file_emails = {}, {}
         
         required_fields = ['username', 'email', 'first_name', 'last_name']
         
@@ -118,13 +161,20 @@ class CSVImportSerializer(serializers.Serializer):
                 except Exception as e:
                     row_errors.append(f"Email non valida: {str(e)}")
             
-            # Check if username or email already exists
+            # Check if username or email already exists (case-insensitive,
+            # soft-deleted users included: the unique indexes cover them)
             username = row.get('username', '').strip()
-            if username and User.objects.filter(username=username).exists():
+            if username and username.lower() in file_usernames:
+                row_errors.append(f"Username '{username}' già presente alla riga {file_usernames[username.lower()]}")
+            elif username and User.objects.with_deleted().by_username(username).exists():
                 row_errors.append(f"Username '{username}' già esistente")
             
-            if email and User.objects.filter(email=email).exists():
+            if email and email.lower() in file_emails:
+                row_errors.append(f"Email '{email}' già presente alla riga {file_emails[email.lower()]}")
+            elif email and User.objects.with_deleted().by_email(email).exists():
                 row_errors.append(f"Email '{email}' già esistente")
+            file_usernames.setdefault(username.lower(), row_num)
+            file_emails.setdefault(email.lower(), row_num)
             
             # Validate role
             role = row.get('role', 'base').strip().lower()
@@ -162,6 +212,35 @@ class CSVImportSerializer(serializers.Serializer):
         return users_data, errors
 
 
+class RosterSyncSerializer(CSVImportSerializer):
+    """
+    Serializer for the roster synchronisation (see roster.py)
+    """
+    MAX_FILE_SIZE = settings.ROSTER_SYNC_MAX_UPLOAD_SIZE
+    
+    deactivate_missing = serializers.BooleanField(
+        default=False,
+        help_text="Disattiva i volontari assenti dal file"
+    )
+    dry_run = serializers.BooleanField(
+        default=False,
+        help_text="Restituisce solo il report delle differenze, senza applicarle"
+    )
+    
+    def validate(self, attrs):
+        try:
+            columns, rows = read_roster(attrs['file'])
+        except (UnicodeDecodeError, csv.Error):
+            raise serializers.ValidationError({'file': 'Il file deve essere un CSV codificato in UTF-8'})
+        missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+        if missing:
+            raise serializers.ValidationError({
+                'file': f"Colonne obbligatorie mancanti: {', '.join(missing)}"
+            })
+        attrs['columns'], attrs['rows'] = columns, rows
+        return attrs
+
+
 class UserCSVPreviewSerializer(serializers.Serializer):
     """
     Serializer for CSV preview before import
@@ -0,0 +1,46 @@
+"""
+Compiled read-only serializers for large users and work areas pages
+
+Same output as UserListSerializer and WorkAreaSerializer (see
+apps/core/fast_serializers.py), checked by ``python -m benchmarks serializers``.
+"""
+
+from django.core.files.storage import default_storage
+
+from apps.core.fast_serializers import FastSerializer, Nested
+from .serializers import UserListSerializer, WorkAreaSerializer
+
+
+def _full_name(context):
+    # User.get_full_name() or username, as UserListSerializer.get_full_name
+    def full_name(first_name, last_name, username):
+        return f'{first_name} {last_name}'.strip() or username
+    return full_name
+
+
+def _avatar_thumbnails(context):
+    # AvatarThumbnailsField.to_representation
+    request = context.get('request')
+
+    def thumbnails(value):
+        if request is None:
+            return {size: default_storage.url(name) for size, name in (value or {}).items()}
+        return {
+            size: request.build_absolute_uri(default_storage.url(name))
+            for size, name in (value or {}).items()
+        }
+    return thumbnails
+
+
+work_area_serializer = FastSerializer(WorkAreaSerializer)
+
+user_list_serializer = FastSerializer(
+    UserListSerializer,
+    computed={
+        'full_name': (('first_name', 'last_name', 'username'), _full_name),
+        'avatar_thumbnails': (('avatar_thumbnails',), _avatar_thumbnails),
+    },
+    nested={
+        'work_areas': Nested('work_areas', work_area_serializer),
+    },
+)
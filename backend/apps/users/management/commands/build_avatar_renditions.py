@@ -0,0 +1,47 @@
+"""
+Generate the avatar renditions of existing users
+
+Needed once for avatars uploaded before renditions existed, or after changing
+AVATAR_RENDITION_SIZES / AVATAR_RENDITION_FORMAT:
+
+    python manage.py build_avatar_renditions [--all]
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.users.avatars import process_avatar
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = "Genera le miniature degli avatar degli utenti esistenti"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help="Rigenera anche le miniature già presenti",
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.AVATAR_WORKERS,
+            help="Immagini elaborate in parallelo",
+        )
+
+    def handle(self, *args, **options):
+        users = User.all_objects.exclude(avatar='').exclude(avatar__isnull=True)
+        if not options['all']:
+            users = users.filter(avatar_thumbnails={})
+
+        pending = list(users.values_list('id', 'avatar'))
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            results = list(executor.map(lambda row: process_avatar(*row), pending))
+
+        done = sum(1 for result in results if result is not None)
+        self.stdout.write(self.style.SUCCESS(
+            f"Miniature generate per {done} utenti su {len(pending)}"
+        ))
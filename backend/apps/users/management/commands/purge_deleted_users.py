@@ -0,0 +1,63 @@
+"""
+Archive and permanently delete users soft-deleted long ago
+
+Meant to be scheduled (cron, systemd timer, ...), e.g. nightly:
+
+    python manage.py purge_deleted_users --days 365 --batch-size 200 --sleep 0.2
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.users.purge import purge_soft_deleted_users
+
+
+class Command(BaseCommand):
+    help = "Archivia ed elimina definitivamente gli utenti eliminati (soft delete) da più di N giorni"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.USER_PURGE_RETENTION_DAYS,
+            help="Giorni trascorsi dalla soft delete (default: USER_PURGE_RETENTION_DAYS)",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help="Utenti eliminati per transazione",
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.1,
+            help="Pausa in secondi tra un batch e l'altro",
+        )
+        parser.add_argument(
+            '--export-file',
+            help="Scrive gli utenti archiviati in un file .jsonl.gz invece della tabella di archivio",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Conta soltanto gli utenti da eliminare",
+        )
+
+    def handle(self, *args, **options):
+        results = purge_soft_deleted_users(
+            older_than_days=options['days'],
+            batch_size=options['batch_size'],
+            sleep=options['sleep'],
+            export_file=options['export_file'],
+            dry_run=options['dry_run'],
+            log=self.stdout.write,
+        )
+
+        if options['dry_run']:
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{results['purged']} utenti eliminati definitivamente in {results['batches']} batch, "
+            f"{results['elapsed']:.1f}s ({results['rows_per_second']:.0f} righe/s)"
+        ))
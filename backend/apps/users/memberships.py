@@ -0,0 +1,133 @@
+"""
+Work area memberships of many users at once (bulk-actions/, roster sync)
+
+``work_areas.set()`` per user costs a diff SELECT plus an INSERT and a
+DELETE each. Here the diff is computed against the through table for a
+chunk of users with one SELECT and applied with one bulk INSERT and one
+DELETE per chunk.
+
+Bulk writes send no m2m_changed signal, so the handlers' work is done
+explicitly: bootstrap entries dropped, ``updated_at`` bumped (delta sync,
+ETags), area admins' sync cursors reset when non-base users lose a
+membership and m2m_add/m2m_remove audit entries recorded per user.
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.audit import recorder
+from apps.core.sync import restamp
+from . import bootstrap
+from .models import User
+from .signals import memberships_removed, touch_users
+
+CHUNK_SIZE = 500
+
+ADD, REMOVE, REPLACE = 'add_work_areas', 'remove_work_areas', 'replace_work_areas'
+WORK_AREA_ACTIONS = (ADD, REMOVE, REPLACE)
+
+
+def _audited():
+    return 'work_areas' in getattr(settings, 'AUDIT_MODELS', {}).get(User._meta.label, ())
+
+
+def _apply_chunk(targets, mode):
+    """
+    Args:
+        targets: {user_id: area ids} of the chunk
+        mode: ADD, REMOVE or REPLACE
+
+    Returns:
+        tuple: {user_id: added area ids}, {user_id: removed area ids}
+    """
+    through = User.work_areas.through
+    existing = through.objects.filter(user_id__in=list(targets))
+    if mode != REPLACE:
+        existing = existing.filter(workarea_id__in=set().union(*targets.values()))
+    current = defaultdict(set)
+    rows = {}
+    for pk, user_id, area_id in existing.values_list('pk', 'user_id', 'workarea_id'):
+        current[user_id].add(area_id)
+        rows[user_id, area_id] = pk
+
+    added, removed = {}, {}
+    for user_id, area_ids in targets.items():
+        if mode != REMOVE and area_ids - current[user_id]:
+            added[user_id] = area_ids - current[user_id]
+        if mode == REMOVE and current[user_id] & area_ids:
+            removed[user_id] = current[user_id] & area_ids
+        elif mode == REPLACE and current[user_id] - area_ids:
+            removed[user_id] = current[user_id] - area_ids
+
+    if removed:
+        through.objects.filter(pk__in=[
+            rows[user_id, area_id] for user_id, ids in removed.items() for area_id in ids
+        ]).delete()
+    if added:
+        through.objects.bulk_create([
+            through(user_id=user_id, workarea_id=area_id) for user_id, ids in added.items() for area_id in ids
+        ])
+    return added, removed
+
+
+def apply_work_areas(targets, mode=REPLACE):
+    """
+    Apply per-user work area changes in chunks
+
+    Args:
+        targets: {user_id: area ids}
+        mode: ADD, REMOVE or REPLACE
+
+    Returns:
+        dict: users changed, memberships added and removed
+    """
+    audited = _audited()
+    user_ids = list(targets)
+    summary = {'changed': 0, 'added': 0, 'removed': 0}
+    started = timezone.now()
+
+    with transaction.atomic():
+        changed, lost = set(), set()
+        for start in range(0, len(user_ids), CHUNK_SIZE):
+            chunk = {user_id: targets[user_id] for user_id in user_ids[start:start + CHUNK_SIZE]}
+            added, removed = _apply_chunk(chunk, mode)
+            chunk_changed = added.keys() | removed.keys()
+            if not chunk_changed:
+                continue
+            touch_users(chunk_changed)
+            if audited:
+                for action, memberships in (('m2m_remove', removed), ('m2m_add', added)):
+                    for user_id, ids in memberships.items():
+                        recorder.record(User, user_id, action, {'work_areas': (None, sorted(ids))})
+            changed |= chunk_changed
+            lost |= removed.keys()
+            summary['added'] += sum(len(ids) for ids in added.values())
+            summary['removed'] += sum(len(ids) for ids in removed.values())
+        memberships_removed(lost)
+        restamp(User.all_objects, changed, started)
+        # Dropped once committed, so no request caches the old memberships again
+        transaction.on_commit(lambda: bootstrap.invalidate_users(changed))
+    summary['changed'] = len(changed)
+    return summary
+
+
+def change_work_areas(users, area_ids, mode):
+    """
+    Add, remove or replace the work areas of ``users``
+
+    Args:
+        users: Users queryset (already scoped)
+        area_ids: Work area ids
+        mode: ADD, REMOVE or REPLACE
+
+    Returns:
+        dict: users matched, users changed, memberships added and removed
+    """
+    area_ids = set(area_ids)
+    user_ids = list(users.order_by().values_list('pk', flat=True).distinct())
+    summary = apply_work_areas({user_id: area_ids for user_id in user_ids}, mode)
+    summary['users'] = len(user_ids)
+    return summary
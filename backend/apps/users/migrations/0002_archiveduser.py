@@ -0,0 +1,72 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedUser",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "original_id",
+                    models.BigIntegerField(unique=True, verbose_name="ID Originale"),
+                ),
+                ("username", models.CharField(max_length=150, verbose_name="Username")),
+                ("email", models.EmailField(max_length=254, verbose_name="Email")),
+                (
+                    "first_name",
+                    models.CharField(blank=True, max_length=150, verbose_name="Nome"),
+                ),
+                (
+                    "last_name",
+                    models.CharField(
+                        blank=True, max_length=150, verbose_name="Cognome"
+                    ),
+                ),
+                ("role", models.CharField(max_length=20, verbose_name="Ruolo")),
+                (
+                    "work_area_codes",
+                    models.JSONField(default=list, verbose_name="Aree di Lavoro"),
+                ),
+                (
+                    "joined_date",
+                    models.DateField(
+                        blank=True, null=True, verbose_name="Data Iscrizione"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(verbose_name="Creato il")),
+                ("deleted_at", models.DateTimeField(verbose_name="Eliminato il")),
+                (
+                    "deleted_by_id",
+                    models.BigIntegerField(
+                        blank=True, null=True, verbose_name="Eliminato da (ID)"
+                    ),
+                ),
+                (
+                    "archived_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Archiviato il"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Utente Archiviato",
+                "verbose_name_plural": "Utenti Archiviati",
+                "ordering": ["-deleted_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0002_archiveduser"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="avatar_thumbnails",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Percorsi delle miniature per dimensione: {'48': 'avatars/renditions/...'}",
+                verbose_name="Miniature Avatar",
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0003_user_avatar_thumbnails"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(fields=["updated_at", "id"], name="user_sync_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="workarea",
+            index=models.Index(fields=["updated_at", "id"], name="workarea_sync_idx"),
+        ),
+    ]
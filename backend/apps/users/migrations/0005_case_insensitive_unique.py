@@ -0,0 +1,72 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:45
+
+from django.core.management.base import CommandError
+from django.db import migrations, models
+from django.db.models.functions import Lower
+import django.db.models.functions.text
+
+BATCH_SIZE = 5000
+
+
+def find_collisions(User, field):
+    """
+    Users whose ``field`` differs only in case, walking the table by id in
+    batches (short queries, no lock held on the whole table)
+
+    Returns:
+        dict: {lowercase value: [(id, value), ...]} with two or more users
+    """
+    seen, collisions = {}, {}
+    last_pk = 0
+    while True:
+        batch = list(
+            User._base_manager.filter(pk__gt=last_pk).order_by('pk')
+            .annotate(key=Lower(field)).values_list('pk', 'key', field)[:BATCH_SIZE]
+        )
+        if not batch:
+            return collisions
+        for pk, key, value in batch:
+            if key in seen:
+                collisions.setdefault(key, [seen[key]]).append((pk, value))
+            else:
+                seen[key] = (pk, value)
+        last_pk = batch[-1][0]
+
+
+def check_collisions(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    lines = []
+    for field in ('email', 'username'):
+        for users in find_collisions(User, field).values():
+            lines.append(f"  {field}: " + ", ".join(f"'{value}' (id {pk})" for pk, value in users))
+    if lines:
+        raise CommandError(
+            "Impossibile rendere email e username univoci senza distinzione tra maiuscole e minuscole: "
+            "unire o rinominare questi utenti (anche eliminati) e ripetere la migrazione\n" + "\n".join(lines)
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0004_sync_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(check_collisions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="user",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("email"),
+                name="user_email_ci_unique",
+                violation_error_message="Email già in uso",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="user",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("username"),
+                name="user_username_ci_unique",
+                violation_error_message="Username già in uso",
+            ),
+        ),
+    ]
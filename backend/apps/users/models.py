@@ -3,8 +3,50 @@ Users app models
 """
 
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-from django.db import models
-from apps.core.models import TimeStampedModel, SoftDeleteModel, SoftDeleteManager
+from django.db import models, transaction
+from django.db.models import Q, Value
+from django.db.models.functions import Lower
+from django.db.models.lookups import Exact
+from django.utils import timezone
+from apps.core.models import TimeStampedModel, TimeStampedQuerySet, SoftDeleteModel, SoftDeleteManager
+from apps.audit.query import AuditedQuerySet
+
+
+class UsersAppQuerySet(TimeStampedQuerySet, AuditedQuerySet):
+    """
+    QuerySet of the users app models: update() bumps ``updated_at`` and is audited
+    """
+
+
+class WorkAreaQuerySet(UsersAppQuerySet):
+    """
+    update() and bulk_update() send no signals: like the post_save handler
+    in signals.py they touch the members and drop the bootstrap areas entry
+    """
+
+    def _touch_members(self, areas):
+        User.all_objects.filter(work_areas__in=areas).update(updated_at=timezone.now())
+
+    def _areas_changed(self):
+        from . import bootstrap
+
+        transaction.on_commit(bootstrap.invalidate_areas, using=self.db)
+
+    def update(self, **kwargs):
+        with transaction.atomic(using=self.db):
+            # Before the update, which may change what the filter matches
+            self._touch_members(self.values('pk'))
+            rows = super().update(**kwargs)
+            self._areas_changed()
+        return rows
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            self._touch_members([obj.pk for obj in objs])
+            rows = super().bulk_update(objs, fields, batch_size=batch_size)
+            self._areas_changed()
+        return rows
 
 
 class WorkArea(TimeStampedModel):
@@ -28,18 +70,63 @@ class WorkArea(TimeStampedModel):
     )
     is_active = models.BooleanField(default=True, verbose_name="Attiva")
     
+    objects = WorkAreaQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Area di Lavoro"
         verbose_name_plural = "Aree di Lavoro"
         ordering = ['name']
+        indexes = [
+            # Delta sync (sync/ endpoint) walks rows in this order
+            models.Index(fields=['updated_at', 'id'], name='workarea_sync_idx'),
+        ]
     
     def __str__(self):
         return self.name
 
 
-class UserManager(BaseUserManager, SoftDeleteManager):
+def _iexact(field, value):
+    """
+    ``LOWER(field) = LOWER(value)``: matches the functional unique indexes
+    (``iexact`` compiles to ``UPPER``/``LIKE`` and cannot use them)
+    """
+    return Exact(Lower(field), Lower(Value(value)))
+
+
+class UserQuerySet(UsersAppQuerySet):
+    """
+    Case-insensitive lookups by email and username, one index probe each;
+    update() of the role resets the area admins' sync cursors (signals.py)
+    """
+    
+    def by_email(self, email):
+        return self.filter(_iexact('email', email))
+    
+    def by_username(self, username):
+        return self.filter(_iexact('username', username))
+    
+    def by_login(self, login):
+        """Users whose username or email is ``login``"""
+        return self.filter(Q(_iexact('username', login)) | Q(_iexact('email', login)))
+    
+    def update(self, **kwargs):
+        if kwargs.get('role', 'base') == 'base':
+            return super().update(**kwargs)
+        from .signals import left_scope
+
+        with transaction.atomic(using=self.db):
+            # Base volunteers becoming admins leave the scope of other area admins
+            leaving = self.filter(role='base').exists()
+            rows = super().update(**kwargs)
+            if leaving:
+                left_scope()
+        return rows
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet), SoftDeleteManager):
     """
-    Custom manager for User with soft delete support and Django auth compatibility
+    Custom manager for User with soft delete support, Django auth compatibility
+    and audited bulk updates
     """
     
     def get_queryset(self):
@@ -48,9 +135,9 @@ class UserManager(BaseUserManager, SoftDeleteManager):
     
     def get_by_natural_key(self, username):
         """
-        Django auth requirement - get user by username
+        Django auth requirement - get user by username (case-insensitive)
         """
-        return self.get(**{self.model.USERNAME_FIELD: username})
+        return self.by_username(username).get()
     
     def create_user(self, username, email, password=None, **extra_fields):
         """Create and save a regular user"""
@@ -115,6 +202,13 @@ class User(AbstractUser, TimeStampedModel, SoftDeleteModel):
         blank=True,
         verbose_name="Avatar"
     )
+    avatar_thumbnails = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Miniature Avatar",
+        help_text="Percorsi delle miniature per dimensione: {'48': 'avatars/renditions/...'}"
+    )
     
     # Volunteer status
     is_active_volunteer = models.BooleanField(
@@ -141,6 +235,24 @@ class User(AbstractUser, TimeStampedModel, SoftDeleteModel):
         verbose_name = "Utente"
         verbose_name_plural = "Utenti"
         ordering = ['last_name', 'first_name']
+        indexes = [
+            # Delta sync (sync/ endpoint) walks rows in this order
+            models.Index(fields=['updated_at', 'id'], name='user_sync_idx'),
+        ]
+        constraints = [
+            # "Mario.Rossi@..." and "mario.rossi@..." are the same account. The
+            # indexes also serve by_email(), by_username() and login
+            models.UniqueConstraint(
+                Lower('email'),
+                name='user_email_ci_unique',
+                violation_error_message="Email già in uso",
+            ),
+            models.UniqueConstraint(
+                Lower('username'),
+                name='user_username_ci_unique',
+                violation_error_message="Username già in uso",
+            ),
+        ]
     
     def __str__(self):
         full_name = self.get_full_name()
@@ -182,3 +294,29 @@ class User(AbstractUser, TimeStampedModel, SoftDeleteModel):
         if self.is_superadmin:
             return WorkArea.objects.filter(is_active=True)
         return self.work_areas.filter(is_active=True)
+
+
+class ArchivedUser(models.Model):
+    """
+    Compact snapshot of a user that was purged after a long soft delete
+    """
+    original_id = models.BigIntegerField(unique=True, verbose_name="ID Originale")
+    username = models.CharField(max_length=150, verbose_name="Username")
+    email = models.EmailField(verbose_name="Email")
+    first_name = models.CharField(max_length=150, blank=True, verbose_name="Nome")
+    last_name = models.CharField(max_length=150, blank=True, verbose_name="Cognome")
+    role = models.CharField(max_length=20, verbose_name="Ruolo")
+    work_area_codes = models.JSONField(default=list, verbose_name="Aree di Lavoro")
+    joined_date = models.DateField(null=True, blank=True, verbose_name="Data Iscrizione")
+    created_at = models.DateTimeField(verbose_name="Creato il")
+    deleted_at = models.DateTimeField(verbose_name="Eliminato il")
+    deleted_by_id = models.BigIntegerField(null=True, blank=True, verbose_name="Eliminato da (ID)")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="Archiviato il")
+    
+    class Meta:
+        verbose_name = "Utente Archiviato"
+        verbose_name_plural = "Utenti Archiviati"
+        ordering = ['-deleted_at']
+    
+    def __str__(self):
+        return f"{self.username} (archiviato)"
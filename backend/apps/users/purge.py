@@ -0,0 +1,171 @@
+"""
+Purge and archival of long soft-deleted users
+
+Soft-deleted users stay in the users table forever. This module moves the
+ones deleted more than N days ago into ``ArchivedUser`` (or a gzip JSON-lines
+file) and hard-deletes them in small, id-ordered batches so that every
+transaction stays short.
+"""
+
+import gzip
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import User, ArchivedUser
+
+
+ARCHIVE_FIELDS = [
+    'id', 'username', 'email', 'first_name', 'last_name', 'role',
+    'joined_date', 'created_at', 'deleted_at', 'deleted_by_id',
+]
+
+
+def get_purgeable_users(cutoff):
+    """
+    Queryset of users soft-deleted before ``cutoff`` that can be purged
+
+    Users still referenced through ``deleted_by`` by another row are skipped,
+    so the attribution of that deletion is never lost. They become purgeable
+    once the referencing rows have been purged themselves.
+
+    Args:
+        cutoff (datetime): Only rows with ``deleted_at`` before this are returned
+
+    Returns:
+        QuerySet: Purgeable users, ordered by id
+    """
+    still_referenced = User.all_objects.filter(
+        deleted_by_id=OuterRef('pk')
+    ).exclude(pk=OuterRef('pk'))
+
+    return User.all_objects.filter(
+        is_deleted=True,
+        deleted_at__lt=cutoff,
+    ).exclude(
+        Exists(still_referenced)
+    ).order_by('id')
+
+
+def _archive_rows(ids):
+    """Build archive snapshots for a batch of user ids"""
+    rows = list(User.all_objects.filter(id__in=ids).values(*ARCHIVE_FIELDS))
+
+    area_codes = {}
+    memberships = User.work_areas.through.objects.filter(
+        user_id__in=ids
+    ).values_list('user_id', 'workarea__code')
+    for user_id, code in memberships:
+        area_codes.setdefault(user_id, []).append(code)
+
+    for row in rows:
+        row['original_id'] = row.pop('id')
+        row['work_area_codes'] = sorted(area_codes.get(row['original_id'], []))
+
+    return rows
+
+
+def purge_soft_deleted_users(older_than_days=None, batch_size=200, sleep=0.1,
+                             export_file=None, dry_run=False, log=None):
+    """
+    Archive and hard-delete users soft-deleted more than N days ago
+
+    Batches are selected with keyset pagination on the primary key and each
+    batch is archived and deleted in its own short transaction. ``sleep``
+    seconds are waited between batches to leave room for regular traffic.
+
+    Args:
+        older_than_days (int): Retention in days, defaults to USER_PURGE_RETENTION_DAYS
+        batch_size (int): Number of users per transaction
+        sleep (float): Pause between batches, in seconds
+        export_file (str): If set, write snapshots to this gzip JSON-lines file
+            instead of the ArchivedUser table, each batch after its commit
+        dry_run (bool): Only count purgeable users, change nothing
+        log (callable): Optional callback receiving progress messages
+
+    Returns:
+        dict: Summary with purged count, batches, elapsed seconds and rows/second
+    """
+    if older_than_days is None:
+        older_than_days = settings.USER_PURGE_RETENTION_DAYS
+    log = log or (lambda message: None)
+
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    candidates = get_purgeable_users(cutoff)
+
+    if dry_run:
+        count = candidates.count()
+        log(f"{count} utenti eliminati prima del {cutoff:%Y-%m-%d} da eliminare definitivamente")
+        return {'purged': 0, 'candidates': count, 'batches': 0, 'elapsed': 0.0, 'rows_per_second': 0.0}
+
+    export = gzip.open(export_file, 'at', encoding='utf-8') if export_file else None
+
+    purged = 0
+    batches = 0
+    last_id = 0
+    started = time.monotonic()
+
+    try:
+        while True:
+            ids = list(
+                candidates.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+
+            batch_started = time.monotonic()
+            with transaction.atomic():
+                # Re-check the conditions under lock: a user may have been
+                # restored since the batch was selected.
+                ids = list(
+                    candidates.filter(id__in=ids).select_for_update(of=('self',))
+                    .values_list('id', flat=True)
+                )
+                if not ids:
+                    continue
+
+                rows = _archive_rows(ids)
+                lines = []
+                if export is not None:
+                    lines = [json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in rows]
+                else:
+                    ArchivedUser.objects.bulk_create(
+                        [ArchivedUser(**row) for row in rows],
+                        ignore_conflicts=True,
+                    )
+
+                User.all_objects.filter(id__in=ids).delete()
+
+            # Only once committed: a rolled back batch is exported again by the next run
+            if lines:
+                export.writelines(lines)
+                export.flush()
+
+            purged += len(ids)
+            batches += 1
+            batch_elapsed = time.monotonic() - batch_started
+            log(
+                f"Batch {batches}: {len(ids)} utenti in {batch_elapsed:.2f}s "
+                f"({len(ids) / batch_elapsed if batch_elapsed else 0:.0f} righe/s)"
+            )
+
+            if sleep:
+                time.sleep(sleep)
+    finally:
+        if export is not None:
+            export.close()
+
+    elapsed = time.monotonic() - started
+    return {
+        'purged': purged,
+        'batches': batches,
+        'elapsed': elapsed,
+        'rows_per_second': purged / elapsed if elapsed else 0.0,
+    }
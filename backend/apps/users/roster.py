@@ -0,0 +1,320 @@
+"""
+Roster synchronisation (POST import/sync/)
+
+Applies a full membership list, e.g. the monthly export of the national
+registry, in the CSV format of the import:
+
+- rows are matched to users by email or username, case-insensitive like
+  their unique indexes
+- only the columns present in the file are synced; a content hash of those
+  columns tells unchanged users apart, and they are not written at all
+- changed users are written with bulk_update, new users with bulk_create,
+  memberships with the chunked diff of memberships.py
+- with ``deactivate_missing`` the active volunteers (in the requester's
+  scope) missing from the file become inactive
+- a report lists created, updated (with the changes) and deactivated users
+  and the rows with errors; with ``dry_run`` nothing is written
+
+Bulk writes send no signals: audit entries are recorded explicitly,
+``updated_at`` is set on every written row (delta sync, ETags) and base
+volunteers given another role reset the area admins' sync cursors.
+"""
+
+import csv
+import hashlib
+import io
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils import timezone
+
+from apps.audit import recorder
+from apps.audit.signals import get_audited_fields
+from apps.core.sync import restamp
+from . import bootstrap
+from .memberships import REPLACE, apply_work_areas
+from .models import User, WorkArea
+from .signals import left_scope
+
+SYNC_COLUMNS = ('username', 'email', 'first_name', 'last_name', 'role', 'phone')
+REQUIRED_COLUMNS = ('username', 'email', 'first_name', 'last_name')
+AREAS_COLUMN = 'work_area_codes'
+BATCH_SIZE = 500
+
+
+def read_roster(file):
+    """
+    Returns:
+        tuple: Column names and (row number, row) pairs
+    """
+    file.seek(0)
+    # utf-8-sig: spreadsheet exports often start with a BOM
+    reader = csv.DictReader(io.StringIO(file.read().decode('utf-8-sig')))
+    rows = list(enumerate(reader, start=2))  # Row 1 is the header
+    return reader.fieldnames or [], rows
+
+
+def row_hash(values):
+    """Digest of the synced values of a row (same columns, same digest)"""
+    parts = []
+    for name in sorted(values):
+        value = values[name]
+        parts.append(','.join(sorted(value)) if isinstance(value, frozenset) else value)
+    return hashlib.sha1('\x1f'.join(parts).encode()).digest()
+
+
+class RosterSync:
+    """
+    Plan (and apply) the synchronisation of ``rows`` on behalf of ``actor``
+
+    plan() reads the users, their memberships and the work areas with one
+    query each, whatever the size of the file.
+    """
+
+    def __init__(self, actor, columns, rows, deactivate_missing=False):
+        self.actor = actor
+        self.columns = [column for column in SYNC_COLUMNS if column in columns]
+        self._max_lengths = {column: User._meta.get_field(column).max_length for column in self.columns}
+        self.sync_areas = AREAS_COLUMN in columns
+        self.rows = rows
+        self.deactivate_missing = deactivate_missing
+
+        self.created = []      # (row number, values)
+        self.updated = []      # (row number, user id, changes)
+        self.deactivated = []  # (user id, username)
+        self.errors = []
+        self.unchanged = 0
+        self._current = {}
+
+    def _load(self):
+        from .views import scope_users
+
+        areas = list(WorkArea.objects.values_list('pk', 'code', 'is_active'))
+        self._area_ids = {code: pk for pk, code, is_active in areas if is_active}
+        area_codes = {pk: code for pk, code, _ in areas}
+
+        memberships = {}
+        if self.sync_areas:
+            for user_id, area_id in User.work_areas.through.objects.values_list('user_id', 'workarea_id'):
+                memberships.setdefault(user_id, set()).add(area_codes[area_id])
+
+        self._by_email, self._by_username, self._state = {}, {}, {}
+        for pk, is_deleted, is_active_volunteer, *values in User.all_objects.values_list(
+            'pk', 'is_deleted', 'is_active_volunteer', *SYNC_COLUMNS
+        ):
+            current = dict(zip(SYNC_COLUMNS, values))
+            if self.sync_areas:
+                current['work_areas'] = frozenset(memberships.get(pk, ()))
+            self._current[pk] = current
+            self._state[pk] = (is_deleted, is_active_volunteer)
+            self._by_email[current['email'].lower()] = pk
+            self._by_username[current['username'].lower()] = pk
+
+        self._visible = None
+        if not self.actor.is_superadmin:
+            self._visible = set(scope_users(self.actor, User.objects.all()).values_list('pk', flat=True))
+
+    def _values(self, row):
+        """Synced values of ``row`` and its errors"""
+        values, errors = {}, []
+        for column, max_length in self._max_lengths.items():
+            value = (row.get(column) or '').strip()
+            if len(value) > max_length:
+                errors.append(f"Campo '{column}' troppo lungo (massimo {max_length} caratteri)")
+            values[column] = value
+
+        for column in REQUIRED_COLUMNS:
+            if not values[column]:
+                errors.append(f"Campo '{column}' obbligatorio mancante")
+        if values['email']:
+            try:
+                validate_email(values['email'])
+            except ValidationError:
+                errors.append(f"Email non valida: {values['email']}")
+
+        if 'role' in values:
+            role = values.pop('role').lower()
+            valid_roles = [choice[0] for choice in User.ROLE_CHOICES]
+            if role and role not in valid_roles:
+                errors.append(f"Ruolo '{role}' non valido. Valori: {', '.join(valid_roles)}")
+            elif role == 'superadmin' and not self.actor.is_superadmin:
+                errors.append("Solo i superadmin possono assegnare il ruolo superadmin")
+            elif role:
+                # An empty cell keeps the current role
+                values['role'] = role
+
+        if self.sync_areas:
+            codes = {code.strip() for code in (row.get(AREAS_COLUMN) or '').split(',') if code.strip()}
+            unknown = sorted(codes - self._area_ids.keys())
+            if unknown:
+                errors.append(f"Aree di lavoro non trovate: {', '.join(unknown)}")
+            values['work_areas'] = frozenset(codes)
+        return values, errors
+
+    def _match(self, values, errors):
+        """Id of the user ``values`` refers to, None for a new user"""
+        by_email = self._by_email.get(values['email'].lower())
+        by_username = self._by_username.get(values['username'].lower())
+        if by_email is not None and by_username is not None and by_email != by_username:
+            errors.append("Email e username appartengono a utenti diversi")
+        user_id = by_email if by_email is not None else by_username
+        if user_id is None:
+            return None
+        if self._state[user_id][0]:
+            errors.append("Utente eliminato: ripristinarlo prima della sincronizzazione")
+        elif self._visible is not None and user_id not in self._visible:
+            errors.append("Utente fuori dal proprio ambito")
+        return user_id
+
+    def plan(self):
+        self._load()
+        seen = set()
+        file_emails, file_usernames = {}, {}
+
+        for row_num, row in self.rows:
+            values, errors = self._values(row)
+            email, username = values['email'].lower(), values['username'].lower()
+            if email and email in file_emails:
+                errors.append(f"Email già presente alla riga {file_emails[email]}")
+            if username and username in file_usernames:
+                errors.append(f"Username già presente alla riga {file_usernames[username]}")
+            file_emails.setdefault(email, row_num)
+            file_usernames.setdefault(username, row_num)
+
+            user_id = self._match(values, errors) if email or username else None
+            if user_id is not None:
+                # Also with errors: a user whose row is wrong is not missing
+                seen.add(user_id)
+            if errors:
+                self.errors.append({'row': row_num, 'data': row, 'errors': errors})
+            elif user_id is None:
+                self.created.append((row_num, values))
+            else:
+                current = {name: self._current[user_id][name] for name in values}
+                if row_hash(values) == row_hash(current):
+                    self.unchanged += 1
+                else:
+                    self.updated.append((row_num, user_id, {
+                        name: (current[name], value) for name, value in values.items() if current[name] != value
+                    }))
+
+        if self.deactivate_missing:
+            for pk, (is_deleted, is_active_volunteer) in self._state.items():
+                if (
+                    not is_deleted and is_active_volunteer and pk not in seen and pk != self.actor.pk
+                    and (self._visible is None or pk in self._visible)
+                ):
+                    self.deactivated.append((pk, self._current[pk]['username']))
+        return self
+
+    def apply(self, send_credentials=False):
+        """
+        Write the planned changes in one transaction
+
+        Returns:
+            list: (user, password) of the created users to send credentials to
+        """
+        from .utils import generate_random_password
+
+        now = timezone.now()
+        audited = [field.name for field in get_audited_fields(User)]
+        users_with_passwords = []
+        area_targets = {}
+
+        with transaction.atomic():
+            changed_fields = set()
+            updates = []
+            for _, user_id, changes in self.updated:
+                scalar = {name: new for name, (_, new) in changes.items() if name != 'work_areas'}
+                if 'work_areas' in changes:
+                    area_targets[user_id] = changes['work_areas'][1]
+                if scalar:
+                    current = {name: self._current[user_id][name] for name in SYNC_COLUMNS}
+                    updates.append(User(pk=user_id, updated_at=now, **{**current, **scalar}))
+                    changed_fields.update(scalar)
+            if updates:
+                User.all_objects.bulk_update(updates, [*sorted(changed_fields), 'updated_at'], batch_size=BATCH_SIZE)
+                if any(changes.get('role', (None,))[0] == 'base' for _, _, changes in self.updated):
+                    # No longer base volunteers: out of other area admins' scope
+                    left_scope()
+
+            new_users = []
+            for _, values in self.created:
+                user = User(**{name: value for name, value in values.items() if name != 'work_areas'})
+                if send_credentials:
+                    password = generate_random_password()
+                    user.password = make_password(password)
+                    users_with_passwords.append((user, password))
+                else:
+                    # Credentials can be sent later with the send_credentials bulk action
+                    user.password = make_password(None)
+                new_users.append(user)
+            User.all_objects.bulk_create(new_users, batch_size=BATCH_SIZE)
+            if new_users and new_users[0].pk is None:
+                # Backends that cannot return the new ids
+                ids = dict(User.all_objects.filter(
+                    username__in=[user.username for user in new_users]
+                ).values_list('username', 'pk'))
+                for user in new_users:
+                    user.pk = ids[user.username]
+            for user, (_, values) in zip(new_users, self.created):
+                if values.get('work_areas'):
+                    area_targets[user.pk] = values['work_areas']
+
+            if area_targets:
+                apply_work_areas({
+                    user_id: {self._area_ids[code] for code in codes} for user_id, codes in area_targets.items()
+                }, REPLACE)
+
+            deactivated_ids = [pk for pk, _ in self.deactivated]
+            for start in range(0, len(deactivated_ids), BATCH_SIZE):
+                # Audited update(): records its own entries
+                User.objects.filter(pk__in=deactivated_ids[start:start + BATCH_SIZE]).update(
+                    is_active_volunteer=False
+                )
+
+            for user in new_users:
+                changes = {name: (None, getattr(user, name)) for name in audited}
+                recorder.record(User, user.pk, 'create', changes)
+            for _, user_id, changes in self.updated:
+                changes = {name: change for name, change in changes.items() if name in audited}
+                if changes:
+                    recorder.record(User, user_id, 'bulk_update', changes)
+
+            updated_ids = [user.pk for user in updates]
+            written = {*updated_ids, *area_targets, *deactivated_ids, *(user.pk for user in new_users)}
+            restamp(User.all_objects, written, now)
+            transaction.on_commit(lambda: bootstrap.invalidate_users(updated_ids))
+        return users_with_passwords
+
+    def report(self):
+        def listed(value):
+            return sorted(value) if isinstance(value, frozenset) else value
+
+        return {
+            'summary': {
+                'rows': len(self.rows),
+                'created': len(self.created),
+                'updated': len(self.updated),
+                'unchanged': self.unchanged,
+                'deactivated': len(self.deactivated),
+                'errors': len(self.errors),
+            },
+            'created': [
+                {'row': row_num, 'username': values['username'], 'email': values['email']}
+                for row_num, values in self.created
+            ],
+            'updated': [
+                {
+                    'row': row_num,
+                    'id': user_id,
+                    'username': self._current[user_id]['username'],
+                    'changes': {name: [listed(old), listed(new)] for name, (old, new) in changes.items()},
+                }
+                for row_num, user_id, changes in self.updated
+            ],
+            'deactivated': [{'id': pk, 'username': username} for pk, username in self.deactivated],
+            'errors': self.errors,
+        }
@@ -3,12 +3,31 @@ Serializers for users app
 """
 
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from django.core.files.storage import default_storage
+from django.db import transaction
+from apps.core.concurrency import save_if_unmodified
+from apps.core.metrics import TimedSerializerMixin
 from .models import User, WorkArea
 
 
-class WorkAreaSerializer(serializers.ModelSerializer):
+class AvatarThumbnailsField(serializers.ReadOnlyField):
+    """
+    Avatar renditions as {size: URL}, absolute like ImageField URLs
+    """
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        thumbnails = {}
+        for size, name in (value or {}).items():
+            url = default_storage.url(name)
+            thumbnails[size] = request.build_absolute_uri(url) if request is not None else url
+        return thumbnails
+
+
+class WorkAreaSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for WorkArea model
     """
@@ -22,26 +41,27 @@ class WorkAreaSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class UserListSerializer(serializers.ModelSerializer):
+class UserListSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for User list (minimal info)
     """
     work_areas = WorkAreaSerializer(many=True, read_only=True)
     full_name = serializers.SerializerMethodField()
+    avatar_thumbnails = AvatarThumbnailsField()
     
     class Meta:
         model = User
         fields = [
             'id', 'username', 'email', 'first_name', 'last_name',
             'full_name', 'role', 'work_areas', 'is_active_volunteer',
-            'avatar', 'phone'
+            'avatar', 'avatar_thumbnails', 'phone'
         ]
     
     def get_full_name(self, obj):
         return obj.get_full_name() or obj.username
 
 
-class UserDetailSerializer(serializers.ModelSerializer):
+class UserDetailSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for User detail (complete info)
     """
@@ -54,13 +74,14 @@ class UserDetailSerializer(serializers.ModelSerializer):
         required=False
     )
     full_name = serializers.SerializerMethodField()
+    avatar_thumbnails = AvatarThumbnailsField()
     
     class Meta:
         model = User
         fields = [
             'id', 'username', 'email', 'first_name', 'last_name',
             'full_name', 'role', 'work_areas', 'work_area_ids',
-            'is_active_volunteer', 'avatar', 'phone',
+            'is_active_volunteer', 'avatar', 'avatar_thumbnails', 'phone',
             'joined_date', 'notification_preferences',
             'is_active', 'created_at', 'updated_at',
             'last_login', 'date_joined'
@@ -100,6 +121,17 @@ class UserCreateSerializer(serializers.ModelSerializer):
             'phone', 'is_active_volunteer', 'joined_date'
         ]
     
+    def validate_username(self, value):
+        # Also soft-deleted users: the unique indexes cover them
+        if User.objects.with_deleted().by_username(value).exists():
+            raise serializers.ValidationError("Username già in uso")
+        return value
+    
+    def validate_email(self, value):
+        if User.objects.with_deleted().by_email(value).exists():
+            raise serializers.ValidationError("Email già in uso")
+        return value
+    
     def validate(self, attrs):
         if attrs.get('password') != attrs.get('password_confirm'):
             raise serializers.ValidationError({
@@ -143,16 +175,31 @@ class UserUpdateSerializer(serializers.ModelSerializer):
             'joined_date', 'notification_preferences', 'is_active'
         ]
     
+    def validate_email(self, value):
+        if User.objects.with_deleted().by_email(value).exclude(pk=self.instance.pk).exists():
+            raise serializers.ValidationError("Email già in uso")
+        return value
+    
     def update(self, instance, validated_data):
+        """
+        Write only the changed columns, with one conditional UPDATE when
+        ``unmodified_since`` is given (see apps/core/concurrency.py)
+        """
         work_areas = validated_data.pop('work_areas', None)
+        unmodified_since = validated_data.pop('unmodified_since', None)
         
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+        changed = [attr for attr, value in validated_data.items() if getattr(instance, attr) != value]
+        for attr in changed:
+            setattr(instance, attr, validated_data[attr])
         
-        instance.save()
-        
-        if work_areas is not None:
-            instance.work_areas.set(work_areas)
+        with transaction.atomic():
+            # The version check comes first: nothing is written on a conflict
+            if changed or (unmodified_since is not None and work_areas is not None):
+                save_if_unmodified(instance, changed, unmodified_since)
+            if work_areas is not None:
+                instance.work_areas.set(work_areas)
+                # Membership changes touch updated_at (signals.py)
+                instance.refresh_from_db(fields=['updated_at'])
         
         return instance
 
@@ -176,11 +223,25 @@ class ChangePasswordSerializer(serializers.Serializer):
         return attrs
 
 
+class AvatarUploadSerializer(serializers.Serializer):
+    """
+    Serializer for avatar upload
+    """
+    avatar = serializers.ImageField(required=True)
+    
+    def validate_avatar(self, value):
+        if value.size > settings.AVATAR_MAX_UPLOAD_SIZE:
+            raise serializers.ValidationError(
+                f"L'immagine non può superare {settings.AVATAR_MAX_UPLOAD_SIZE // (1024 * 1024)} MB"
+            )
+        return value
+
+
 class LoginSerializer(serializers.Serializer):
     """
     Serializer for login
     """
-    username = serializers.CharField(required=True)
+    username = serializers.CharField(required=True, help_text="Username o email")
     password = serializers.CharField(required=True, write_only=True)
     
     def validate(self, attrs):
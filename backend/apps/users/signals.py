@@ -0,0 +1,107 @@
+"""
+Signal handlers keeping the bootstrap cache entries and the delta sync
+cursors (apps/core/sync.py) consistent with the data
+"""
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.core.sync import bump_epoch
+from . import bootstrap
+from .models import User, WorkArea
+
+# Carried by the users sync cursors of area admins (users_scope in views.py)
+SCOPE_EPOCH = 'users-scope'
+
+
+def touch_users(user_ids):
+    """Bump ``updated_at`` of users whose serialized work areas changed"""
+    if user_ids:
+        User.all_objects.filter(pk__in=list(user_ids)).update(updated_at=timezone.now())
+
+
+def left_scope():
+    """
+    Users may have left the scope of some area admins: the users sync only
+    walks the rows in scope, so their tombstones would never be sent. The
+    area admins' cursors are reset once the change is committed
+    """
+    transaction.on_commit(lambda: bump_epoch(SCOPE_EPOCH))
+
+
+def memberships_removed(user_ids):
+    """``left_scope()`` unless the users who lost memberships are all base volunteers"""
+    # Base volunteers are in every admin's scope
+    if user_ids and User.all_objects.filter(pk__in=list(user_ids)).exclude(role='base').exists():
+        left_scope()
+
+
+@receiver(post_save, sender=WorkArea)
+def work_area_saved(sender, instance, created, raw, **kwargs):
+    # Users embedding the area are rebuilt once the areas version changes
+    bootstrap.invalidate_areas()
+    if not created and not raw:
+        touch_users(instance.users.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=WorkArea)
+def work_area_deleting(sender, instance, **kwargs):
+    # The memberships go with the area without any m2m_changed signal
+    user_ids = list(instance.users.values_list('pk', flat=True))
+    touch_users(user_ids)
+    memberships_removed(user_ids)
+
+
+@receiver(post_delete, sender=WorkArea)
+def work_area_deleted(sender, **kwargs):
+    bootstrap.invalidate_areas()
+    # A hard delete leaves no tombstone: sync clients must start over
+    bump_epoch('work-areas')
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    bootstrap.invalidate_users([instance.pk])
+    if not instance.is_deleted:
+        # Soft-deleted users already reached sync clients as tombstones
+        bump_epoch('users')
+
+
+@receiver(post_init, sender=User)
+def user_loaded(sender, instance, **kwargs):
+    # Only when loaded: reading a deferred field would hit the database
+    instance._scope_role = instance.__dict__.get('role')
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw, **kwargs):
+    role = instance.__dict__.get('role')
+    if not created and not raw and instance._scope_role == 'base' and role not in (None, 'base'):
+        left_scope()
+    instance._scope_role = role
+
+
+@receiver(m2m_changed, sender=User.work_areas.through)
+def work_areas_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # area.users.add(...): the users are in pk_set, except for clear()
+        if action == 'pre_clear':
+            instance._users_cleared = list(instance.users.values_list('pk', flat=True))
+            return
+        if action == 'post_clear':
+            user_ids = getattr(instance, '_users_cleared', [])
+        elif action in ('post_add', 'post_remove'):
+            user_ids = pk_set
+        else:
+            return
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        user_ids = [instance.pk]
+    else:
+        return
+
+    bootstrap.invalidate_users(user_ids)
+    touch_users(user_ids)
+    if action != 'post_add':
+        memberships_removed(user_ids)
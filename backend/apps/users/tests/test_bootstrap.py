@@ -0,0 +1,83 @@
+"""
+The bootstrap payload follows work area changes made without signals
+"""
+
+import pytest
+from django.core.cache import caches
+
+from apps.users import bootstrap
+from apps.users.models import User, WorkArea
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    caches['hot'].clear()
+
+
+@pytest.fixture
+def member(work_areas):
+    user = User.objects.create_user(username='mrossi', email='mario.rossi@example.com', password='password')
+    user.work_areas.set(work_areas[:1])
+    return user
+
+
+def get_bootstrap(client):
+    response = client.get('/api/auth/bootstrap/')
+    assert response.status_code == 200
+    return response.data, response['ETag']
+
+
+def area_names(data):
+    return sorted(area['name'] for area in data['work_areas'])
+
+
+def test_queryset_update(api_client, work_areas, member, django_capture_on_commit_callbacks):
+    data, etag = get_bootstrap(api_client)
+    assert 'Sanità' in area_names(data)
+    touched = User.objects.get(pk=member.pk).updated_at
+
+    with django_capture_on_commit_callbacks(execute=True):
+        WorkArea.objects.filter(code='sanità').update(name='Sanità e Soccorso')
+
+    assert caches['hot'].get(bootstrap.AREAS_KEY) is None
+    data, new_etag = get_bootstrap(api_client)
+    assert 'Sanità e Soccorso' in area_names(data)
+    assert new_etag != etag
+    # Members embed the area: delta sync must send them again
+    assert User.objects.get(pk=member.pk).updated_at > touched
+
+
+def test_queryset_update_changing_the_filtered_field(api_client, work_areas, member, django_capture_on_commit_callbacks):
+    get_bootstrap(api_client)
+    touched = User.objects.get(pk=member.pk).updated_at
+
+    with django_capture_on_commit_callbacks(execute=True):
+        WorkArea.objects.filter(is_active=True, code='sanità').update(is_active=False)
+
+    data, _ = get_bootstrap(api_client)
+    assert 'Sanità' not in area_names(data)
+    assert User.objects.get(pk=member.pk).updated_at > touched
+
+
+def test_bulk_update(api_client, work_areas, django_capture_on_commit_callbacks):
+    get_bootstrap(api_client)
+    areas = list(WorkArea.objects.all())
+    for area in areas:
+        area.name = area.name.upper()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        WorkArea.objects.bulk_update(areas, ['name'])
+
+    data, _ = get_bootstrap(api_client)
+    assert area_names(data) == ['LOGISTICA', 'PROTEZIONE CIVILE', 'SANITÀ']
+
+
+def test_rolled_back_update_keeps_the_entry(api_client, work_areas, django_capture_on_commit_callbacks):
+    get_bootstrap(api_client)
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        WorkArea.objects.filter(code='sanità').update(name='Sanità e Soccorso')
+    # Dropped only once the transaction commits
+    assert caches['hot'].get(bootstrap.AREAS_KEY) is not None
+    assert bootstrap.invalidate_areas in callbacks
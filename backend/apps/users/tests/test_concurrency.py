@@ -0,0 +1,139 @@
+"""
+Optimistic locking on user updates (apps/core/concurrency.py)
+"""
+
+from unittest import mock
+
+import pytest
+
+from apps.core import concurrency
+from apps.core.concurrency import PreconditionFailed, etag_for, save_if_unmodified
+from apps.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def user(work_areas):
+    user = User.objects.create_user(
+        username='mrossi', email='mario.rossi@example.com', password='password',
+        first_name='Mario', last_name='Rossi',
+    )
+    user.work_areas.set(work_areas[:1])
+    return user
+
+
+@pytest.fixture
+def url(user):
+    return f'/api/auth/users/{user.pk}/'
+
+
+def read_etag(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    return response['ETag']
+
+
+def patch(client, url, data, etag=None):
+    headers = {'HTTP_IF_MATCH': etag} if etag is not None else {}
+    return client.patch(url, data, format='json', **headers)
+
+
+def test_matching_etag_updates(api_client, user, url):
+    etag = read_etag(api_client, url)
+    response = patch(api_client, url, {'first_name': 'Marco'}, etag)
+    assert response.status_code == 200
+    assert response.data['first_name'] == 'Marco'
+    user.refresh_from_db()
+    assert user.first_name == 'Marco'
+    # The new version, usable for the next update
+    assert response['ETag'] != etag
+    assert response['ETag'] == etag_for(user) == read_etag(api_client, url)
+
+
+def test_work_areas_only_update_moves_etag(api_client, user, url, work_areas):
+    etag = read_etag(api_client, url)
+    response = patch(api_client, url, {'work_area_ids': [area.pk for area in work_areas]}, etag)
+    assert response.status_code == 200, response.data
+    assert response['ETag'] != etag
+    assert response['ETag'] == read_etag(api_client, url)
+    assert patch(api_client, url, {'first_name': 'Marco'}, etag).status_code == 412
+
+
+def test_stale_etag_is_refused(api_client, user, url):
+    stale = read_etag(api_client, url)
+    User.objects.filter(pk=user.pk).update(last_name='Bianchi')
+
+    response = patch(api_client, url, {'first_name': 'Marco'}, stale)
+    assert response.status_code == 412
+    assert response.data['current']['last_name'] == 'Bianchi'
+    assert response.data['current']['first_name'] == 'Mario'
+    assert response['ETag'] == read_etag(api_client, url) != stale
+    user.refresh_from_db()
+    assert user.first_name == 'Mario'
+
+
+def test_star_and_missing_header_update_unconditionally(api_client, user, url):
+    assert patch(api_client, url, {'first_name': 'Marco'}, '*').status_code == 200
+    assert patch(api_client, url, {'first_name': 'Luca'}).status_code == 200
+    user.refresh_from_db()
+    assert user.first_name == 'Luca'
+
+
+def test_missing_header_when_required(api_client, user, url, settings):
+    settings.OPTIMISTIC_LOCKING_REQUIRED = True
+    response = patch(api_client, url, {'first_name': 'Marco'})
+    assert response.status_code == 428
+    user.refresh_from_db()
+    assert user.first_name == 'Mario'
+    assert patch(api_client, url, {'first_name': 'Marco'}, read_etag(api_client, url)).status_code == 200
+
+
+def test_two_updates_on_the_same_etag(api_client, user, url):
+    etag = read_etag(api_client, url)
+    first = patch(api_client, url, {'first_name': 'Marco'}, etag)
+    second = patch(api_client, url, {'last_name': 'Verdi'}, etag)
+    assert first.status_code == 200
+    assert second.status_code == 412
+    assert second.data['current']['first_name'] == 'Marco'
+    user.refresh_from_db()
+    assert (user.first_name, user.last_name) == ('Marco', 'Rossi')
+
+
+def test_write_between_check_and_update(api_client, user, url):
+    """
+    Both requests pass the If-Match check before either writes: the
+    conditional UPDATE lets exactly one of them through
+    """
+    etag = read_etag(api_client, url)
+    check_if_match = concurrency.check_if_match
+
+    def check_then_interleave(request, instance):
+        unmodified_since = check_if_match(request, instance)
+        # The other request, checked against the same version, writes first
+        patched.side_effect = check_if_match
+        assert patch(api_client, url, {'last_name': 'Verdi'}, etag).status_code == 200
+        return unmodified_since
+
+    with mock.patch.object(concurrency, 'check_if_match', side_effect=check_then_interleave) as patched:
+        response = patch(api_client, url, {'first_name': 'Marco'}, etag)
+
+    assert response.status_code == 412
+    assert response.data['current']['last_name'] == 'Verdi'
+    user.refresh_from_db()
+    assert (user.first_name, user.last_name) == ('Mario', 'Verdi')
+
+
+def test_save_if_unmodified_interleaved(user):
+    first, second = User.objects.get(pk=user.pk), User.objects.get(pk=user.pk)
+    read_version = first.updated_at
+
+    first.first_name = 'Marco'
+    save_if_unmodified(first, ['first_name'], read_version)
+    second.last_name = 'Verdi'
+    with pytest.raises(PreconditionFailed):
+        save_if_unmodified(second, ['last_name'], read_version)
+
+    user.refresh_from_db()
+    assert (user.first_name, user.last_name) == ('Marco', 'Rossi')
+    assert user.updated_at == first.updated_at != read_version
@@ -0,0 +1,121 @@
+"""
+The compiled serializers render exactly what their DRF serializers render
+"""
+
+import pytest
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from apps.users.fast_serializers import user_list_serializer, work_area_serializer
+from apps.users.models import User, WorkArea
+from apps.users.serializers import UserListSerializer, WorkAreaSerializer
+
+pytestmark = pytest.mark.django_db
+
+
+def render(data):
+    # Bytes, so key order counts as well
+    return JSONRenderer().render(data)
+
+
+def assert_same_users(queryset, context):
+    expected = UserListSerializer(queryset.prefetch_related('work_areas'), many=True, context=context).data
+    actual = user_list_serializer.serialize(user_list_serializer.rows(queryset), context)
+    assert actual == expected
+    assert render(actual) == render(expected)
+
+
+def assert_same_work_areas(queryset, context):
+    expected = WorkAreaSerializer(queryset, many=True, context=context).data
+    actual = work_area_serializer.serialize(work_area_serializer.rows(queryset), context)
+    assert actual == expected
+    assert render(actual) == render(expected)
+
+
+@pytest.fixture
+def request_context():
+    return {'request': RequestFactory().get('/api/auth/users/')}
+
+
+@pytest.fixture
+def users(work_areas):
+    sanita, logistica, protezione_civile = work_areas
+    complete = User.objects.create_user(
+        username='mrossi', email='mario.rossi@example.com', password='password',
+        first_name='Mario', last_name='Rossi', role='admin', phone='+39 333 1234567',
+    )
+    complete.work_areas.set([protezione_civile, sanita, logistica])
+    complete.avatar = 'avatars/mrossi.jpg'
+    complete.avatar_thumbnails = {
+        '48': 'avatars/renditions/1/abc_48.webp',
+        '128': 'avatars/renditions/1/abc_128.webp',
+    }
+    complete.save()
+
+    first_name_only = User.objects.create_user(
+        username='giulia', email='giulia@example.com', password='password', first_name='Giulia',
+    )
+    first_name_only.work_areas.set([sanita])
+
+    # No names, phone, avatar or areas
+    User.objects.create_user(username='anonimo', email='anonimo@example.com', password='password')
+    return User.objects.filter(username__in=['mrossi', 'giulia', 'anonimo']).order_by('id')
+
+
+def test_users_with_request(users, request_context):
+    assert_same_users(users, request_context)
+
+
+def test_users_without_request(users):
+    assert_same_users(users, {})
+
+
+def test_empty_values(users, request_context):
+    row = user_list_serializer.serialize(user_list_serializer.rows(users.filter(username='anonimo')), request_context)[0]
+    assert row['full_name'] == 'anonimo'
+    assert row['avatar'] is None
+    assert row['avatar_thumbnails'] == {}
+    assert row['work_areas'] == []
+    assert row['phone'] == ''
+
+
+def test_avatar_urls(users, request_context):
+    with_request = user_list_serializer.serialize(user_list_serializer.rows(users.filter(username='mrossi')), request_context)[0]
+    without_request = user_list_serializer.serialize(user_list_serializer.rows(users.filter(username='mrossi')), {})[0]
+    assert with_request['avatar'] == 'http://testserver/media/avatars/mrossi.jpg'
+    assert with_request['avatar_thumbnails']['48'] == 'http://testserver/media/avatars/renditions/1/abc_48.webp'
+    assert without_request['avatar'] == '/media/avatars/mrossi.jpg'
+    assert without_request['avatar_thumbnails']['128'] == '/media/avatars/renditions/1/abc_128.webp'
+
+
+def test_full_name_and_role(users, request_context):
+    rows = {
+        row['username']: row
+        for row in user_list_serializer.serialize(user_list_serializer.rows(users), request_context)
+    }
+    assert rows['mrossi']['full_name'] == 'Mario Rossi'
+    assert rows['giulia']['full_name'] == 'Giulia'
+    # Choice fields render the stored value, not the label
+    assert rows['mrossi']['role'] == 'admin'
+    assert rows['giulia']['role'] == 'base'
+
+
+def test_nested_work_areas_in_default_ordering(users, request_context):
+    row = user_list_serializer.serialize(user_list_serializer.rows(users.filter(username='mrossi')), request_context)[0]
+    assert [area['name'] for area in row['work_areas']] == ['Logistica', 'Protezione Civile', 'Sanità']
+
+
+def test_work_areas(work_areas, request_context):
+    WorkArea.objects.filter(code='sanità').update(description='', icon='')
+    WorkArea.objects.create(name='Segreteria', code='segreteria', description='Documenti', icon='Folder', is_active=False)
+    assert_same_work_areas(WorkArea.objects.all(), request_context)
+    assert_same_work_areas(WorkArea.objects.all(), {})
+
+
+def test_subset(users, request_context):
+    subset = user_list_serializer.subset({'id': None, 'full_name': None, 'work_areas': {'name': None}})
+    expected = [
+        {'id': user['id'], 'full_name': user['full_name'], 'work_areas': [{'name': area['name']} for area in user['work_areas']]}
+        for user in UserListSerializer(users.prefetch_related('work_areas'), many=True, context=request_context).data
+    ]
+    assert subset.serialize(subset.rows(users), request_context) == expected
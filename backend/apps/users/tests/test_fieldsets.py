@@ -0,0 +1,155 @@
+"""
+Sparse fieldsets (apps/core/fieldsets.py): shape of the responses and the
+queries they save
+"""
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+THROUGH_TABLE = User.work_areas.through._meta.db_table
+WORK_AREA_TABLE = User.work_areas.field.related_model._meta.db_table
+
+
+@pytest.fixture
+def users(work_areas):
+    users = []
+    for index in range(5):
+        user = User.objects.create_user(
+            username=f'volontario{index}', email=f'volontario{index}@example.com', password='password',
+            first_name='Volontario', last_name=str(index), phone='0123456',
+        )
+        user.work_areas.set(work_areas[:2])
+        users.append(user)
+    return users
+
+
+def get(client, url):
+    """Response data and the SQL of the queries it ran"""
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200, response.data
+    return response.data, [query['sql'] for query in context.captured_queries]
+
+
+def tables_queried(queries, table):
+    return [sql for sql in queries if f'"{table}"' in sql]
+
+
+def volunteers(data):
+    rows = data['results'] if 'results' in data else data
+    return [row for row in rows if row['id'] != User.objects.get(username='superadmin').pk]
+
+
+class TestList:
+    url = '/api/auth/users/'
+
+    def test_default(self, api_client, users, django_assert_max_num_queries):
+        with django_assert_max_num_queries(4):
+            data, queries = get(api_client, self.url)
+        assert set(volunteers(data)[0]) >= {'id', 'username', 'full_name', 'work_areas', 'phone'}
+        assert len(volunteers(data)[0]['work_areas']) == 2
+
+    def test_fields(self, api_client, users, django_assert_max_num_queries):
+        with django_assert_max_num_queries(2):
+            data, queries = get(api_client, f'{self.url}?fields=id,full_name')
+        assert set(volunteers(data)[0]) == {'id', 'full_name'}
+        assert volunteers(data)[0]['full_name'] == 'Volontario 0'
+        assert not tables_queried(queries, THROUGH_TABLE)
+        # Only the columns full_name needs
+        assert '"phone"' not in queries[-1] and '"email"' not in queries[-1]
+
+    def test_omit(self, api_client, users, django_assert_max_num_queries):
+        with django_assert_max_num_queries(2):
+            data, queries = get(api_client, f'{self.url}?omit=work_areas,phone')
+        assert 'work_areas' not in volunteers(data)[0]
+        assert 'phone' not in volunteers(data)[0]
+        assert not tables_queried(queries, THROUGH_TABLE)
+
+    def test_expand_nothing_renders_ids(self, api_client, users, work_areas, django_assert_max_num_queries):
+        with django_assert_max_num_queries(3):
+            data, queries = get(api_client, f'{self.url}?expand=')
+        sanita, logistica, _ = work_areas
+        # In the areas' default ordering, by name
+        assert volunteers(data)[0]['work_areas'] == [logistica.pk, sanita.pk]
+        # The related rows themselves are not read
+        assert not [sql for sql in queries if sql.lstrip().startswith(f'SELECT "{WORK_AREA_TABLE}"')]
+
+    def test_nested_fields(self, api_client, users, django_assert_max_num_queries):
+        with django_assert_max_num_queries(4):
+            data, queries = get(api_client, f'{self.url}?fields=id,work_areas.name')
+        assert volunteers(data)[0]['work_areas'] == [{'name': 'Logistica'}, {'name': 'Sanità'}]
+
+    def test_query_count_does_not_grow_with_rows(self, api_client, users, work_areas):
+        _, few = get(api_client, f'{self.url}?fields=id,work_areas')
+        for index in range(5, 15):
+            User.objects.create_user(
+                username=f'volontario{index}', email=f'volontario{index}@example.com', password='password',
+            ).work_areas.set(work_areas)
+        _, many = get(api_client, f'{self.url}?fields=id,work_areas')
+        assert len(many) == len(few)
+
+    def test_unknown_field(self, api_client, users):
+        response = api_client.get(f'{self.url}?fields=id,nope')
+        assert response.status_code == 400
+        assert 'fields' in response.data
+
+
+class TestRetrieve:
+    def url(self, user):
+        return f'/api/auth/users/{user.pk}/'
+
+    def test_default(self, api_client, users, django_assert_max_num_queries):
+        with django_assert_max_num_queries(2):
+            data, queries = get(api_client, self.url(users[0]))
+        assert len(data['work_areas']) == 2
+
+    def test_fields(self, api_client, users, django_assert_max_num_queries):
+        with django_assert_max_num_queries(1):
+            data, queries = get(api_client, f'{self.url(users[0])}?fields=id,username')
+        assert set(data) == {'id', 'username'}
+        assert not tables_queried(queries, WORK_AREA_TABLE)
+
+    def test_omit(self, api_client, users, django_assert_max_num_queries):
+        with django_assert_max_num_queries(1):
+            data, queries = get(api_client, f'{self.url(users[0])}?omit=work_areas')
+        assert 'work_areas' not in data
+        assert 'username' in data
+
+    def test_expand_nothing_renders_ids(self, api_client, users, work_areas):
+        data, _ = get(api_client, f'{self.url(users[0])}?expand=')
+        assert sorted(data['work_areas']) == sorted(area.pk for area in work_areas[:2])
+
+    def test_etag_with_fieldset(self, api_client, users):
+        response = api_client.get(f'{self.url(users[0])}?fields=id')
+        assert response.has_header('ETag')
+
+
+class TestSync:
+    url = '/api/auth/users/sync/'
+
+    def test_default(self, api_client, users, django_assert_max_num_queries):
+        with django_assert_max_num_queries(5):
+            data, queries = get(api_client, self.url)
+        assert len(volunteers(data)) == 5
+        assert len(volunteers(data)[0]['work_areas']) == 2
+
+    def test_fields(self, api_client, users, django_assert_max_num_queries):
+        with django_assert_max_num_queries(3):
+            data, queries = get(api_client, f'{self.url}?fields=id')
+        assert all(set(row) == {'id'} for row in data['results'])
+        assert not tables_queried(queries, THROUGH_TABLE)
+
+    def test_omit(self, api_client, users):
+        data, queries = get(api_client, f'{self.url}?omit=work_areas')
+        assert all('work_areas' not in row for row in data['results'])
+        assert not tables_queried(queries, THROUGH_TABLE)
+
+    def test_expand_nothing_renders_ids(self, api_client, users):
+        data, queries = get(api_client, f'{self.url}?expand=')
+        assert all(isinstance(pk, int) for row in volunteers(data) for pk in row['work_areas'])
+        assert not [sql for sql in queries if sql.lstrip().startswith(f'SELECT "{WORK_AREA_TABLE}"')]
@@ -0,0 +1,59 @@
+"""
+Purge of long soft-deleted users to a JSON-lines export (apps/users/purge.py)
+"""
+
+import gzip
+import json
+from datetime import timedelta
+
+import pytest
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from apps.users.models import User
+from apps.users.purge import purge_soft_deleted_users
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def deleted_users():
+    users = [
+        User.objects.create_user(username=f'ex{index}', email=f'ex{index}@example.com', password='password')
+        for index in range(3)
+    ]
+    User.all_objects.filter(pk__in=[user.pk for user in users]).update(
+        is_deleted=True, deleted_at=timezone.now() - timedelta(days=400),
+    )
+    return users
+
+
+def exported(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as export:
+        return [json.loads(line)['original_id'] for line in export]
+
+
+def test_rolled_back_batch_is_not_exported(deleted_users, tmp_path):
+    path = tmp_path / 'utenti.jsonl.gz'
+    failed = []
+
+    def fail_second_delete(execute, sql, params, many, context):
+        if sql.startswith(f'DELETE FROM "{User._meta.db_table}" '):
+            failed.append(sql)
+            if len(failed) == 2:
+                raise DatabaseError('connessione persa')
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(fail_second_delete):
+        with pytest.raises(DatabaseError):
+            purge_soft_deleted_users(older_than_days=365, batch_size=2, sleep=0, export_file=str(path))
+
+    # Only the committed batch
+    assert exported(path) == [user.pk for user in deleted_users[:2]]
+    assert User.all_objects.filter(pk=deleted_users[2].pk).exists()
+
+    summary = purge_soft_deleted_users(older_than_days=365, batch_size=2, sleep=0, export_file=str(path))
+    assert summary['purged'] == 1
+    # Exported once
+    assert exported(path) == [user.pk for user in deleted_users]
+    assert not User.all_objects.filter(pk__in=[user.pk for user in deleted_users]).exists()
@@ -0,0 +1,175 @@
+"""
+Users delta sync of an area admin: only the users in scope are walked, users
+leaving the scope reset the cursor (apps/core/sync.py, signals.left_scope)
+"""
+
+import pytest
+from rest_framework.test import APIClient
+
+from apps.users.memberships import REMOVE, change_work_areas
+from apps.users.models import User
+from apps.users.roster import SYNC_COLUMNS, RosterSync
+
+pytestmark = pytest.mark.django_db
+
+URL = '/api/auth/users/sync/'
+
+
+def create_user(username, role, areas=()):
+    user = User.objects.create_user(username=username, email=f'{username}@example.com', password='password', role=role)
+    user.work_areas.set(areas)
+    return user
+
+
+@pytest.fixture
+def area_admin(work_areas):
+    return create_user('referente', 'admin', work_areas[:1])
+
+
+@pytest.fixture
+def colleague(work_areas):
+    """Admin of the same area"""
+    return create_user('collega', 'admin', work_areas[:1])
+
+
+@pytest.fixture
+def outsider(work_areas):
+    """Admin of another area"""
+    return create_user('esterno', 'admin', work_areas[1:2])
+
+
+@pytest.fixture
+def volunteer(work_areas):
+    return create_user('volontario', 'base', work_areas[:1])
+
+
+@pytest.fixture
+def client(area_admin):
+    client = APIClient()
+    client.force_authenticate(area_admin)
+    return client
+
+
+def sync(client, cursor=None):
+    response = client.get(URL, {'since': cursor} if cursor else {})
+    assert response.status_code == 200, response.data
+    return response.data
+
+
+def synced(client, colleague, outsider, volunteer):
+    """Cursor of a client holding the whole scope"""
+    data = sync(client)
+    assert not data['has_more']
+    ids = {row['id'] for row in data['results']}
+    assert {colleague.pk, volunteer.pk} <= ids
+    assert outsider.pk not in ids
+    return data['cursor']
+
+
+@pytest.fixture
+def cursor(client, colleague, outsider, volunteer):
+    return synced(client, colleague, outsider, volunteer)
+
+
+def test_changes_outside_scope_not_walked(client, cursor, outsider):
+    outsider.first_name = 'Luca'
+    outsider.save()
+    outsider.delete()
+
+    data = sync(client, cursor)
+    assert not data['reset']
+    assert data['results'] == []
+    # Never in scope: no tombstone either
+    assert data['deleted'] == []
+
+
+def test_deleted_in_scope_is_a_tombstone(client, cursor, colleague):
+    colleague.delete()
+
+    data = sync(client, cursor)
+    assert not data['reset']
+    assert [row['id'] for row in data['deleted']] == [colleague.pk]
+
+
+def test_member_leaving_area_resets(client, cursor, colleague, work_areas, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        colleague.work_areas.remove(work_areas[0])
+
+    data = sync(client, cursor)
+    assert data['reset']
+    assert colleague.pk not in {row['id'] for row in data['results']}
+
+
+def test_area_cleared_resets(client, cursor, area_admin, work_areas, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        work_areas[0].users.clear()
+        # The admin's own areas are the same as before
+        work_areas[0].users.add(area_admin)
+
+    assert sync(client, cursor)['reset']
+
+
+def test_bulk_removal_resets(client, cursor, colleague, work_areas, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        change_work_areas(User.objects.filter(pk=colleague.pk), [work_areas[0].pk], REMOVE)
+
+    assert sync(client, cursor)['reset']
+
+
+def test_area_deleted_resets(client, cursor, outsider, work_areas, django_capture_on_commit_callbacks):
+    outsider.work_areas.add(work_areas[2])
+    cursor = sync(client, cursor)['cursor']
+    with django_capture_on_commit_callbacks(execute=True):
+        work_areas[2].delete()
+
+    assert sync(client, cursor)['reset']
+
+
+def test_base_volunteer_stays_in_scope(client, cursor, volunteer, work_areas, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        volunteer.work_areas.clear()
+        change_work_areas(User.objects.filter(pk=volunteer.pk), [work_areas[0].pk], REMOVE)
+
+    data = sync(client, cursor)
+    assert not data['reset']
+    assert [row['id'] for row in data['results']] == [volunteer.pk]
+
+
+def test_volunteer_promoted_resets(client, cursor, volunteer, work_areas, django_capture_on_commit_callbacks):
+    volunteer.work_areas.set(work_areas[1:2])
+    cursor = sync(client, cursor)['cursor']
+    with django_capture_on_commit_callbacks(execute=True):
+        volunteer.role = 'admin'
+        volunteer.save(update_fields=['role'])
+
+    data = sync(client, cursor)
+    assert data['reset']
+    assert volunteer.pk not in {row['id'] for row in data['results']}
+
+
+def test_role_update_resets(client, cursor, volunteer, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        User.objects.filter(pk=volunteer.pk).update(role='admin')
+    assert callbacks
+    assert sync(client, cursor)['reset']
+
+
+def test_role_update_within_scope(client, cursor, colleague, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        User.objects.filter(pk=colleague.pk).update(role='superadmin')
+        User.objects.filter(pk=colleague.pk).update(role='base')
+
+    assert not sync(client, cursor)['reset']
+
+
+def test_roster_promotion_resets(client, cursor, superadmin, volunteer, django_capture_on_commit_callbacks):
+    row = {
+        'username': volunteer.username, 'email': volunteer.email, 'first_name': 'Giulia', 'last_name': 'Verdi',
+        'role': 'admin', 'phone': '',
+    }
+    with django_capture_on_commit_callbacks(execute=True):
+        RosterSync(superadmin, SYNC_COLUMNS, [(2, row)]).plan().apply()
+
+    volunteer.refresh_from_db()
+    assert volunteer.role == 'admin'
+    assert sync(client, cursor)['reset']
@@ -2,16 +2,29 @@
 URLs for users app (authentication endpoints)
 """
 
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
 
 from .views import (
-    LoginView, LogoutView, ProfileView, ChangePasswordView,
+    LoginView, LogoutView, BootstrapView, ProfileView, ProfileAvatarView, ChangePasswordView,
     UserViewSet, WorkAreaViewSet, BulkActionsView,
-    CSVImportPreviewView, CSVImportConfirmView, ExportUsersView
+    CSVImportPreviewView, CSVImportConfirmView, RosterSyncView, ExportUsersView
 )
 
+if settings.ASYNC_VIEWS:
+    # ASGI deployment: I/O-bound endpoints run on the event loop
+    from .async_views import AsyncBulkActionsView, AsyncCSVImportPreviewView, AsyncExportUsersView
+
+    bulk_actions_view = AsyncBulkActionsView.as_view()
+    import_preview_view = AsyncCSVImportPreviewView.as_view()
+    export_users_view = AsyncExportUsersView.as_view()
+else:
+    bulk_actions_view = BulkActionsView.as_view()
+    import_preview_view = CSVImportPreviewView.as_view()
+    export_users_view = ExportUsersView.as_view()
+
 router = DefaultRouter()
 router.register('users', UserViewSet, basename='user')
 router.register('work-areas', WorkAreaViewSet, basename='workarea')
@@ -23,14 +36,17 @@ urlpatterns = [
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     
     # Profile
+    path('bootstrap/', BootstrapView.as_view(), name='bootstrap'),
     path('profile/', ProfileView.as_view(), name='profile'),
+    path('profile/avatar/', ProfileAvatarView.as_view(), name='profile_avatar'),
     path('change-password/', ChangePasswordView.as_view(), name='change_password'),
     
     # Bulk Actions & Import/Export
-    path('bulk-actions/', BulkActionsView.as_view(), name='bulk_actions'),
-    path('import/preview/', CSVImportPreviewView.as_view(), name='import_preview'),
+    path('bulk-actions/', bulk_actions_view, name='bulk_actions'),
+    path('import/preview/', import_preview_view, name='import_preview'),
     path('import/confirm/', CSVImportConfirmView.as_view(), name='import_confirm'),
-    path('export/', ExportUsersView.as_view(), name='export_users'),
+    path('import/sync/', RosterSyncView.as_view(), name='import_sync'),
+    path('export/', export_users_view, name='export_users'),
     
     # Users and Work Areas (REST endpoints)
     path('', include(router.urls)),
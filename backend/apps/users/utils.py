@@ -2,12 +2,22 @@
 Utility functions for user management
 """
 
+import asyncio
+import contextvars
+import functools
+import os
 import secrets
 import string
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from django.core.mail import send_mail
 from django.conf import settings
 from django.template.loader import render_to_string
 
+_email_executor = None
+_email_executor_pid = None
+_email_executor_lock = threading.Lock()
+
 
 def generate_random_password(length=12):
     """
@@ -108,6 +118,25 @@ Il Team
         return False
 
 
+def get_email_executor():
+    """
+    SMTP thread pool of this process (recreated after a fork)
+
+    Sized by EMAIL_SEND_WORKERS rather than sharing the event loop's default
+    executor, which has min(32, CPUs + 4) threads and also hashes passwords.
+    """
+    global _email_executor, _email_executor_pid
+    pid = os.getpid()
+    if _email_executor_pid != pid:
+        with _email_executor_lock:
+            if _email_executor_pid != pid:
+                _email_executor = ThreadPoolExecutor(
+                    max_workers=settings.EMAIL_SEND_WORKERS, thread_name_prefix='email'
+                )
+                _email_executor_pid = pid
+    return _email_executor
+
+
 def send_bulk_credentials_emails(users_with_passwords):
     """
     Send credentials emails to multiple users
@@ -132,4 +161,47 @@ def send_bulk_credentials_emails(users_with_passwords):
         'failed_count': len(failed_emails),
         'failed_emails': failed_emails,
         'total': len(users_with_passwords)
+    }
+
+
+async def asend_bulk_credentials_emails(users_with_passwords, concurrency=10):
+    """
+    Send credentials emails to multiple users concurrently
+
+    Async counterpart of ``send_bulk_credentials_emails``: SMTP round trips
+    run in the threads of ``get_email_executor()``, at most ``concurrency`` at
+    a time for each call, instead of one after the other.
+    
+    Args:
+        users_with_passwords (list): List of tuples (user, password)
+        concurrency (int): Maximum number of emails being sent at once
+        
+    Returns:
+        dict: Summary with success and failure counts
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    executor = get_email_executor()
+    
+    async def send_one(user, password):
+        send = functools.partial(send_credentials_email, user, password, is_new=True)
+        async with semaphore:
+            # Run with the caller's context (active language)
+            return await loop.run_in_executor(executor, contextvars.copy_context().run, send)
+    
+    sent = await asyncio.gather(*[
+        send_one(user, password) for user, password in users_with_passwords
+    ])
+    
+    failed_emails = [
+        user.email
+        for (user, _), success in zip(users_with_passwords, sent)
+        if not success
+    ]
+    
+    return {
+        'success_count': len(sent) - len(failed_emails),
+        'failed_count': len(failed_emails),
+        'failed_emails': failed_emails,
+        'total': len(users_with_passwords)
     }
\ No newline at end of file
@@ -2,25 +2,127 @@
 Views for users app
 """
 
-from rest_framework import viewsets, status, generics
+from datetime import timedelta
+
+from rest_framework import viewsets, status, generics, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenRefreshView
+from django.conf import settings
 from django.contrib.auth import logout
-from django.db import models
-from drf_spectacular.utils import extend_schema, OpenApiResponse
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from drf_spectacular.utils import extend_schema, inline_serializer, OpenApiParameter, OpenApiResponse
 
 from .models import User, WorkArea
 from .serializers import (
     UserListSerializer, UserDetailSerializer, UserCreateSerializer,
     UserUpdateSerializer, ChangePasswordSerializer, LoginSerializer,
-    WorkAreaSerializer
+    WorkAreaSerializer, AvatarUploadSerializer
 )
+from apps.core.concurrency import IF_MATCH_PARAMETER, ConditionalUpdateMixin
+from apps.core.fast_serializers import FastListMixin
+from apps.core.fieldsets import FIELDSET_PARAMETERS, SparseFieldsMixin
+from apps.core.idempotency import IDEMPOTENCY_PARAMETER, idempotent
+from apps.core.sync import get_epoch, restamp, scope_fingerprint, sync_page
+from .avatars import schedule_avatar_processing
+from .batch import lookup_users, parse_ids, serialize_batch
+from .bootstrap import build_bootstrap
+from .fast_serializers import user_list_serializer, work_area_serializer
+from .memberships import WORK_AREA_ACTIONS, change_work_areas
+from .roster import RosterSync
+from .signals import SCOPE_EPOCH
 from .permissions import IsAdmin, IsSuperAdmin, IsOwnerOrAdmin
 
 
+SYNC_PARAMETERS = [
+    OpenApiParameter('since', str, description="Cursore restituito dalla sincronizzazione precedente"),
+    OpenApiParameter('limit', int, description="Righe per pagina"),
+]
+
+
+def sync_response(name, serializer_class):
+    """Schema of a delta sync response (see apps/core/sync.py)"""
+    return inline_serializer(name, {
+        'results': serializer_class(many=True),
+        'deleted': inline_serializer(f'{name}Tombstone', {
+            'id': serializers.IntegerField(),
+            'deleted_at': serializers.DateTimeField(),
+        }, many=True),
+        'cursor': serializers.CharField(),
+        'has_more': serializers.BooleanField(),
+        'reset': serializers.BooleanField(),
+    })
+
+
+EXPORT_HEADER = [
+    'ID', 'Username', 'Email', 'Nome', 'Cognome',
+    'Ruolo', 'Telefono', 'Aree di Lavoro',
+    'Volontario Attivo', 'Data Iscrizione', 'Data Creazione'
+]
+
+
+def scope_users(user, queryset):
+    """
+    Restrict a users queryset to the ones ``user`` can manage
+
+    SuperAdmin manages everyone, Admin the users in their areas and base volunteers.
+    """
+    if user.is_superadmin:
+        return queryset
+    
+    if user.is_admin:
+        user_areas = user.work_areas.all()
+        return queryset.filter(
+            models.Q(work_areas__in=user_areas) |
+            models.Q(role='base')
+        ).distinct()
+    
+    return queryset.none()
+
+
+def users_scope(user):
+    """
+    Fingerprint of the users ``scope_users`` lets ``user`` manage
+
+    For area admins it includes the epoch bumped when users may leave their
+    scope (signals.left_scope): the users sync walks only the users in scope
+    and would never send the tombstones of those leaving it.
+    """
+    if user.is_admin and not user.is_superadmin:
+        return scope_fingerprint(
+            user.role, sorted(user.work_areas.values_list('pk', flat=True)), get_epoch(SCOPE_EPOCH)
+        )
+    return scope_fingerprint(user.role)
+
+
+def filter_export_users(queryset, filters):
+    """Apply the validated ExportFilterSerializer filters to a users queryset"""
+    if 'role' in filters:
+        queryset = queryset.filter(role=filters['role'])
+    
+    if 'is_active_volunteer' in filters:
+        queryset = queryset.filter(is_active_volunteer=filters['is_active_volunteer'])
+    
+    if 'work_area_ids' in filters:
+        queryset = queryset.filter(work_areas__id__in=filters['work_area_ids'])
+    
+    if 'search' in filters:
+        search = filters['search']
+        queryset = queryset.filter(
+            models.Q(username__icontains=search) |
+            models.Q(email__icontains=search) |
+            models.Q(first_name__icontains=search) |
+            models.Q(last_name__icontains=search)
+        )
+    
+    return queryset
+
+
 class LoginView(generics.GenericAPIView):
     """
     Login endpoint - returns JWT tokens
@@ -82,12 +184,13 @@ class LogoutView(generics.GenericAPIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ProfileView(generics.RetrieveUpdateAPIView):
+class ProfileView(ConditionalUpdateMixin, generics.RetrieveUpdateAPIView):
     """
     Get or update current user profile
     """
     permission_classes = [IsAuthenticated]
     serializer_class = UserDetailSerializer
+    current_serializer_class = UserDetailSerializer
     
     def get_object(self):
         return self.request.user
@@ -99,19 +202,111 @@ class ProfileView(generics.RetrieveUpdateAPIView):
     
     @extend_schema(
         summary="Get Profile",
-        description="Restituisce il profilo dell'utente corrente",
+        description="Restituisce il profilo dell'utente corrente, con l'ETag da inviare in If-Match",
     )
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
     
     @extend_schema(
         summary="Update Profile",
-        description="Aggiorna il profilo dell'utente corrente",
+        description=(
+            "Aggiorna il profilo dell'utente corrente. Con If-Match la modifica è applicata "
+            "solo se il profilo non è cambiato nel frattempo, altrimenti 412 con i dati correnti."
+        ),
+        parameters=[IF_MATCH_PARAMETER],
+        responses={
+            200: UserUpdateSerializer,
+            412: OpenApiResponse(description="Profilo modificato da un'altra richiesta: dati correnti in 'current'"),
+        },
     )
     def patch(self, request, *args, **kwargs):
         return super().patch(request, *args, **kwargs)
 
 
+class BootstrapView(generics.GenericAPIView):
+    """
+    Everything the PWA needs at start-up in one response
+
+    Served from the cache (see apps/users/bootstrap.py); clients send back
+    the ETag in If-None-Match and get a 304 while nothing changed.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    @extend_schema(
+        summary="Bootstrap",
+        description="Utente corrente, aree di lavoro attive, permessi e configurazione del server",
+        responses={
+            200: inline_serializer('Bootstrap', {
+                'user': UserDetailSerializer(),
+                'work_areas': WorkAreaSerializer(many=True),
+                'capabilities': inline_serializer('BootstrapCapabilities', {
+                    'is_admin': serializers.BooleanField(),
+                    'is_superadmin': serializers.BooleanField(),
+                    'managed_area_ids': serializers.ListField(child=serializers.IntegerField()),
+                }),
+                'config': serializers.DictField(),
+            }),
+            304: OpenApiResponse(description="Dati invariati rispetto all'ETag inviato"),
+        },
+    )
+    def get(self, request):
+        payload, etag = build_bootstrap(request.user, request)
+        
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(payload)
+        response['ETag'] = etag
+        # Per user: browsers may keep it but must revalidate every time
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class ProfileAvatarView(generics.GenericAPIView):
+    """
+    Upload or remove the avatar of the current user
+
+    Renditions (``avatar_thumbnails``) are generated in the background shortly
+    after the upload.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = AvatarUploadSerializer
+    parser_classes = [MultiPartParser, FormParser]
+    
+    @extend_schema(
+        summary="Upload Avatar",
+        description="Carica l'avatar dell'utente corrente (multipart, campo 'avatar')",
+        responses={200: UserDetailSerializer},
+    )
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        user = request.user
+        with transaction.atomic():
+            user.avatar = serializer.validated_data['avatar']
+            user.save(update_fields=['avatar', 'updated_at'])
+            schedule_avatar_processing(user)
+        
+        return Response(
+            UserDetailSerializer(user, context=self.get_serializer_context()).data,
+            status=status.HTTP_200_OK
+        )
+    
+    @extend_schema(
+        summary="Delete Avatar",
+        description="Rimuove l'avatar dell'utente corrente",
+        responses={204: None},
+    )
+    def delete(self, request):
+        user = request.user
+        with transaction.atomic():
+            user.avatar = None
+            user.save(update_fields=['avatar', 'updated_at'])
+            schedule_avatar_processing(user)
+        
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class ChangePasswordView(generics.GenericAPIView):
     """
     Change password for current user
@@ -144,15 +339,17 @@ class ChangePasswordView(generics.GenericAPIView):
         }, status=status.HTTP_200_OK)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ConditionalUpdateMixin, SparseFieldsMixin, FastListMixin, viewsets.ModelViewSet):
     """
     CRUD operations for users (admin only)
     """
     queryset = User.objects.all()
     permission_classes = [IsAuthenticated, IsAdmin]
+    fast_serializer = user_list_serializer
+    current_serializer_class = UserDetailSerializer
     
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in ('list', 'sync', 'batch'):
             return UserListSerializer
         elif self.action == 'create':
             return UserCreateSerializer
@@ -161,25 +358,12 @@ class UserViewSet(viewsets.ModelViewSet):
         return UserDetailSerializer
     
     def get_queryset(self):
-        queryset = User.objects.all()
-        
-        # SuperAdmin can see everyone
-        if self.request.user.is_superadmin:
-            return queryset
-        
-        # Admin can see users in their areas
-        if self.request.user.is_admin:
-            user_areas = self.request.user.work_areas.all()
-            return queryset.filter(
-                models.Q(work_areas__in=user_areas) |
-                models.Q(role='base')
-            ).distinct()
-        
-        return queryset.none()
+        return scope_users(self.request.user, User.objects.all())
     
     @extend_schema(
         summary="List Users",
         description="Lista di tutti gli utenti (solo admin)",
+        parameters=FIELDSET_PARAMETERS,
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
@@ -187,24 +371,50 @@ class UserViewSet(viewsets.ModelViewSet):
     @extend_schema(
         summary="Create User",
         description="Crea un nuovo utente (solo admin)",
+        parameters=[IDEMPOTENCY_PARAMETER],
     )
+    @idempotent
     def create(self, request, *args, **kwargs):
         return super().create(request, *args, **kwargs)
     
     @extend_schema(
         summary="Get User",
-        description="Dettagli di un utente specifico",
+        description="Dettagli di un utente specifico, con l'ETag da inviare in If-Match",
+        parameters=FIELDSET_PARAMETERS,
     )
     def retrieve(self, request, *args, **kwargs):
         return super().retrieve(request, *args, **kwargs)
     
     @extend_schema(
         summary="Update User",
-        description="Aggiorna un utente (solo admin)",
+        description=(
+            "Aggiorna un utente (solo admin). Con If-Match la modifica è applicata solo se "
+            "l'utente non è cambiato nel frattempo, altrimenti 412 con i dati correnti."
+        ),
+        parameters=[IF_MATCH_PARAMETER],
+        responses={
+            200: UserUpdateSerializer,
+            412: OpenApiResponse(description="Utente modificato da un'altra richiesta: dati correnti in 'current'"),
+        },
     )
     def update(self, request, *args, **kwargs):
         return super().update(request, *args, **kwargs)
     
+    @extend_schema(
+        summary="Partial Update User",
+        description=(
+            "Aggiorna alcuni campi di un utente (solo admin). Con If-Match la modifica è applicata "
+            "solo se l'utente non è cambiato nel frattempo, altrimenti 412 con i dati correnti."
+        ),
+        parameters=[IF_MATCH_PARAMETER],
+        responses={
+            200: UserUpdateSerializer,
+            412: OpenApiResponse(description="Utente modificato da un'altra richiesta: dati correnti in 'current'"),
+        },
+    )
+    def partial_update(self, request, *args, **kwargs):
+        return super().partial_update(request, *args, **kwargs)
+    
     @extend_schema(
         summary="Delete User",
         description="Soft delete di un utente (solo admin)",
@@ -214,6 +424,73 @@ class UserViewSet(viewsets.ModelViewSet):
         instance.delete(user=request.user)  # Soft delete
         return Response(status=status.HTTP_204_NO_CONTENT)
     
+    @extend_schema(
+        summary="Sync Users",
+        description=(
+            "Utenti modificati dopo il cursore 'since' ed eliminati come tombstone. Se degli utenti "
+            "escono dal proprio ambito la risposta è un reset: con reset=true la copia locale va scartata."
+        ),
+        parameters=SYNC_PARAMETERS + FIELDSET_PARAMETERS,
+        responses={200: sync_response('UserSync', UserListSerializer)},
+    )
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """Delta sync of the users the current admin can see"""
+        data = sync_page(
+            request, 'users',
+            # Only the users in scope: an area admin does not page through
+            # the changes of every user. Users leaving it reset the cursor
+            changed=scope_users(request.user, User.all_objects.all()),
+            visible=self.get_queryset(),
+            serializer=self.get_fast_serializer(),
+            # Tombstones of purged users are gone
+            max_age=timedelta(days=settings.USER_PURGE_RETENTION_DAYS),
+            # Users entering the admin's areas unchanged would never be sent
+            scope=users_scope(request.user),
+        )
+        return Response(data)
+    
+    @extend_schema(
+        summary="Batch Users",
+        description=(
+            "Utenti con gli id indicati (in GET con ?ids=1,2,3, in POST con {\"ids\": [...]}), "
+            "nell'ordine richiesto. Gli id inesistenti o eliminati sono in 'missing', quelli "
+            "fuori dal proprio ambito in 'forbidden'."
+        ),
+        parameters=[
+            OpenApiParameter('ids', str, description="Id separati da virgola (solo GET)"),
+        ] + FIELDSET_PARAMETERS,
+        request=inline_serializer('UserBatchRequest', {
+            'ids': serializers.ListField(child=serializers.IntegerField()),
+        }),
+        responses={
+            200: inline_serializer('UserBatch', {
+                'results': UserListSerializer(many=True),
+                'missing': serializers.ListField(child=serializers.IntegerField()),
+                'forbidden': serializers.ListField(child=serializers.IntegerField()),
+            }),
+            304: OpenApiResponse(description="Dati invariati rispetto all'ETag inviato (solo GET)"),
+        },
+    )
+    @action(detail=False, methods=['get', 'post'])
+    def batch(self, request):
+        """Many users by id in one request"""
+        ids = parse_ids(request)
+        fast_serializer = self.get_fast_serializer()
+        rows, missing, forbidden, etag = lookup_users(request, ids, self.get_queryset(), fast_serializer)
+        
+        response = None
+        if request.method == 'GET':
+            response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(serialize_batch(
+                ids, rows, missing, forbidden, fast_serializer, self.get_serializer_context()
+            ))
+        if request.method == 'GET':
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache'
+        return response
+    
     @action(detail=True, methods=['post'], permission_classes=[IsSuperAdmin])
     def restore(self, request, pk=None):
         """Restore a soft-deleted user (superadmin only)"""
@@ -228,17 +505,18 @@ class UserViewSet(viewsets.ModelViewSet):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
-class WorkAreaViewSet(viewsets.ModelViewSet):
+class WorkAreaViewSet(SparseFieldsMixin, FastListMixin, viewsets.ModelViewSet):
     """
     CRUD operations for work areas
     """
     queryset = WorkArea.objects.filter(is_active=True)
     serializer_class = WorkAreaSerializer
     permission_classes = [IsAuthenticated]
+    fast_serializer = work_area_serializer
     
     def get_permissions(self):
         # List and retrieve available to all authenticated users
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'sync']:
             return [IsAuthenticated()]
         # Create, update, delete only for superadmin
         return [IsAuthenticated(), IsSuperAdmin()]
@@ -246,9 +524,38 @@ class WorkAreaViewSet(viewsets.ModelViewSet):
     @extend_schema(
         summary="List Work Areas",
         description="Lista di tutte le aree di lavoro attive",
+        parameters=FIELDSET_PARAMETERS,
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
+    
+    @extend_schema(
+        summary="Get Work Area",
+        description="Dettagli di un'area di lavoro",
+        parameters=FIELDSET_PARAMETERS,
+    )
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
+    @extend_schema(
+        summary="Sync Work Areas",
+        description=(
+            "Aree di lavoro modificate dopo il cursore 'since'; quelle disattivate "
+            "arrivano come tombstone. Con reset=true la copia locale va scartata."
+        ),
+        parameters=SYNC_PARAMETERS + FIELDSET_PARAMETERS,
+        responses={200: sync_response('WorkAreaSync', WorkAreaSerializer)},
+    )
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """Delta sync of the active work areas"""
+        data = sync_page(
+            request, 'work-areas',
+            changed=WorkArea.objects.all(),
+            visible=self.get_queryset(),
+            serializer=self.get_fast_serializer(),
+        )
+        return Response(data)
 
 
 class BulkActionsView(generics.GenericAPIView):
@@ -270,19 +577,27 @@ class BulkActionsView(generics.GenericAPIView):
                     },
                     'action': {
                         'type': 'string',
-                        'enum': ['activate', 'deactivate', 'delete', 'send_credentials', 'assign_role']
+                        'enum': [
+                            'activate', 'deactivate', 'delete', 'send_credentials', 'assign_role',
+                            'add_work_areas', 'remove_work_areas', 'replace_work_areas',
+                        ]
                     },
                     'role': {
                         'type': 'string',
                         'enum': ['superadmin', 'admin', 'base']
+                    },
+                    'work_area_ids': {
+                        'type': 'array',
+                        'items': {'type': 'integer'}
                     }
                 }
             }
-        }
+        },
+        parameters=[IDEMPOTENCY_PARAMETER],
     )
+    @idempotent
     def post(self, request):
         from .bulk_serializers import BulkActionSerializer
-        from .utils import generate_random_password, send_bulk_credentials_emails
         
         serializer = BulkActionSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -290,24 +605,28 @@ class BulkActionsView(generics.GenericAPIView):
         user_ids = serializer.validated_data['user_ids']
         action = serializer.validated_data['action']
         role = serializer.validated_data.get('role')
+        work_area_ids = serializer.validated_data.get('work_area_ids')
         
-        # Get users
-        users = User.objects.filter(id__in=user_ids)
-        
-        # Check permissions
-        if not request.user.is_superadmin:
-            # Admin can only manage users in their areas
-            user_areas = request.user.work_areas.all()
-            users = users.filter(
-                models.Q(work_areas__in=user_areas) |
-                models.Q(role='base')
-            ).distinct()
+        # Get users the current admin can manage
+        users = scope_users(request.user, User.objects.filter(id__in=user_ids))
         
         if not users.exists():
             return Response({
                 'error': 'Nessun utente trovato o permessi insufficienti'
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        data, status_code = self.perform_action(request, users, action, role, work_area_ids)
+        return Response(data, status=status_code)
+    
+    def perform_action(self, request, users, action, role=None, work_area_ids=None):
+        """
+        Execute a bulk action on an already scoped users queryset
+        
+        Returns:
+            tuple: (response data, HTTP status code)
+        """
+        from .utils import generate_random_password, send_bulk_credentials_emails
+        
         results = {
             'success': 0,
             'failed': 0,
@@ -353,23 +672,34 @@ class BulkActionsView(generics.GenericAPIView):
         elif action == 'assign_role':
             # Check if user can assign this role
             if role == 'superadmin' and not request.user.is_superadmin:
-                return Response({
+                return {
                     'error': 'Solo i superadmin possono assegnare il ruolo superadmin'
-                }, status=status.HTTP_403_FORBIDDEN)
+                }, status.HTTP_403_FORBIDDEN
             
             count = users.update(role=role)
             results['success'] = count
             message = f'{count} utenti con ruolo aggiornato a {role}'
         
+        elif action in WORK_AREA_ACTIONS:
+            summary = change_work_areas(users, work_area_ids, action)
+            results['success'] = summary['users']
+            results['changed'] = summary['changed']
+            results['memberships_added'] = summary['added']
+            results['memberships_removed'] = summary['removed']
+            message = (
+                f"Aree di lavoro aggiornate per {summary['changed']} utenti su {summary['users']} "
+                f"({summary['added']} assegnazioni aggiunte, {summary['removed']} rimosse)"
+            )
+        
         else:
-            return Response({
+            return {
                 'error': 'Azione non valida'
-            }, status=status.HTTP_400_BAD_REQUEST)
+            }, status.HTTP_400_BAD_REQUEST
         
-        return Response({
+        return {
             'message': message,
             'results': results
-        }, status=status.HTTP_200_OK)
+        }, status.HTTP_200_OK
 
 
 class CSVImportPreviewView(generics.GenericAPIView):
@@ -407,7 +737,9 @@ class CSVImportConfirmView(generics.GenericAPIView):
     @extend_schema(
         summary="CSV Import Confirm",
         description="Conferma ed esegue l'import CSV",
+        parameters=[IDEMPOTENCY_PARAMETER],
     )
+    @idempotent
     def post(self, request):
         from django.db import transaction
         from .bulk_serializers import CSVImportSerializer
@@ -430,6 +762,7 @@ class CSVImportConfirmView(generics.GenericAPIView):
         users_with_passwords = []
         
         try:
+            started = timezone.now()
             with transaction.atomic():
                 for user_data in users_data:
                     # Generate password
@@ -454,6 +787,8 @@ class CSVImportConfirmView(generics.GenericAPIView):
                     
                     created_users.append(user)
                     users_with_passwords.append((user, password))
+                
+                restamp(User.all_objects, [user.pk for user in created_users], started)
             
             # Send emails if requested
             email_results = None
@@ -476,6 +811,62 @@ class CSVImportConfirmView(generics.GenericAPIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
+class RosterSyncView(generics.GenericAPIView):
+    """
+    Synchronise the users with a full membership list (CSV)
+    """
+    permission_classes = [IsAuthenticated, IsAdmin]
+    
+    @extend_schema(
+        summary="Roster Sync",
+        description=(
+            "Allinea gli utenti a un elenco completo dei soci (CSV nel formato dell'import): le righe "
+            "sono abbinate agli utenti per email o username, quelle invariate non vengono scritte, "
+            "i nuovi utenti vengono creati e, con deactivate_missing, i volontari assenti dal file "
+            "vengono disattivati. Restituisce il report delle differenze; con dry_run non applica nulla. "
+            "Se il file contiene errori non viene applicata nessuna modifica."
+        ),
+        request={
+            'multipart/form-data': {
+                'type': 'object',
+                'properties': {
+                    'file': {'type': 'string', 'format': 'binary'},
+                    'deactivate_missing': {'type': 'boolean'},
+                    'dry_run': {'type': 'boolean'},
+                    'send_credentials': {'type': 'boolean'},
+                },
+            }
+        },
+        parameters=[IDEMPOTENCY_PARAMETER],
+    )
+    @idempotent
+    def post(self, request):
+        from .bulk_serializers import RosterSyncSerializer
+        from .utils import send_bulk_credentials_emails
+        
+        serializer = RosterSyncSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        sync = RosterSync(
+            request.user, data['columns'], data['rows'], deactivate_missing=data['deactivate_missing']
+        ).plan()
+        report = sync.report()
+        
+        if sync.errors and not data['dry_run']:
+            return Response({
+                'error': 'Il file contiene errori. Correggerli prima di sincronizzare.',
+                **report,
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        report['dry_run'] = data['dry_run']
+        if not data['dry_run']:
+            users_with_passwords = sync.apply(send_credentials=data['send_credentials'])
+            if users_with_passwords:
+                report['email_results'] = send_bulk_credentials_emails(users_with_passwords)
+        return Response(report, status=status.HTTP_200_OK)
+
+
 class ExportUsersView(generics.GenericAPIView):
     """
     Export users to CSV/Excel
@@ -499,33 +890,10 @@ class ExportUsersView(generics.GenericAPIView):
         export_format = filters.get('format', 'csv')
         
         # Build queryset
-        queryset = User.objects.all()
-        
-        # Apply filters
-        if not request.user.is_superadmin:
-            user_areas = request.user.work_areas.all()
-            queryset = queryset.filter(
-                models.Q(work_areas__in=user_areas) |
-                models.Q(role='base')
-            ).distinct()
-        
-        if 'role' in filters:
-            queryset = queryset.filter(role=filters['role'])
-        
-        if 'is_active_volunteer' in filters:
-            queryset = queryset.filter(is_active_volunteer=filters['is_active_volunteer'])
-        
-        if 'work_area_ids' in filters:
-            queryset = queryset.filter(work_areas__id__in=filters['work_area_ids'])
-        
-        if 'search' in filters:
-            search = filters['search']
-            queryset = queryset.filter(
-                models.Q(username__icontains=search) |
-                models.Q(email__icontains=search) |
-                models.Q(first_name__icontains=search) |
-                models.Q(last_name__icontains=search)
-            )
+        queryset = filter_export_users(
+            scope_users(request.user, User.objects.all()),
+            filters
+        )
         
         # Export to CSV
         if export_format == 'csv':
@@ -533,11 +901,7 @@ class ExportUsersView(generics.GenericAPIView):
             response['Content-Disposition'] = 'attachment; filename="users_export.csv"'
             
             writer = csv.writer(response)
-            writer.writerow([
-                'ID', 'Username', 'Email', 'Nome', 'Cognome',
-                'Ruolo', 'Telefono', 'Aree di Lavoro',
-                'Volontario Attivo', 'Data Iscrizione', 'Data Creazione'
-            ])
+            writer.writerow(EXPORT_HEADER)
             
             for user in queryset:
                 work_areas = ', '.join([wa.name for wa in user.work_areas.all()])
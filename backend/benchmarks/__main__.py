@@ -0,0 +1,269 @@
+"""
+Benchmark suite for the backend API
+
+Seeds a synthetic dataset, drives the real endpoints with concurrent clients
+against a running server and reports throughput, latency percentiles and
+queries per request. A run fails (exit code 1) when it regresses against a
+stored baseline.
+
+    python -m benchmarks seed --users 5000 --areas 20 --memberships 2
+    python -m benchmarks run --base-url http://localhost:8000 --concurrency 20 --save-baseline
+    python -m benchmarks run --base-url http://localhost:8000 --concurrency 20
+    python -m benchmarks clean
+    python -m benchmarks pool --threads 20 --iterations 200 --pool-size 10
+    python -m benchmarks avatars --base-url http://localhost:8000 --users 100 --size 48
+    python -m benchmarks compression --repeat 20
+    python -m benchmarks serializers --rows 10000
+    python -m benchmarks json --repeat 20
+    python -m benchmarks fieldsets
+    python -m benchmarks batch --ids 500
+    python -m benchmarks idempotency --concurrency 8 --repeat 50
+    python -m benchmarks batch-api --operations 20 --rtt 300
+    python -m benchmarks concurrency --writers 8 --rounds 20
+    python -m benchmarks memberships --users 1000
+    python -m benchmarks roster --changes 0.01
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from rest_framework_simplejwt.tokens import RefreshToken  # noqa: E402
+
+from apps.users.models import User  # noqa: E402
+from .loadtest import run_load, format_result  # noqa: E402
+from .avatars import run_avatar_benchmark, clean_avatars  # noqa: E402
+from .batch import run_batch_benchmark  # noqa: E402
+from .batch_api import run_batch_api_benchmark  # noqa: E402
+from .compression import run_compression_benchmark  # noqa: E402
+from .concurrency import run_concurrency_benchmark  # noqa: E402
+from .fieldsets import run_fieldsets_benchmark  # noqa: E402
+from .idempotency import run_idempotency_benchmark  # noqa: E402
+from .json_codec import run_json_benchmark  # noqa: E402
+from .memberships import run_memberships_benchmark  # noqa: E402
+from .pool import run_pool_benchmark  # noqa: E402
+from .roster import run_roster_benchmark  # noqa: E402
+from .scenarios import default_scenarios  # noqa: E402
+from .serializers import run_serializers_benchmark  # noqa: E402
+from .seed import seed, clean, ADMIN_USERNAME  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+
+
+def count_queries(scenario, token):
+    """Run the scenario once in-process and count the SQL queries it issues"""
+    host = next((host for host in settings.ALLOWED_HOSTS if host and host != '*'), 'localhost')
+    client = Client(HTTP_HOST=host)
+    headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if scenario.authenticated else {}
+
+    with CaptureQueriesContext(connection) as context:
+        if scenario.method == 'GET':
+            response = client.get(scenario.path, **headers)
+        elif isinstance(scenario.body, tuple):
+            data, content_type = scenario.body
+            response = client.generic(scenario.method, scenario.path, data, content_type, **headers)
+        else:
+            response = client.generic(
+                scenario.method, scenario.path, json.dumps(scenario.body),
+                'application/json', **headers
+            )
+        if response.streaming:
+            b''.join(response.streaming_content)
+
+    return len(context.captured_queries), response.status_code
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare a run with the baseline
+
+    Returns:
+        list: Human readable regressions (empty if none)
+    """
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        if current['p95'] > reference['p95'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95']:.1f}ms > {reference['p95']:.1f}ms")
+        if current['throughput'] < reference['throughput'] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {current['throughput']:.1f} < {reference['throughput']:.1f} req/s"
+            )
+        if current['queries'] > reference['queries']:
+            regressions.append(f"{name}: {current['queries']} query > {reference['queries']}")
+    return regressions
+
+
+def run(args):
+    admin = User.objects.get(username=ADMIN_USERNAME)
+    token = str(RefreshToken.for_user(admin).access_token)
+
+    scenarios = default_scenarios()
+    if args.scenarios:
+        scenarios = [scenario for scenario in scenarios if scenario.name in args.scenarios]
+
+    results = {}
+    for scenario in scenarios:
+        scenario.prepare()
+        queries, status_code = count_queries(scenario, token)
+        result = run_load(
+            args.base_url.rstrip('/') + scenario.path,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            method=scenario.method,
+            token=token if scenario.authenticated else None,
+            body=scenario.body,
+        )
+        result['queries'] = queries
+        results[scenario.name] = result
+        print(f"{format_result(scenario.name, result)}  query/req {queries} (HTTP {status_code})")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(results, indent=2))
+        print(f"Baseline salvata in {baseline_path}")
+        return 0
+
+    if not baseline_path.exists():
+        print("Nessuna baseline trovata: eseguire con --save-baseline per crearla")
+        return 0
+
+    regressions = compare(results, json.loads(baseline_path.read_text()), args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSIONE {regression}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description="Benchmark suite delle API")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = subparsers.add_parser('seed', help="Genera il dataset sintetico")
+    seed_parser.add_argument('--users', type=int, default=1000)
+    seed_parser.add_argument('--areas', type=int, default=10)
+    seed_parser.add_argument('--memberships', type=int, default=2, help="Aree per utente")
+    seed_parser.add_argument('--admins', type=int, default=10)
+
+    subparsers.add_parser('clean', help="Elimina il dataset sintetico")
+
+    run_parser = subparsers.add_parser('run', help="Esegue il benchmark contro un server locale")
+    run_parser.add_argument('--base-url', default='http://localhost:8000')
+    run_parser.add_argument('--concurrency', type=int, default=10)
+    run_parser.add_argument('--duration', type=float, default=10.0, help="Secondi per scenario")
+    run_parser.add_argument('--scenarios', nargs='+', help="Esegue solo gli scenari indicati")
+    run_parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+    run_parser.add_argument('--save-baseline', action='store_true')
+    run_parser.add_argument(
+        '--tolerance', type=float, default=0.2,
+        help="Peggioramento relativo tollerato di p95 e throughput (default 20%%)",
+    )
+    run_parser.add_argument('--output', help="Salva i risultati in un file JSON")
+
+    pool_parser = subparsers.add_parser('pool', help="Latenza di acquisizione delle connessioni al database")
+    pool_parser.add_argument('--threads', type=int, default=20)
+    pool_parser.add_argument('--iterations', type=int, default=200, help="Connessioni per thread")
+    pool_parser.add_argument('--pool-size', type=int, default=10)
+
+    avatars_parser = subparsers.add_parser('avatars', help="Banda e latenza degli avatar per una pagina di utenti")
+    avatars_parser.add_argument('--base-url', default='http://localhost:8000')
+    avatars_parser.add_argument('--users', type=int, default=100)
+    avatars_parser.add_argument('--size', type=int, default=48, help="Miniatura confrontata con gli originali")
+    avatars_parser.add_argument('--concurrency', type=int, default=6, help="Download paralleli (come un browser)")
+
+    compression_parser = subparsers.add_parser('compression', help="Costo CPU e byte risparmiati della compressione")
+    compression_parser.add_argument('--repeat', type=int, default=20, help="Ripetizioni per misura")
+
+    serializers_parser = subparsers.add_parser(
+        'serializers', help="Parità e righe/s dei serializer compilati rispetto a DRF",
+    )
+    serializers_parser.add_argument('--rows', type=int, default=10000)
+    serializers_parser.add_argument('--repeat', type=int, default=3, help="Ripetizioni per misura")
+
+    json_parser = subparsers.add_parser('json', help="Compatibilità e velocità del renderer/parser orjson")
+    json_parser.add_argument('--repeat', type=int, default=20, help="Ripetizioni per misura")
+
+    subparsers.add_parser('fieldsets', help="Byte e query delle risposte ridotte con fields/omit/expand")
+
+    batch_parser = subparsers.add_parser('batch', help="users/batch/ contro una richiesta users/<id>/ per id")
+    batch_parser.add_argument('--ids', type=int, default=500, help="Utenti richiesti")
+
+    idempotency_parser = subparsers.add_parser(
+        'idempotency', help="Ripetizioni con Idempotency-Key e costo del lock e della risposta salvata",
+    )
+    idempotency_parser.add_argument('--concurrency', type=int, default=8, help="Duplicati concorrenti")
+    idempotency_parser.add_argument('--repeat', type=int, default=50, help="Richieste per misura")
+
+    batch_api_parser = subparsers.add_parser('batch-api', help="/api/batch/ contro una richiesta per operazione")
+    batch_api_parser.add_argument('--operations', type=int, default=20)
+    batch_api_parser.add_argument('--rtt', type=float, default=300, help="Round trip di rete per richiesta (ms)")
+
+    concurrency_parser = subparsers.add_parser(
+        'concurrency', help="Modifiche concorrenti allo stesso utente con e senza If-Match",
+    )
+    concurrency_parser.add_argument('--writers', type=int, default=8, help="Client concorrenti")
+    concurrency_parser.add_argument('--rounds', type=int, default=20, help="Incrementi per client")
+
+    memberships_parser = subparsers.add_parser(
+        'memberships', help="Azioni bulk sulle aree di lavoro contro work_areas.set() per utente",
+    )
+    memberships_parser.add_argument('--users', type=int, default=1000, help="Utenti modificati")
+
+    roster_parser = subparsers.add_parser(
+        'roster', help="Sincronizzazione dell'elenco soci: righe scritte, dry run e seconda esecuzione",
+    )
+    roster_parser.add_argument('--changes', type=float, default=0.01, help="Frazione di righe modificate")
+
+    args = parser.parse_args()
+
+    if args.command == 'seed':
+        print(seed(args.users, args.areas, args.memberships, args.admins))
+        return 0
+    if args.command == 'clean':
+        clean_avatars()
+        print(clean())
+        return 0
+    if args.command == 'pool':
+        return run_pool_benchmark(args.threads, args.iterations, args.pool_size)
+    if args.command == 'avatars':
+        return run_avatar_benchmark(args.base_url, args.users, args.size, args.concurrency)
+    if args.command == 'compression':
+        return run_compression_benchmark(args.repeat)
+    if args.command == 'json':
+        return run_json_benchmark(args.repeat)
+    if args.command == 'batch-api':
+        return run_batch_api_benchmark(args.operations, args.rtt)
+    if args.command == 'concurrency':
+        return run_concurrency_benchmark(args.writers, args.rounds)
+    if args.command == 'memberships':
+        return run_memberships_benchmark(args.users)
+    if args.command == 'roster':
+        return run_roster_benchmark(args.changes)
+    if args.command == 'idempotency':
+        return run_idempotency_benchmark(args.concurrency, args.repeat)
+    if args.command == 'batch':
+        return run_batch_benchmark(args.ids)
+    if args.command == 'fieldsets':
+        return run_fieldsets_benchmark()
+    if args.command == 'serializers':
+        return run_serializers_benchmark(args.rows, args.repeat)
+    return run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Avatar bandwidth and latency for a page of users
+
+Gives ``count`` seeded users a synthetic phone-sized photo, generates their
+renditions (timing the pipeline), then downloads the images a user grid page
+would show from a running server: the original uploads against one rendition
+size.
+
+    python -m benchmarks avatars --base-url http://localhost:8000 --users 100 --size 48
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from apps.users.avatars import process_avatar
+from apps.users.models import User
+from apps.users.serializers import UserListSerializer
+from .loadtest import percentile, request_once
+from .seed import USER_PREFIX
+
+
+def synthetic_photo(width=4000, height=3000, seed=0):
+    """A noisy JPEG compresses about as badly as a real phone photo"""
+    image = Image.effect_noise((width // 4, height // 4), 40 + seed % 20).convert('RGB')
+    image = image.resize((width, height), Image.BICUBIC)
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=92)
+    return buffer.getvalue()
+
+
+def prepare_avatars(count):
+    """
+    Attach a photo to ``count`` seeded users and build their renditions
+
+    Returns:
+        tuple: (users, rendition latencies in ms, sorted)
+    """
+    users = list(User.objects.filter(username__startswith=USER_PREFIX, role='base').order_by('id')[:count])
+    photo = synthetic_photo()
+    latencies = []
+    for user in users:
+        if not user.avatar:
+            user.avatar.save(f'{user.username}.jpg', ContentFile(photo), save=False)
+            User.objects.filter(pk=user.pk).update(avatar=user.avatar.name)
+        started = time.perf_counter()
+        user.avatar_thumbnails = process_avatar(user.pk, user.avatar.name) or {}
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return users, latencies
+
+
+def download(urls, concurrency):
+    """
+    Returns:
+        dict: bytes, seconds, errors (non-200 responses), p50/p95 latency in ms
+    """
+    latencies = []
+    errors = []
+
+    def fetch(url):
+        started = time.perf_counter()
+        status, _, size = request_once(url)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if status != 200:
+            errors.append(status)
+        return size
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        total = sum(executor.map(fetch, urls))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'bytes': total, 'seconds': elapsed, 'errors': len(errors),
+        'p50': percentile(latencies, 50), 'p95': percentile(latencies, 95),
+    }
+
+
+def run_avatar_benchmark(base_url, users=100, size=48, concurrency=6):
+    users, render_latencies = prepare_avatars(users)
+    if not users:
+        print("Nessun utente di benchmark: eseguire prima 'python -m benchmarks seed'")
+        return 1
+    print(
+        f"miniature  {len(users)} avatar  p50 {percentile(render_latencies, 50):.0f}ms  "
+        f"p95 {percentile(render_latencies, 95):.0f}ms per avatar"
+    )
+
+    rows = UserListSerializer(users, many=True).data
+    base_url = base_url.rstrip('/')
+    originals = [base_url + row['avatar'] for row in rows if row['avatar']]
+    renditions = [
+        base_url + row['avatar_thumbnails'][str(size)]
+        for row in rows if str(size) in row['avatar_thumbnails']
+    ]
+
+    for label, urls in (('originali', originals), (f'{size}px', renditions)):
+        result = download(urls, concurrency)
+        print(
+            f"{label:<10} {len(urls)} immagini  {result['bytes'] / 1024:10.1f} KB  "
+            f"{result['seconds']:6.2f}s  p50 {result['p50']:.1f}ms  p95 {result['p95']:.1f}ms  "
+            f"errori {result['errors']}"
+        )
+    return 0
+
+
+def clean_avatars():
+    """Remove the benchmark photos and renditions"""
+    users = User.all_objects.filter(username__startswith=USER_PREFIX).exclude(avatar='')
+    for avatar, thumbnails in users.values_list('avatar', 'avatar_thumbnails'):
+        for name in [avatar, *(thumbnails or {}).values()]:
+            if name:
+                default_storage.delete(name)
@@ -0,0 +1,110 @@
+"""
+users/batch/ against one users/<id>/ request per id
+
+Fetches the same seeded users both ways, fails if the batch results differ
+from the detail responses (order, fields, missing and forbidden ids), then
+reports time and queries of the per-id loop, of the batch in GET and POST
+and of a revalidation with If-None-Match:
+
+    python -m benchmarks batch --ids 500
+"""
+
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.users.models import User
+from apps.users.views import scope_users
+from .seed import ADMIN_USERNAME, USER_PREFIX, sample_user_ids
+
+BATCH = '/api/auth/users/batch/'
+
+
+def timed_get(client, path, headers):
+    """Response, milliseconds and queries of one request"""
+    with CaptureQueriesContext(connection) as context:
+        started = time.perf_counter()
+        response = client.get(path, **headers)
+        elapsed = (time.perf_counter() - started) * 1000
+    return response, elapsed, len(context.captured_queries)
+
+
+def auth_headers(user):
+    return {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+
+def check_scope(client):
+    """An area admin gets the admins outside their areas as forbidden"""
+    admin = User.objects.filter(username__startswith=USER_PREFIX, role='admin').order_by('id').first()
+    if admin is None:
+        return []
+    ids = list(User.objects.filter(username__startswith=USER_PREFIX, role='admin').values_list('id', flat=True))
+    visible = set(scope_users(admin, User.objects.filter(pk__in=ids)).values_list('id', flat=True))
+
+    response = client.post(BATCH, {'ids': ids}, content_type='application/json', **auth_headers(admin))
+    data = response.json()
+    failures = []
+    if [item['id'] for item in data['results']] != [pk for pk in ids if pk in visible]:
+        failures.append("ambito: risultati diversi dagli utenti visibili")
+    if data['forbidden'] != [pk for pk in ids if pk not in visible]:
+        failures.append("ambito: id 'forbidden' errati")
+    return failures
+
+
+def run_batch_benchmark(count=500):
+    ids = sample_user_ids(count)
+    if not ids:
+        print("Nessun dataset di benchmark: eseguire prima 'python -m benchmarks seed'")
+        return 1
+
+    host = next((host for host in settings.ALLOWED_HOSTS if host and host != '*'), 'localhost')
+    client = Client(HTTP_HOST=host)
+    headers = auth_headers(User.objects.get(username=ADMIN_USERNAME))
+    unknown = (User.all_objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1000
+    requested = ids + [unknown]
+
+    loop_ms, loop_queries, details = 0, 0, []
+    for pk in ids:
+        response, elapsed, queries = timed_get(client, f'/api/auth/users/{pk}/', headers)
+        loop_ms += elapsed
+        loop_queries += queries
+        details.append(response.json())
+
+    path = f"{BATCH}?ids={','.join(str(pk) for pk in requested)}"
+    response, get_ms, get_queries = timed_get(client, path, headers)
+    data = response.json()
+    with CaptureQueriesContext(connection) as context:
+        started = time.perf_counter()
+        client.post(BATCH, {'ids': requested}, content_type='application/json', **headers)
+        post_ms = (time.perf_counter() - started) * 1000
+    post_queries = len(context.captured_queries)
+    revalidated, revalidate_ms, revalidate_queries = timed_get(
+        client, path, {**headers, 'HTTP_IF_NONE_MATCH': response['ETag']}
+    )
+
+    failures = check_scope(client)
+    expected = [{name: detail[name] for name in item} for item, detail in zip(data['results'], details)]
+    if [item['id'] for item in data['results']] != ids or data['results'] != expected:
+        failures.append("risultati diversi dalle risposte di users/<id>/")
+    if data['missing'] != [unknown] or data['forbidden']:
+        failures.append(f"missing {data['missing']}, forbidden {data['forbidden']}")
+    if revalidated.status_code != 304:
+        failures.append(f"rivalidazione: HTTP {revalidated.status_code} invece di 304")
+    for failure in failures:
+        print(f"ERRORE {failure}")
+    if failures:
+        return 1
+
+    print(f"{len(ids)} utenti ({len(response.content) / 1024:.0f} KB in batch)")
+    for name, elapsed, queries in [
+        ('users/<id>/ per ogni id', loop_ms, loop_queries),
+        ('users/batch/ GET', get_ms, get_queries),
+        ('users/batch/ POST', post_ms, post_queries),
+        ('users/batch/ GET con If-None-Match (304)', revalidate_ms, revalidate_queries),
+    ]:
+        print(f"  {name:<42} {elapsed:9.1f} ms  {queries:5d} query")
+    return 0
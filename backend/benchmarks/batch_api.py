@@ -0,0 +1,138 @@
+"""
+/api/batch/ against the same operations sent one request at a time
+
+Replays a queue of profile and user updates both ways, fails if the results
+differ or if the transaction modes misbehave (an atomic batch with a failing
+operation must leave no change, a per-operation batch keeps the others), then
+reports server time and queries, plus the total with a round trip of
+``--rtt`` milliseconds per request (mobile networks):
+
+    python -m benchmarks batch-api --operations 20 --rtt 300
+"""
+
+import json
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.users.models import User
+from .seed import ADMIN_USERNAME, sample_user_ids
+
+BATCH = '/api/batch/'
+
+
+def queue(ids, count, tag):
+    """Offline queue: profile edits and user updates, then a profile read"""
+    operations = []
+    for index in range(count - 1):
+        if index % 2:
+            operations.append({
+                'method': 'PATCH', 'path': f'/api/auth/users/{ids[index % len(ids)]}/',
+                'body': {'phone': f'3{tag}{index:06d}'},
+            })
+        else:
+            operations.append({'method': 'PATCH', 'path': '/api/auth/profile/', 'body': {'last_name': f'{tag}{index}'}})
+    operations.append({'method': 'GET', 'path': '/api/auth/profile/'})
+    return operations
+
+
+def comparable(body):
+    """Response body without the timestamps that differ between two runs"""
+    if isinstance(body, dict):
+        return {name: comparable(value) for name, value in body.items() if name not in ('updated_at', 'last_login')}
+    if isinstance(body, list):
+        return [comparable(value) for value in body]
+    return body
+
+
+class Api:
+    def __init__(self, token):
+        host = next((host for host in settings.ALLOWED_HOSTS if host and host != '*'), 'localhost')
+        self.client = Client(HTTP_HOST=host)
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def send(self, method, path, body=None):
+        data = json.dumps(body) if body is not None else ''
+        return self.client.generic(method, path, data, 'application/json', **self.headers)
+
+    def timed(self, function):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            result = function()
+            elapsed = (time.perf_counter() - started) * 1000
+        return result, elapsed, len(context.captured_queries)
+
+
+def check_transactions(api, ids):
+    """
+    Returns:
+        list: Descriptions of the failed checks
+    """
+    failures = []
+    target = User.objects.get(pk=ids[0])
+    operations = [
+        {'method': 'PATCH', 'path': f'/api/auth/users/{target.pk}/', 'body': {'phone': '3000000001'}},
+        {'method': 'PATCH', 'path': f'/api/auth/users/{ids[1]}/', 'body': {'email': 'non-valida'}},
+        {'method': 'GET', 'path': '/api/auth/profile/'},
+    ]
+
+    data = api.send('POST', BATCH, {'operations': operations, 'atomic': True}).json()
+    statuses = [result['status'] for result in data['results']]
+    if data['committed'] or statuses != [200, 400, 424]:
+        failures.append(f"batch atomico: committed={data['committed']}, stati {statuses}")
+    if User.objects.get(pk=target.pk).phone != target.phone:
+        failures.append("batch atomico: la prima operazione non è stata annullata")
+
+    data = api.send('POST', BATCH, {'operations': operations}).json()
+    statuses = [result['status'] for result in data['results']]
+    if data['committed'] or statuses != [200, 400, 200]:
+        failures.append(f"batch per operazione: committed={data['committed']}, stati {statuses}")
+    if User.objects.get(pk=target.pk).phone != '3000000001':
+        failures.append("batch per operazione: la prima operazione non è stata salvata")
+    User.objects.filter(pk=target.pk).update(phone=target.phone)
+    return failures
+
+
+def run_batch_api_benchmark(count=20, rtt=300):
+    ids = sample_user_ids(count)
+    if len(ids) < 2:
+        print("Nessun dataset di benchmark: eseguire prima 'python -m benchmarks seed'")
+        return 1
+
+    admin = User.objects.get(username=ADMIN_USERNAME)
+    original = {'last_name': admin.last_name}
+    phones = dict(User.objects.filter(pk__in=ids).values_list('pk', 'phone'))
+    api = Api(RefreshToken.for_user(admin).access_token)
+    try:
+        failures = check_transactions(api, ids)
+
+        operations = queue(ids, count, 'A')
+        sequential, sequential_ms, sequential_queries = api.timed(lambda: [
+            api.send(operation['method'], operation['path'], operation.get('body')) for operation in operations
+        ])
+        batch, batch_ms, batch_queries = api.timed(lambda: api.send('POST', BATCH, {'operations': operations}))
+    finally:
+        User.objects.filter(pk=admin.pk).update(**original)
+        for pk, phone in phones.items():
+            User.objects.filter(pk=pk).update(phone=phone)
+
+    results = batch.json()['results']
+    expected = [(response.status_code, comparable(response.json())) for response in sequential]
+    if [(result['status'], comparable(result['body'])) for result in results] != expected:
+        failures.append("risultati del batch diversi dalle richieste singole")
+    for failure in failures:
+        print(f"ERRORE {failure}")
+    if failures:
+        return 1
+
+    print(f"{len(operations)} operazioni, round trip di {rtt} ms per richiesta")
+    for name, elapsed, queries, requests in [
+        ('una richiesta per operazione', sequential_ms, sequential_queries, len(operations)),
+        ('/api/batch/', batch_ms, batch_queries, 1),
+    ]:
+        print(f"  {name:<30} server {elapsed:8.1f} ms  {queries:4d} query  totale {elapsed + requests * rtt:9.0f} ms")
+    return 0
@@ -0,0 +1,107 @@
+"""
+CPU cost against bytes saved of the response compression settings
+
+Payloads are produced in-process from the seeded dataset: a users list page,
+a large JSON list and the CSV export. Every coding/level pair is timed on
+each payload. The CSV export is also streamed line by line through
+CompressionMiddleware, as the export view sends it, to compare with the
+whole body:
+
+    python -m benchmarks compression --repeat 20
+"""
+
+import time
+
+from django.test import Client
+
+from apps.core import compression
+from apps.core.middleware import CompressionMiddleware
+from apps.users.models import User
+from apps.users.serializers import UserListSerializer
+from .seed import ADMIN_USERNAME
+
+GZIP_LEVELS = (1, 6, 9)
+BROTLI_QUALITIES = (1, 4, 6, 11)
+
+
+def payloads(token):
+    """
+    Returns:
+        dict: {name: (bytes, description)}
+    """
+    from rest_framework.renderers import JSONRenderer
+
+    client = Client(HTTP_AUTHORIZATION=f'Bearer {token}', HTTP_HOST='localhost')
+    page = client.get('/api/auth/users/', HTTP_ACCEPT_ENCODING='identity').content
+    export = client.get('/api/auth/export/?is_active_volunteer=true', HTTP_ACCEPT_ENCODING='identity')
+    export = b''.join(export.streaming_content) if export.streaming else export.content
+    users = User.objects.prefetch_related('work_areas')[:500]
+    big_list = JSONRenderer().render(UserListSerializer(users, many=True).data)
+    return {
+        'users-page': page,
+        'users-500': big_list,
+        'export-csv': export,
+    }
+
+
+def measure(data, coding, level, repeat):
+    """
+    Returns:
+        tuple: (compressed size, median milliseconds)
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        if coding == 'br':
+            compressed = compression.compress(data, 'br', brotli_quality=level)
+        else:
+            compressed = compression.compress(data, 'gzip', gzip_level=level)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return len(compressed), timings[len(timings) // 2]
+
+
+def encoder(coding, level):
+    if coding == 'br':
+        return compression.Encoder('br', brotli_quality=level)
+    return compression.Encoder('gzip', gzip_level=level)
+
+
+def measure_streamed(data, coding, level):
+    """
+    Returns:
+        int: Compressed size of ``data`` streamed one line per chunk
+    """
+    middleware = CompressionMiddleware(lambda request: None)
+    lines = data.splitlines(keepends=True)
+    return sum(len(chunk) for chunk in middleware._compress(encoder(coding, level), iter(lines)))
+
+
+def run_compression_benchmark(repeat=20):
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    admin = User.objects.filter(username=ADMIN_USERNAME).first()
+    if admin is None:
+        print("Nessun dataset di benchmark: eseguire prima 'python -m benchmarks seed'")
+        return 1
+    token = str(RefreshToken.for_user(admin).access_token)
+
+    combinations = [('gzip', level) for level in GZIP_LEVELS]
+    if 'br' in compression.available_encodings():
+        combinations += [('br', quality) for quality in BROTLI_QUALITIES]
+    else:
+        print("brotli non installato: solo gzip")
+
+    for name, data in payloads(token).items():
+        print(f"{name}: {len(data) / 1024:.1f} KB")
+        for coding, level in combinations:
+            size, milliseconds = measure(data, coding, level, repeat)
+            streamed = ''
+            if name == 'export-csv':
+                streamed = f"  in streaming {measure_streamed(data, coding, level) / 1024:9.1f} KB"
+            print(
+                f"  {coding:<4} {level:>2}  {size / 1024:9.1f} KB  "
+                f"risparmio {100 * (1 - size / len(data)):5.1f}%  {milliseconds:7.2f} ms  "
+                f"{len(data) / 1024 / 1024 / (milliseconds / 1000):7.1f} MB/s{streamed}"
+            )
+    return 0
@@ -0,0 +1,139 @@
+"""
+Optimistic concurrency control on user updates (apps/core/concurrency.py)
+
+Checks the If-Match protocol (ETag on read, 412 with the current data on a
+stale tag, only the changed columns in the UPDATE, 428 when required), then
+has ``--writers`` threads increment a counter kept in the same user's phone
+``--rounds`` times each with read-modify-write cycles: without If-Match the
+increments lost to concurrent writes are counted, with If-Match every
+increment must land (412s are retried):
+
+    python -m benchmarks concurrency --writers 8 --rounds 20
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.users.models import User
+from .seed import ADMIN_USERNAME, sample_user_ids
+
+
+class Api:
+    def __init__(self, token):
+        host = next((host for host in settings.ALLOWED_HOSTS if host and host != '*'), 'localhost')
+        self.client = Client(HTTP_HOST=host)
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def get(self, path):
+        return self.client.get(path, **self.headers)
+
+    def patch(self, path, data, etag=None):
+        headers = dict(self.headers)
+        if etag is not None:
+            headers['HTTP_IF_MATCH'] = etag
+        return self.client.patch(path, data, content_type='application/json', **headers)
+
+
+def check_protocol(api, path):
+    """
+    Returns:
+        list: Descriptions of the failed checks
+    """
+    failures = []
+    read = api.get(path)
+    etag = read.get('ETag')
+    if not etag:
+        return ["GET senza ETag"]
+
+    with CaptureQueriesContext(connection) as context:
+        updated = api.patch(path, {'phone': '3000000000'}, etag)
+    if updated.status_code != 200 or updated.get('ETag') in (None, etag):
+        failures.append(f"If-Match corrente: HTTP {updated.status_code}, ETag non aggiornato")
+    writes = [query['sql'] for query in context.captured_queries if query['sql'].startswith('UPDATE')]
+    if len(writes) != 1 or 'email' in writes[0] or 'updated_at' not in writes[0].split('WHERE')[1]:
+        failures.append(f"UPDATE non condizionale o con colonne invariate: {writes}")
+
+    stale = api.patch(path, {'phone': '3000000001'}, etag)
+    body = stale.json()
+    if stale.status_code != 412 or body.get('current', {}).get('phone') != '3000000000':
+        failures.append(f"If-Match scaduto: HTTP {stale.status_code} invece di 412 con i dati correnti")
+    elif stale.get('ETag') != updated.get('ETag'):
+        failures.append("412 senza l'ETag corrente")
+
+    if api.patch(path, {'phone': '3000000002'}, '*').status_code != 200:
+        failures.append("If-Match: * rifiutato")
+    with override_settings(OPTIMISTIC_LOCKING_REQUIRED=True):
+        required = api.patch(path, {'phone': '3000000003'})
+    if required.status_code != 428:
+        failures.append(f"If-Match obbligatorio: HTTP {required.status_code} invece di 428")
+    return failures
+
+
+def increment(api, path, rounds, conditional):
+    """
+    Returns:
+        tuple: Increments written and 412 responses retried
+    """
+    written, conflicts = 0, 0
+    try:
+        while written < rounds:
+            read = api.get(path)
+            value = int(read.json()['phone'] or 0)
+            response = api.patch(path, {'phone': str(value + 1)}, read['ETag'] if conditional else None)
+            if response.status_code == 412:
+                conflicts += 1
+                continue
+            written += 1
+        return written, conflicts
+    finally:
+        close_old_connections()
+
+
+def contend(api, pk, writers, rounds, conditional):
+    path = f'/api/auth/users/{pk}/'
+    User.objects.filter(pk=pk).update(phone='0')
+    started = time.perf_counter()
+    with ThreadPoolExecutor(writers) as executor:
+        results = list(executor.map(lambda _: increment(api, path, rounds, conditional), range(writers)))
+    elapsed = time.perf_counter() - started
+    written = sum(result[0] for result in results)
+    conflicts = sum(result[1] for result in results)
+    final = int(User.objects.get(pk=pk).phone)
+    return written, conflicts, written - final, elapsed
+
+
+def run_concurrency_benchmark(writers=8, rounds=20):
+    ids = sample_user_ids(1)
+    if not ids:
+        print("Nessun dataset di benchmark: eseguire prima 'python -m benchmarks seed'")
+        return 1
+
+    pk = ids[0]
+    phone = User.objects.get(pk=pk).phone
+    api = Api(RefreshToken.for_user(User.objects.get(username=ADMIN_USERNAME)).access_token)
+    try:
+        failures = check_protocol(api, f'/api/auth/users/{pk}/')
+        runs = [
+            ('senza If-Match', contend(api, pk, writers, rounds, conditional=False)),
+            ('con If-Match', contend(api, pk, writers, rounds, conditional=True)),
+        ]
+    finally:
+        User.objects.filter(pk=pk).update(phone=phone)
+
+    if runs[1][1][2]:
+        failures.append(f"con If-Match {runs[1][1][2]} incrementi persi")
+    for failure in failures:
+        print(f"ERRORE {failure}")
+    if failures:
+        return 1
+
+    print(f"{writers} client x {rounds} incrementi sullo stesso utente")
+    for name, (written, conflicts, lost, elapsed) in runs:
+        print(f"  {name:<16} {written:5d} scritture  {lost:5d} perse  {conflicts:5d} conflitti 412  {elapsed:6.2f} s")
+    return 0
@@ -0,0 +1,132 @@
+"""
+Payload size and queries of the sparse fieldsets (apps/core/fieldsets.py)
+
+Requests the user and work area endpoints with and without ``fields``,
+``omit`` and ``expand``, fails if a shaped response differs from the full
+response trimmed the same way (or a shape issues more queries than the full
+response), then reports bytes and queries per request:
+
+    python -m benchmarks fieldsets
+"""
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.core.fieldsets import parse_fieldset
+from apps.users.models import User
+from apps.users.serializers import UserDetailSerializer, UserListSerializer, WorkAreaSerializer
+from .seed import ADMIN_USERNAME, USER_PREFIX
+
+USERS = '/api/auth/users/'
+WORK_AREAS = '/api/auth/work-areas/'
+
+# (base path, serializer, query strings); the first query string is the full response
+CASES = [
+    (USERS + '?ordering=id', UserListSerializer, [
+        '',
+        'fields=id,full_name',
+        'omit=work_areas,avatar,avatar_thumbnails',
+        'fields=id,full_name,work_areas&expand=',
+        'fields=id,full_name,work_areas.id,work_areas.name',
+        'omit=work_areas.description,work_areas.created_at,work_areas.updated_at',
+    ]),
+    (USERS + 'sync/?limit=100', UserListSerializer, [
+        '',
+        'fields=id,full_name',
+        'expand=',
+    ]),
+    (USERS + '{id}/?', UserDetailSerializer, [
+        '',
+        'fields=id,full_name',
+        'omit=work_areas',
+        'expand=',
+    ]),
+    (WORK_AREAS + '?', WorkAreaSerializer, [
+        '',
+        'fields=id,name,color',
+    ]),
+]
+
+INVALID = [
+    USERS + '?fields=id,password',
+    USERS + '?fields=work_areas.nope',
+    USERS + '?expand=full_name',
+]
+
+
+def project(item, selection, collapsed):
+    """``item`` of a full response trimmed to a fieldset"""
+    shaped = {}
+    for name, value in item.items():
+        if selection is not None and name not in selection:
+            continue
+        if name in collapsed:
+            value = [related['id'] for related in value]
+        elif selection is not None and selection[name] is not None:
+            value = [project(related, selection[name], ()) for related in value]
+        shaped[name] = value
+    return shaped
+
+
+def items(data):
+    if isinstance(data, dict) and 'results' in data:
+        return data['results']
+    return data if isinstance(data, list) else [data]
+
+
+def fetch(client, path, headers):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(path, **headers)
+    return response, len(context.captured_queries)
+
+
+def run_fieldsets_benchmark():
+    if not User.objects.filter(username__startswith=USER_PREFIX).exists():
+        print("Nessun dataset di benchmark: eseguire prima 'python -m benchmarks seed'")
+        return 1
+
+    admin = User.objects.get(username=ADMIN_USERNAME)
+    headers = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(admin).access_token}'}
+    host = next((host for host in settings.ALLOWED_HOSTS if host and host != '*'), 'localhost')
+    client = Client(HTTP_HOST=host)
+    sample_id = User.objects.filter(username__startswith=USER_PREFIX, work_areas__isnull=False).values_list(
+        'id', flat=True
+    ).first()
+
+    failures = []
+    for base, serializer_class, shapes in CASES:
+        base = base.format(id=sample_id)
+        full, full_queries, full_size = None, None, None
+        for query in shapes:
+            path = f'{base}&{query}' if query and not base.endswith('?') else base + query
+            response, queries = fetch(client, path, headers)
+            if response.status_code != 200:
+                failures.append(f"{path}: HTTP {response.status_code}")
+                continue
+            size = len(response.content)
+            if full is None:
+                full, full_queries, full_size = response.json(), queries, size
+                print(f"{path}\n  completo{'':<64} {size / 1024:8.1f} KB  {queries} query")
+                continue
+
+            request = Request(RequestFactory().get(path))
+            selection, collapsed = parse_fieldset(request, serializer_class)
+            expected = [project(item, selection, collapsed) for item in items(full)]
+            if items(response.json()) != expected:
+                failures.append(f"{path}: diverso dalla risposta completa ridotta")
+            if queries > full_queries:
+                failures.append(f"{path}: {queries} query > {full_queries}")
+            print(f"  {query:<72} {size / 1024:8.1f} KB  {queries} query  ({size / full_size:.0%})")
+
+    for path in INVALID:
+        response, _ = fetch(client, path, headers)
+        if response.status_code != 400:
+            failures.append(f"{path}: HTTP {response.status_code} invece di 400")
+
+    for failure in failures:
+        print(f"ERRORE {failure}")
+    return 1 if failures else 0
@@ -0,0 +1,125 @@
+"""
+Idempotency-Key behaviour and overhead (apps/core/idempotency.py)
+
+Checks that a retried users/ POST returns the first response without
+creating the user again, that concurrent duplicates run once, and that a
+different body with the same key is refused; then reports the latency of
+bulk-actions/ without a key, with a new key and when replayed:
+
+    python -m benchmarks idempotency --concurrency 8 --repeat 50
+"""
+
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.test import Client
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.users.models import User
+from .seed import ADMIN_USERNAME, PASSWORD, USER_PREFIX, sample_user_ids
+
+USERS = '/api/auth/users/'
+BULK_ACTIONS = '/api/auth/bulk-actions/'
+
+
+def new_user(name):
+    return {
+        'username': f'{USER_PREFIX}idem_{name}',
+        'email': f'{USER_PREFIX}idem_{name}@bench.local',
+        'password': PASSWORD,
+        'password_confirm': PASSWORD,
+        'role': 'base',
+    }
+
+
+class Api:
+    def __init__(self, token):
+        host = next((host for host in settings.ALLOWED_HOSTS if host and host != '*'), 'localhost')
+        self.client = Client(HTTP_HOST=host)
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def post(self, path, data, key=None):
+        headers = dict(self.headers)
+        if key is not None:
+            headers['HTTP_IDEMPOTENCY_KEY'] = key
+        return self.client.post(path, data, content_type='application/json', **headers)
+
+
+def check_retries(api, concurrency):
+    """
+    Returns:
+        list: Descriptions of the failed checks
+    """
+    failures = []
+    key, data = str(uuid.uuid4()), new_user(uuid.uuid4().hex[:8])
+    first, retry = api.post(USERS, data, key), api.post(USERS, data, key)
+    if first.status_code != 201 or retry.content != first.content or retry.get('Idempotent-Replayed') != 'true':
+        failures.append(f"ripetizione: HTTP {first.status_code}/{retry.status_code}, risposta diversa o non marcata")
+    if User.objects.filter(username=data['username']).count() != 1:
+        failures.append("ripetizione: utente creato più volte")
+    reused = api.post(USERS, new_user('altro'), key)
+    if reused.status_code != 422:
+        failures.append(f"chiave riusata con un altro corpo: HTTP {reused.status_code} invece di 422")
+
+    # Concurrent duplicates: one runs, the others wait for its response
+    key, data = str(uuid.uuid4()), new_user(uuid.uuid4().hex[:8])
+
+    def duplicate(_):
+        try:
+            response = api.post(USERS, data, key)
+            return response.status_code, response.content
+        finally:
+            close_old_connections()
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        responses = list(executor.map(duplicate, range(concurrency)))
+    created = User.objects.filter(username=data['username']).count()
+    if created != 1 or len(set(responses)) != 1 or responses[0][0] != 201:
+        failures.append(
+            f"duplicati concorrenti: {created} utenti creati, "
+            f"risposte {sorted({status_code for status_code, _ in responses})}"
+        )
+    return failures
+
+
+def median_ms(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def run_idempotency_benchmark(concurrency=8, repeat=50):
+    ids = sample_user_ids(50)
+    if not ids:
+        print("Nessun dataset di benchmark: eseguire prima 'python -m benchmarks seed'")
+        return 1
+
+    api = Api(RefreshToken.for_user(User.objects.get(username=ADMIN_USERNAME)).access_token)
+    try:
+        failures = check_retries(api, concurrency)
+    finally:
+        User.all_objects.filter(username__startswith=f'{USER_PREFIX}idem_').delete()
+    for failure in failures:
+        print(f"ERRORE {failure}")
+    if failures:
+        return 1
+    print(f"Ripetizioni, chiave riusata e {concurrency} duplicati concorrenti: ok")
+
+    body = {'user_ids': ids, 'action': 'activate'}
+    replay_key = str(uuid.uuid4())
+    api.post(BULK_ACTIONS, body, replay_key)
+    print(f"bulk-actions/ activate su {len(ids)} utenti, mediana di {repeat} richieste")
+    for name, function in [
+        ('senza Idempotency-Key', lambda: api.post(BULK_ACTIONS, body)),
+        ('con una chiave nuova', lambda: api.post(BULK_ACTIONS, body, str(uuid.uuid4()))),
+        ('ripetizione (risposta salvata)', lambda: api.post(BULK_ACTIONS, body, replay_key)),
+    ]:
+        print(f"  {name:<32} {median_ms(function, repeat):8.2f} ms")
+    return 0
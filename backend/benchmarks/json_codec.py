@@ -0,0 +1,166 @@
+"""
+Compatibility and speed of the orjson renderer/parser (apps/core/renderers.py,
+apps/core/parsers.py) against DRF's JSONRenderer/JSONParser
+
+Every case must render to the same bytes and parse to the same data (or the
+same error) with both implementations; then both are timed on API sized
+payloads:
+
+    python -m benchmarks json --repeat 20
+"""
+
+import datetime
+import decimal
+import enum
+import time
+import uuid
+from collections import OrderedDict
+from io import BytesIO
+
+from django.utils.safestring import mark_safe
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from apps.core.parsers import ORJSONParser
+from apps.core.renderers import ORJSONRenderer, orjson
+from apps.users.models import User, WorkArea
+from apps.users.serializers import UserListSerializer
+
+
+class Level(enum.IntEnum):
+    LOW = 1
+
+
+def render_cases():
+    rome = datetime.timezone(datetime.timedelta(hours=2))
+    return {
+        'datetime UTC': datetime.datetime(2024, 5, 1, 10, 30, tzinfo=datetime.timezone.utc),
+        'datetime +02:00 con microsecondi': datetime.datetime(2024, 5, 1, 10, 30, 5, 123456, tzinfo=rome),
+        'datetime naive': datetime.datetime(2024, 5, 1, 10, 30),
+        'date': datetime.date(2024, 5, 1),
+        'time': datetime.time(8, 15, 0, 500),
+        'timedelta': datetime.timedelta(hours=1, seconds=3),
+        'Decimal': [decimal.Decimal('1.10'), decimal.Decimal('-3'), decimal.Decimal('12345.678')],
+        'UUID': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'stringa lazy': gettext_lazy('Utente'),
+        'SafeString': mark_safe('<b>ok</b>'),
+        'bytes': b'abc',
+        'set': {3},
+        'generatore': (n for n in range(3)),
+        'IntEnum': Level.LOW,
+        'unicode': 'àèìòù €  😀     \x00\x1f\x7f "\\/',
+        'chiavi non stringa': {1: 'a', None: 'b', False: 'c', 2.5: 'd'},
+        'interi grandi': [2 ** 63 - 1, -2 ** 63, 2 ** 70],
+        'float': [0.1, 1.5, -2.25, 123456.789, 0.0],
+        'contenitori vuoti': {'list': [], 'dict': {}, 'string': '', 'none': None},
+        'OrderedDict/ReturnDict': ReturnDict(OrderedDict([('b', 1), ('a', ReturnList([1, 2], serializer=None))]), serializer=None),
+        'queryset values_list': WorkArea.objects.order_by('id').values_list('id', 'name'),
+        'queryset values': WorkArea.objects.order_by('id').values('id', 'created_at'),
+    }
+
+
+def parse_cases():
+    return {
+        'oggetto': (b'{"user_ids": [1, 2, 3], "action": "activate"}', 'utf-8'),
+        'unicode': ('{"nome": "Niccolò 😀 \\u2028"}'.encode(), 'utf-8'),
+        'interi grandi': (b'{"n": 123456789012345678901234567890}', 'utf-8'),
+        'surrogato isolato': (b'{"s": "\\ud800"}', 'utf-8'),
+        'latin-1': ('{"nome": "Niccolò"}'.encode('latin-1'), 'latin-1'),
+        'NaN': (b'{"n": NaN}', 'utf-8'),
+        'Infinity': (b'[Infinity]', 'utf-8'),
+        'JSON non valido': (b'{"a": }', 'utf-8'),
+        'UTF-8 non valido': (b'{"a": "\xff"}', 'utf-8'),
+        'BOM': (b'\xef\xbb\xbf{}', 'utf-8'),
+        'vuoto': (b'', 'utf-8'),
+        'chiavi duplicate': (b'{"a": 1, "a": 2}', 'utf-8'),
+    }
+
+
+def api_payloads():
+    users = User.objects.prefetch_related('work_areas').order_by('id')[:500]
+    page = UserListSerializer(users, many=True).data
+    bulk_body = JSONRenderer().render({'user_ids': list(range(1, 10001)), 'action': 'activate'})
+    return page, bulk_body
+
+
+def parse_outcome(parser, body, encoding):
+    try:
+        return 'ok', parser.parse(BytesIO(body), 'application/json', {'encoding': encoding})
+    except ParseError as exc:
+        return 'ParseError', str(exc.detail)
+
+
+def check_compatibility():
+    """
+    Returns:
+        list: Descriptions of the cases that differ
+    """
+    failures = []
+    drf, fast = JSONRenderer(), ORJSONRenderer()
+    for name in render_cases():
+        outcomes = []
+        for renderer in (drf, fast):
+            # Generators are consumed by the first render
+            data = render_cases()[name]
+            try:
+                outcomes.append(('ok', renderer.render(data)))
+            except (TypeError, ValueError) as exc:
+                outcomes.append((type(exc).__name__, str(exc)))
+        if outcomes[0] != outcomes[1]:
+            failures.append(f"render {name}: {outcomes[0]!r} != {outcomes[1]!r}")
+
+    for media_type in ('application/json; indent=4', 'application/json; indent=0'):
+        data = {'a': [1, 2], 'b': None}
+        if drf.render(data, media_type) != fast.render(data, media_type):
+            failures.append(f"render {media_type}")
+
+    for name, (body, encoding) in parse_cases().items():
+        expected = parse_outcome(JSONParser(), body, encoding)
+        actual = parse_outcome(ORJSONParser(), body, encoding)
+        if expected != actual:
+            failures.append(f"parse {name}: {expected!r} != {actual!r}")
+    return failures
+
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def run_json_benchmark(repeat=20):
+    if orjson is None:
+        print("orjson non installato: renderer e parser usano json della libreria standard")
+        return 1
+
+    failures = check_compatibility()
+    for failure in failures:
+        print(f"DIVERSO {failure}")
+    if failures:
+        return 1
+    print(f"Compatibilità: {len(render_cases()) + 2} casi di render e {len(parse_cases())} di parse identici")
+
+    page, bulk_body = api_payloads()
+    rendered = JSONRenderer().render(page)
+    if ORJSONRenderer().render(page) != rendered:
+        print("DIVERSO render della pagina utenti")
+        return 1
+
+    measures = [
+        (f"render {len(page)} utenti ({len(rendered) / 1024:.0f} KB)", JSONRenderer(), ORJSONRenderer(),
+         lambda renderer: renderer.render(page)),
+        (f"parse bulk-actions 10000 id ({len(bulk_body) / 1024:.0f} KB)", JSONParser(), ORJSONParser(),
+         lambda parser: parser.parse(BytesIO(bulk_body), 'application/json', {})),
+    ]
+    for name, drf, fast, operation in measures:
+        drf_ms = timed(lambda: operation(drf), repeat)
+        fast_ms = timed(lambda: operation(fast), repeat)
+        print(f"{name}: DRF {drf_ms:.2f} ms, orjson {fast_ms:.2f} ms ({drf_ms / fast_ms:.1f}x)")
+    return 0
@@ -0,0 +1,178 @@
+"""
+Concurrent HTTP load test against a running backend
+
+Compares how many concurrent requests a deployment sustains, e.g. WSGI
+(gthread workers) against ASGI (uvicorn workers + async views):
+
+    python -m benchmarks.loadtest --url http://localhost:8000/api/auth/export/ \
+        --token <access token> --concurrency 50 --duration 30
+
+Only the standard library is used, so it runs from any checkout.
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+def encode_multipart(fields=None, files=None):
+    """
+    Encode form fields and files as multipart/form-data
+
+    Args:
+        fields (dict): {name: value}
+        files (dict): {name: (filename, bytes, content type)}
+
+    Returns:
+        tuple: (body bytes, content type header)
+    """
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in (fields or {}).items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, (filename, content, content_type) in (files or {}).items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode() + content + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def request_once(url, method='GET', token=None, body=None, headers=None, timeout=60):
+    """
+    Perform one request and read the whole response
+
+    Args:
+        body: JSON-serializable data, or a (bytes, content type) tuple as
+            returned by encode_multipart
+
+    Returns:
+        tuple: (status code, response headers, body size in bytes)
+    """
+    if isinstance(body, tuple):
+        data, content_type = body
+    elif body is not None:
+        data, content_type = json.dumps(body).encode(), 'application/json'
+    else:
+        data, content_type = None, None
+    request = urllib.request.Request(url, data=data, method=method)
+    if content_type:
+        request.add_header('Content-Type', content_type)
+    if token:
+        request.add_header('Authorization', f'Bearer {token}')
+    for name, value in (headers or {}).items():
+        request.add_header(name, value)
+
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, response.headers, len(response.read())
+    except urllib.error.HTTPError as exc:
+        return exc.code, exc.headers, len(exc.read())
+
+
+def run_load(url, concurrency=10, duration=10.0, method='GET', token=None, body=None,
+             headers=None, request_factory=None):
+    """
+    Hammer ``url`` with ``concurrency`` clients for ``duration`` seconds
+
+    Args:
+        request_factory (callable): Optional callable returning a
+            (url, method, body) tuple per request, to vary the requests
+
+    Returns:
+        dict: requests, errors, throughput (req/s), latencies in ms (p50/p95/p99/max)
+    """
+    latencies = []
+    statuses = {}
+    errors = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client():
+        while time.monotonic() < deadline:
+            target_url, target_method, target_body = (
+                request_factory() if request_factory else (url, method, body)
+            )
+            started = time.perf_counter()
+            try:
+                status, _, _ = request_once(
+                    target_url, target_method, token, target_body, headers
+                )
+            except Exception as exc:  # connection refused, timeouts, ...
+                with lock:
+                    errors.append(repr(exc))
+                continue
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'statuses': statuses,
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'max': latencies[-1] if latencies else 0.0,
+        'mean': statistics.fmean(latencies) if latencies else 0.0,
+    }
+
+
+def format_result(name, result):
+    return (
+        f"{name:<30} {result['requests']:>7} req  {result['throughput']:>8.1f} req/s  "
+        f"p50 {result['p50']:>7.1f}ms  p95 {result['p95']:>7.1f}ms  "
+        f"p99 {result['p99']:>7.1f}ms  errori {result['errors']}  {result['statuses']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test concorrente di un endpoint")
+    parser.add_argument('--url', required=True)
+    parser.add_argument('--method', default='GET')
+    parser.add_argument('--token', help="Access token JWT")
+    parser.add_argument('--body', help="Corpo JSON della richiesta")
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument(
+        '--concurrency', type=int, nargs='+', default=[1, 10, 50],
+        help="Uno o più livelli di concorrenza da provare in sequenza",
+    )
+    args = parser.parse_args()
+
+    body = json.loads(args.body) if args.body else None
+    for concurrency in args.concurrency:
+        result = run_load(
+            args.url, concurrency, args.duration, args.method, args.token, body
+        )
+        print(format_result(f"{args.method} x{concurrency}", result))
+
+
+if __name__ == '__main__':
+    main()
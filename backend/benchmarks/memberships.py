@@ -0,0 +1,129 @@
+"""
+Work area bulk actions against one work_areas.set() per user
+
+Applies the same add, remove and replace changes to the seeded users both
+ways, fails if the memberships, the audit entries or the ``updated_at``
+bumps differ, then reports time and queries of each:
+
+    python -m benchmarks memberships --users 1000
+"""
+
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.audit import recorder
+from apps.users.models import User, WorkArea
+from .seed import ADMIN_USERNAME, AREA_PREFIX, sample_user_ids
+
+BULK_ACTIONS = '/api/auth/bulk-actions/'
+
+
+class Rollback(Exception):
+    """Raised to undo a measured run"""
+
+
+def memberships(ids):
+    current = defaultdict(set)
+    for user_id, area_id in User.work_areas.through.objects.filter(user_id__in=ids).values_list('user_id', 'workarea_id'):
+        current[user_id].add(area_id)
+    return {pk: current[pk] for pk in ids}
+
+
+def loop(ids, area_ids, action):
+    """What EditUserDialog does today: one work_areas.set() per user"""
+    for user in User.objects.filter(pk__in=ids).prefetch_related('work_areas'):
+        current = {area.pk for area in user.work_areas.all()}
+        if action == 'add_work_areas':
+            target = current | area_ids
+        elif action == 'remove_work_areas':
+            target = current - area_ids
+        else:
+            target = area_ids
+        user.work_areas.set(target)
+
+
+def measure(function, ids):
+    """
+    Run ``function`` in a transaction rolled back afterwards
+
+    Returns:
+        tuple: milliseconds, queries, resulting memberships, audit entries
+        and users whose updated_at moved
+    """
+    before = dict(User.all_objects.filter(pk__in=ids).values_list('pk', 'updated_at'))
+    entries = []
+    original_add = recorder.buffer.add
+    recorder.buffer.add = entries.append
+    # The log keeps the last 9000 queries: the per-user loop alone can fill it
+    connection.queries_log.clear()
+    try:
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                function()
+                elapsed = (time.perf_counter() - started) * 1000
+            result = memberships(ids)
+            after = dict(User.all_objects.filter(pk__in=ids).values_list('pk', 'updated_at'))
+            # Audit entries are buffered on commit: run the callbacks by hand
+            for _, callback, _ in connection.run_on_commit:
+                callback()
+            connection.run_on_commit = []
+            raise Rollback()
+    except Rollback:
+        pass
+    finally:
+        recorder.buffer.add = original_add
+
+    touched = {pk for pk, updated_at in after.items() if updated_at != before[pk]}
+    audit = sorted(
+        (entry['object_id'], entry['action'], tuple(entry['changes']['work_areas'][1])) for entry in entries
+    )
+    return elapsed, len(context.captured_queries), result, audit, touched
+
+
+def run_memberships_benchmark(count=1000):
+    ids = sample_user_ids(count)
+    area_ids = set(WorkArea.objects.filter(code__startswith=AREA_PREFIX).values_list('pk', flat=True)[:2])
+    if not ids or not area_ids:
+        print("Nessun dataset di benchmark: eseguire prima 'python -m benchmarks seed'")
+        return 1
+
+    host = next((host for host in settings.ALLOWED_HOSTS if host and host != '*'), 'localhost')
+    client = Client(HTTP_HOST=host)
+    token = RefreshToken.for_user(User.objects.get(username=ADMIN_USERNAME)).access_token
+    headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def bulk(action):
+        response = client.post(BULK_ACTIONS, {
+            'user_ids': ids, 'action': action, 'work_area_ids': sorted(area_ids),
+        }, content_type='application/json', **headers)
+        if response.status_code != 200:
+            raise AssertionError(f"{action}: HTTP {response.status_code} {response.content[:200]}")
+
+    failures, rows = [], []
+    for action in ('add_work_areas', 'remove_work_areas', 'replace_work_areas'):
+        loop_ms, loop_queries, *expected = measure(lambda: loop(ids, area_ids, action), ids)
+        bulk_ms, bulk_queries, *actual = measure(lambda: bulk(action), ids)
+        for name, loop_value, bulk_value in zip(('appartenenze', 'voci di audit', 'updated_at'), expected, actual):
+            if loop_value != bulk_value:
+                failures.append(f"{action}: {name} diverse da work_areas.set()")
+        rows.append((action, loop_ms, loop_queries, bulk_ms, bulk_queries))
+
+    for failure in failures:
+        print(f"ERRORE {failure}")
+    if failures:
+        return 1
+
+    print(f"{len(ids)} utenti, {len(area_ids)} aree")
+    for action, loop_ms, loop_queries, bulk_ms, bulk_queries in rows:
+        print(
+            f"  {action:<20} set() per utente {loop_ms:9.1f} ms {loop_queries:6d} query"
+            f"   bulk-actions/ {bulk_ms:8.1f} ms {bulk_queries:4d} query"
+        )
+    return 0
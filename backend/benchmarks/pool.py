@@ -0,0 +1,90 @@
+"""
+Connection-acquisition latency under concurrency
+
+Every thread repeatedly opens a connection, runs ``SELECT 1`` and closes it,
+as a request does with CONN_MAX_AGE = 0, once with the stock PostgreSQL
+backend (a new connection each time) and once with the pooled backend:
+
+    python -m benchmarks pool --threads 20 --iterations 200 --pool-size 10
+"""
+
+import threading
+import time
+
+from django.db import connections
+from django.db.utils import load_backend
+
+from .loadtest import percentile
+
+STOCK_ENGINE = 'django.db.backends.postgresql'
+POOLED_ENGINE = 'apps.core.db.backends.postgresql_pool'
+
+
+def _settings(engine, pool_size):
+    settings_dict = {**connections['default'].settings_dict, 'ENGINE': engine, 'CONN_MAX_AGE': 0}
+    if engine == POOLED_ENGINE:
+        settings_dict['POOL'] = {
+            **settings_dict.get('POOL', {}),
+            'MIN_SIZE': pool_size, 'MAX_SIZE': pool_size, 'TIMEOUT': 60,
+        }
+    return settings_dict
+
+
+def measure(engine, threads=20, iterations=200, pool_size=10):
+    """
+    Returns:
+        dict: Acquisition latency percentiles (ms) and checkouts per second
+    """
+    backend = load_backend(engine)
+    settings_dict = _settings(engine, pool_size)
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        wrapper = backend.DatabaseWrapper(settings_dict, alias=f'bench-{engine}')
+        local = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            wrapper.ensure_connection()
+            local.append((time.perf_counter() - started) * 1000)
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            wrapper.close()
+        with lock:
+            latencies.extend(local)
+
+    # Warm-up, so that the pool is filled before measuring
+    worker()
+    latencies.clear()
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'checkouts': len(latencies),
+        'throughput': len(latencies) / elapsed,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'max': latencies[-1] if latencies else 0.0,
+    }
+
+
+def run_pool_benchmark(threads=20, iterations=200, pool_size=10):
+    if connections['default'].vendor != 'postgresql':
+        print("Il benchmark del pool richiede PostgreSQL")
+        return 1
+    for label, engine in (('diretta', STOCK_ENGINE), ('pool', POOLED_ENGINE)):
+        result = measure(engine, threads, iterations, pool_size)
+        print(
+            f"{label:<8} {result['throughput']:8.1f} conn/s  "
+            f"p50 {result['p50']:7.2f}ms  p95 {result['p95']:7.2f}ms  "
+            f"p99 {result['p99']:7.2f}ms  max {result['max']:7.2f}ms"
+        )
+    return 0
@@ -0,0 +1,148 @@
+"""
+Roster synchronisation of the seeded users (POST import/sync/)
+
+Exports the seeded users as a registry file, changes ``--changes`` of the
+rows and adds as many new ones, then checks that:
+
+- a dry run reports exactly those changes, plus the users left out of the
+  file as deactivated (``deactivate_missing``), and writes nothing
+- the sync writes only the changed and new rows
+- syncing the same file again changes nothing
+
+and reports time and queries of each step. The seeded users are restored
+and the new ones deleted at the end:
+
+    python -m benchmarks roster --changes 0.01
+"""
+
+import csv
+import io
+import time
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.users.models import User
+from .seed import ADMIN_USERNAME, USER_PREFIX
+
+SYNC = '/api/auth/import/sync/'
+COLUMNS = ['username', 'email', 'first_name', 'last_name', 'role', 'phone', 'work_area_codes']
+NEW_PREFIX = f'{USER_PREFIX}roster_'
+
+
+def export_rows():
+    """Registry rows of the seeded users but the benchmark admin (no names)"""
+    users = (
+        User.objects.filter(username__startswith=USER_PREFIX).exclude(username=ADMIN_USERNAME)
+        .prefetch_related('work_areas').order_by('id')
+    )
+    return [
+        {
+            'username': user.username, 'email': user.email, 'first_name': user.first_name,
+            'last_name': user.last_name, 'role': user.role, 'phone': user.phone,
+            'work_area_codes': ','.join(sorted(area.code for area in user.work_areas.all())),
+        }
+        for user in users
+    ]
+
+
+def to_csv(rows):
+    output = io.StringIO()
+    writer = csv.DictWriter(output, COLUMNS)
+    writer.writeheader()
+    writer.writerows(rows)
+    return output.getvalue().encode()
+
+
+def updated_at():
+    return dict(User.all_objects.filter(username__startswith=USER_PREFIX).values_list('pk', 'updated_at'))
+
+
+class Api:
+    def __init__(self, token):
+        host = next((host for host in settings.ALLOWED_HOSTS if host and host != '*'), 'localhost')
+        self.client = Client(HTTP_HOST=host)
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def sync(self, content, **options):
+        """Response data, milliseconds and queries of one sync"""
+        data = {'file': SimpleUploadedFile('roster.csv', content, 'text/csv'), **options}
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = self.client.post(SYNC, data, **self.headers)
+            elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            raise AssertionError(f"HTTP {response.status_code}: {response.content[:300]}")
+        return response.json(), elapsed, len(context.captured_queries)
+
+
+def run_roster_benchmark(changes=0.01):
+    rows = export_rows()
+    if len(rows) < 10:
+        print("Nessun dataset di benchmark: eseguire prima 'python -m benchmarks seed'")
+        return 1
+
+    api = Api(RefreshToken.for_user(User.objects.get(username=ADMIN_USERNAME)).access_token)
+    original = to_csv(rows)
+    count = max(1, int(len(rows) * changes))
+    step = max(1, len(rows) // count)
+    changed = [dict(row) for row in rows]
+    expected_updates = set()
+    for index in range(0, len(changed) - 1, step)[:count]:
+        changed[index]['phone'] = f'39{index:08d}'
+        expected_updates.add(changed[index]['username'])
+    new_rows = [
+        {'username': f'{NEW_PREFIX}{index}', 'email': f'{NEW_PREFIX}{index}@bench.local', 'first_name': 'Nuovo',
+         'last_name': 'Socio', 'role': 'base', 'phone': '', 'work_area_codes': rows[0]['work_area_codes']}
+        for index in range(count)
+    ]
+    left_out = changed.pop()['username']
+    content = to_csv(changed + new_rows)
+
+    failures, timings = [], []
+    try:
+        before = updated_at()
+        report, elapsed, queries = api.sync(content, dry_run=True, deactivate_missing=True)
+        timings.append(('dry run con deactivate_missing', elapsed, queries, report['summary']))
+        if {item['username'] for item in report['updated']} != expected_updates:
+            failures.append("dry run: utenti modificati diversi da quelli attesi")
+        if len(report['created']) != count or left_out not in {item['username'] for item in report['deactivated']}:
+            failures.append("dry run: nuovi utenti o utenti disattivati errati")
+        if updated_at() != before:
+            failures.append("dry run: il database è stato modificato")
+
+        report, elapsed, queries = api.sync(content)
+        timings.append(('sincronizzazione', elapsed, queries, report['summary']))
+        after = updated_at()
+        written = {pk for pk, value in after.items() if before.get(pk) != value}
+        expected = set(User.all_objects.filter(
+            username__in=expected_updates | {row['username'] for row in new_rows}
+        ).values_list('pk', flat=True))
+        if written != expected:
+            failures.append(f"sincronizzazione: {len(written)} righe scritte invece di {len(expected)}")
+
+        report, elapsed, queries = api.sync(content)
+        timings.append(('stesso file di nuovo', elapsed, queries, report['summary']))
+        if report['summary']['updated'] or report['summary']['created'] or updated_at() != after:
+            failures.append("seconda sincronizzazione: modifiche su un file già applicato")
+    finally:
+        api.sync(original)
+        User.all_objects.filter(username__startswith=NEW_PREFIX).delete()
+
+    for failure in failures:
+        print(f"ERRORE {failure}")
+    if failures:
+        return 1
+
+    print(f"{len(changed) + len(new_rows)} righe, {count} modificate e {count} nuove")
+    for name, elapsed, queries, summary in timings:
+        print(
+            f"  {name:<32} {elapsed:9.1f} ms {queries:5d} query  "
+            f"create {summary['created']:5d}  modificate {summary['updated']:5d}  "
+            f"invariate {summary['unchanged']:6d}  disattivate {summary['deactivated']:5d}"
+        )
+    return 0
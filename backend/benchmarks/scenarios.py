@@ -0,0 +1,65 @@
+"""
+Endpoints driven by the benchmark suite
+"""
+
+from .loadtest import encode_multipart
+from .seed import ADMIN_USERNAME, PASSWORD, sample_user_ids
+
+
+class Scenario:
+    """
+    One endpoint exercised by the benchmark
+
+    ``body`` is either a fixed payload or a callable returning one, so that a
+    scenario can be prepared once the dataset exists.
+    """
+
+    def __init__(self, name, path, method='GET', body=None, authenticated=True):
+        self.name = name
+        self.path = path
+        self.method = method
+        self._body = body
+        self.authenticated = authenticated
+
+    def prepare(self):
+        if callable(self._body):
+            self._body = self._body()
+
+    @property
+    def body(self):
+        return self._body
+
+
+def _import_csv(rows=200):
+    lines = ['username,email,first_name,last_name,role,phone,work_area_codes']
+    for index in range(rows):
+        lines.append(
+            f'bench_import_{index},bench_import_{index}@bench.local,Nome,Cognome,base,3331234567,bench-000'
+        )
+    content = ('\n'.join(lines) + '\n').encode()
+    return encode_multipart(files={'file': ('bench.csv', content, 'text/csv')})
+
+
+def default_scenarios():
+    return [
+        Scenario(
+            'login', '/api/auth/login/', 'POST',
+            {'username': ADMIN_USERNAME, 'password': PASSWORD},
+            authenticated=False,
+        ),
+        Scenario('profile', '/api/auth/profile/'),
+        Scenario('bootstrap', '/api/auth/bootstrap/'),
+        Scenario('users', '/api/auth/users/'),
+        Scenario('users-picker', '/api/auth/users/?fields=id,full_name'),
+        Scenario(
+            'users-batch', '/api/auth/users/batch/', 'POST',
+            lambda: {'ids': sample_user_ids(200)},
+        ),
+        Scenario('work-areas', '/api/auth/work-areas/'),
+        Scenario('export', '/api/auth/export/?is_active_volunteer=true'),
+        Scenario('import-preview', '/api/auth/import/preview/', 'POST', _import_csv),
+        Scenario(
+            'bulk-actions', '/api/auth/bulk-actions/', 'POST',
+            lambda: {'user_ids': sample_user_ids(50), 'action': 'activate'},
+        ),
+    ]
@@ -0,0 +1,96 @@
+"""
+Synthetic dataset for the benchmark suite
+
+Every seeded row is recognisable (usernames start with ``bench_``, work area
+codes with ``bench-``) so the dataset can be removed without touching real data.
+"""
+
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from apps.users.models import User, WorkArea
+
+USER_PREFIX = 'bench_'
+AREA_PREFIX = 'bench-'
+ADMIN_USERNAME = 'bench_admin'
+PASSWORD = 'Bench-Password-2024!'
+
+FIRST_NAMES = ['Mario', 'Giulia', 'Luca', 'Francesca', 'Marco', 'Sara', 'Andrea', 'Chiara', 'Paolo', 'Elena']
+LAST_NAMES = ['Rossi', 'Bianchi', 'Romano', 'Colombo', 'Ricci', 'Marino', 'Greco', 'Bruno', 'Gallo', 'Conti']
+
+
+def seed(users=1000, areas=10, memberships=2, admins=10, batch_size=1000, random_seed=42):
+    """
+    Create the benchmark dataset
+
+    Args:
+        users (int): Number of base volunteers
+        areas (int): Number of work areas
+        memberships (int): Work areas per user
+        admins (int): Number of area admins (plus one superadmin, ``bench_admin``)
+        batch_size (int): Rows per bulk INSERT
+
+    Returns:
+        dict: Number of rows created per kind
+    """
+    rng = random.Random(random_seed)
+    # Hashing is deliberately slow: hash once and share it
+    password = make_password(PASSWORD)
+
+    with transaction.atomic():
+        work_areas = WorkArea.objects.bulk_create([
+            WorkArea(
+                name=f'Bench Area {index:03d}',
+                code=f'{AREA_PREFIX}{index:03d}',
+                description='Area generata per i benchmark',
+            )
+            for index in range(areas)
+        ])
+
+        rows = [User(
+            username=ADMIN_USERNAME,
+            email=f'{ADMIN_USERNAME}@bench.local',
+            role='superadmin',
+            is_staff=True,
+            is_superuser=True,
+            password=password,
+        )]
+        for index in range(admins + users):
+            rows.append(User(
+                username=f'{USER_PREFIX}{index:07d}',
+                email=f'{USER_PREFIX}{index:07d}@bench.local',
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                role='admin' if index < admins else 'base',
+                phone=f'3{rng.randrange(10 ** 8, 10 ** 9)}',
+                password=password,
+            ))
+        created_users = User.objects.bulk_create(rows, batch_size=batch_size)
+
+        Membership = User.work_areas.through
+        links = []
+        for user in created_users[1:]:
+            for area in rng.sample(work_areas, min(memberships, len(work_areas))):
+                links.append(Membership(user_id=user.id, workarea_id=area.id))
+        Membership.objects.bulk_create(links, batch_size=batch_size)
+
+    return {'users': len(created_users), 'work_areas': len(work_areas), 'memberships': len(links)}
+
+
+def clean():
+    """Hard-delete the benchmark dataset"""
+    with transaction.atomic():
+        users, _ = User.all_objects.filter(username__startswith=USER_PREFIX).delete()
+        areas, _ = WorkArea.objects.filter(code__startswith=AREA_PREFIX).delete()
+    return {'users': users, 'work_areas': areas}
+
+
+def sample_user_ids(count, random_seed=42):
+    """Ids of ``count`` seeded base volunteers"""
+    ids = list(
+        User.objects.filter(username__startswith=USER_PREFIX, role='base')
+        .values_list('id', flat=True)[:max(count * 10, count)]
+    )
+    return random.Random(random_seed).sample(ids, min(count, len(ids)))
@@ -0,0 +1,94 @@
+"""
+Parity and throughput of the compiled serializers (apps/users/fast_serializers.py)
+
+Renders the seeded users with UserListSerializer and with the compiled path,
+fails if the JSON bytes differ, then reports rows per second of both, with
+and without the main query (the compiled path always fetches the work areas):
+
+    python -m benchmarks serializers --rows 10000
+"""
+
+import time
+
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from apps.users.fast_serializers import user_list_serializer, work_area_serializer
+from apps.users.models import User, WorkArea
+from apps.users.serializers import UserListSerializer, WorkAreaSerializer
+from .seed import USER_PREFIX
+
+
+def first_difference(expected, actual):
+    """Offset and surroundings of the first differing byte"""
+    for offset, (left, right) in enumerate(zip(expected, actual)):
+        if left != right:
+            break
+    else:
+        offset = min(len(expected), len(actual))
+    return offset, expected[offset - 40:offset + 40], actual[offset - 40:offset + 40]
+
+
+def check_parity(name, expected, actual):
+    if expected == actual:
+        print(f"{name}: output identico ({len(expected) / 1024:.1f} KB)")
+        return True
+    offset, left, right = first_difference(expected, actual)
+    print(f"{name}: output DIVERSO al byte {offset}\n  atteso  {left!r}\n  ottenuto {right!r}")
+    return False
+
+
+def timed(function, repeat):
+    """Best of ``repeat`` runs, in seconds"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_serializers_benchmark(rows=10000, repeat=3):
+    users = User.objects.filter(username__startswith=USER_PREFIX).order_by('id')[:rows]
+    count = users.count()
+    if not count:
+        print("Nessun dataset di benchmark: eseguire prima 'python -m benchmarks seed'")
+        return 1
+
+    request = RequestFactory().get('/api/auth/users/', HTTP_HOST='localhost')
+    context = {'request': request}
+    renderer = JSONRenderer()
+
+    ok = check_parity(
+        'users',
+        renderer.render(UserListSerializer(users.prefetch_related('work_areas'), many=True, context=context).data),
+        renderer.render(user_list_serializer.serialize(user_list_serializer.rows(users), context)),
+    )
+    areas = WorkArea.objects.all()
+    ok = check_parity(
+        'work-areas',
+        renderer.render(WorkAreaSerializer(areas, many=True, context=context).data),
+        renderer.render(work_area_serializer.serialize(work_area_serializer.rows(areas), context)),
+    ) and ok
+    if not ok:
+        return 1
+
+    instances = list(users.prefetch_related('work_areas'))
+    values = list(user_list_serializer.rows(users))
+    measures = {
+        'DRF (query + serializzazione)': lambda: UserListSerializer(
+            users.prefetch_related('work_areas'), many=True, context=context
+        ).data,
+        'compilato (query + serializzazione)': lambda: user_list_serializer.serialize(
+            user_list_serializer.rows(users), context
+        ),
+        'DRF (istanze già lette)': lambda: UserListSerializer(instances, many=True, context=context).data,
+        'compilato (righe già lette)': lambda: user_list_serializer.serialize(values, context),
+    }
+
+    print(f"{count} utenti, migliore di {repeat} esecuzioni")
+    for name, function in measures.items():
+        seconds = timed(function, repeat)
+        print(f"  {name:<38} {seconds * 1000:9.1f} ms  {count / seconds:10.0f} righe/s")
+    return 0
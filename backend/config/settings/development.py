@@ -14,6 +14,31 @@ INSTALLED_APPS += ['debug_toolbar']
 MIDDLEWARE += ['debug_toolbar.middleware.DebugToolbarMiddleware']
 INTERNAL_IPS = ['127.0.0.1', 'localhost']
 
+# N+1 and slow query detection (apps/core/querywatch.py)
+MIDDLEWARE += ['apps.core.middleware.QueryInspectorMiddleware']
+QUERY_INSPECTOR = {
+    'N_PLUS_ONE_THRESHOLD': 5,  # Same-shape queries in one request before warning
+    'SLOW_QUERY_MS': 100,
+    # Strict mode (e.g. QUERY_INSPECTOR_STRICT=True pytest): requests over
+    # their endpoint budget raise QueryBudgetExceeded and fail the test
+    'STRICT': os.environ.get('QUERY_INSPECTOR_STRICT', 'False') == 'True',
+    'BUDGETS': {
+        'login': 5,
+        'profile': 5,
+        'bootstrap': 3,
+        'user-list': 6,
+        'user-detail': 6,
+        'user-batch': 6,
+        'workarea-list': 4,
+        'bulk_actions': 10,
+        'import_preview': 10,
+        'export_users': 10,
+        'import_sync': None,  # Grows with the rows written
+        'api_batch': None,  # Sum of its operations
+    },
+    'DEFAULT_BUDGET': 20,
+}
+
 # Email Backend - Console for development
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
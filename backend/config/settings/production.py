@@ -19,8 +19,25 @@ SECURE_HSTS_SECONDS = 31536000
 SECURE_HSTS_INCLUDE_SUBDOMAINS = True
 SECURE_HSTS_PRELOAD = True
 
-# Static files - WhiteNoise
-MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
+# Database - pooled, health-checked connections (apps/core/db/pool.py)
+if os.environ.get('DB_POOL', 'True') == 'True':
+    for alias in ['default', *REPLICA_DATABASES]:
+        if DATABASES[alias]['ENGINE'] != 'django.db.backends.postgresql':
+            continue
+        DATABASES[alias].update({
+            'ENGINE': 'apps.core.db.backends.postgresql_pool',
+            'CONN_MAX_AGE': 0,  # Connections go back to the pool at the end of each request
+            'POOL': {
+                'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+                'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+                'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+                'MAX_LIFETIME': float(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+                'CHECK_IDLE_AFTER': float(os.environ.get('DB_POOL_CHECK_IDLE_AFTER', 5)),
+            },
+        })
+
+# Static files - WhiteNoise (async-capable subclass: keeps ASGI requests off threads)
+MIDDLEWARE.insert(1, 'apps.core.staticfiles.StaticFilesMiddleware')
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 # Email Backend - SMTP for production
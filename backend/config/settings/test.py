@@ -0,0 +1,23 @@
+"""
+Test settings (pytest, see pytest.ini)
+
+Same as base, with in-memory caches and email, a fast password hasher and
+the background workers (audit writer, avatar renditions) run inline. The
+database comes from DATABASE_URL as usual; uploads go to a temporary
+MEDIA_ROOT (conftest.py).
+"""
+
+from .base import *
+
+CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+    for alias in CACHES
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+AUDIT_ASYNC = False
+AVATAR_ASYNC = False
+SYNC_SETTLE_SECONDS = 0
@@ -3,10 +3,11 @@ URL configuration for PWA Volontari project
 """
 
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from drf_spectacular.views import SpectacularSwaggerView
+from apps.core.views import metrics, media, BatchView, CachedSpectacularAPIView
 from .views import home
 
 urlpatterns = [
@@ -15,13 +16,20 @@ urlpatterns = [
 
     # Admin
     path('admin/', admin.site.urls),
+    
+    # Monitoring (Prometheus)
+    path('metrics', metrics, name='metrics'),
+    
+    # Uploaded files (permission check here, transfer by the proxy when configured)
+    re_path(rf'^{settings.MEDIA_URL.strip("/")}/(?P<path>.+)$', media, name='media'),
   
     
     # API Documentation
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
+    path('api/schema/', CachedSpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     
     # API endpoints
+    path('api/batch/', BatchView.as_view(), name='api_batch'),
     path('api/auth/', include('apps.users.urls')),
     #path('api/segreteria/', include('apps.segreteria.urls')),
     #path('api/activities/', include('apps.activities.urls')),
@@ -33,9 +41,8 @@ urlpatterns = [
     #path('api/vestiario/', include('apps.vestiario.urls')),
 ]
 
-# Serve media files in development
+# Serve static files in development
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
     
     # Debug Toolbar
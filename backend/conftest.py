@@ -0,0 +1,36 @@
+"""
+Shared pytest fixtures
+"""
+
+import pytest
+from rest_framework.test import APIClient
+
+from apps.users.models import User, WorkArea
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path / 'media'
+
+
+@pytest.fixture
+def superadmin(db):
+    return User.objects.create_user(
+        username='superadmin', email='superadmin@example.com', password='password', role='superadmin',
+    )
+
+
+@pytest.fixture
+def api_client(superadmin):
+    client = APIClient()
+    client.force_authenticate(superadmin)
+    return client
+
+
+@pytest.fixture
+def work_areas(db):
+    """Three active areas, created out of alphabetical order"""
+    return [
+        WorkArea.objects.create(name=name, code=name.lower(), color=color)
+        for name, color in [('Sanità', '#d32f2f'), ('Logistica', '#1976d2'), ('Protezione Civile', '#388e3c')]
+    ]
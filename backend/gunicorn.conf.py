@@ -0,0 +1,54 @@
+"""
+Gunicorn configuration for production serving
+
+ASGI (default):
+    gunicorn config.asgi:application -c gunicorn.conf.py
+
+WSGI (previous setup, for comparison):
+    GUNICORN_WORKER_CLASS=gthread gunicorn config.wsgi:application -c gunicorn.conf.py
+
+Every setting can be overridden through the environment variables below.
+"""
+
+import multiprocessing
+import os
+import shutil
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Uvicorn workers run the Django ASGI application with one event loop each:
+# async views share it, sync (DRF) views run in per-request threads.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'uvicorn.workers.UvicornWorker')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+
+# Only used by the gthread worker class (WSGI)
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Exports of large user sets can stream for a while
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers periodically to contain memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    # Prometheus multiprocess mode needs an empty directory shared by the workers
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Prometheus multiprocess mode (PROMETHEUS_MULTIPROC_DIR set): drop the
+    # gauges of workers that exited
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,3 +1,4 @@
+import { useEffect } from 'react';
 import { Routes, Route, Navigate } from 'react-router-dom';
 import { Box, CircularProgress } from '@mui/material';
 import { useAuthStore } from './stores/authStore';
@@ -13,7 +14,13 @@ import ProfilePage from './pages/ProfilePage';
 import UserManagementPage from './pages/UserManagementPage';
 
 function App() {
-  const { isAuthenticated, isLoading } = useAuthStore();
+  const { isAuthenticated, isLoading, bootstrap } = useAuthStore();
+
+  useEffect(() => {
+    if (isAuthenticated) {
+      bootstrap();
+    }
+  }, [isAuthenticated, bootstrap]);
 
   if (isLoading) {
     return (
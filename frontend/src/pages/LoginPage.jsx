@@ -40,7 +40,7 @@ export default function LoginPage() {
 
     // Validazione base
     if (!username || !password) {
-      setLocalError('Username e password sono obbligatori');
+      setLocalError('Username (o email) e password sono obbligatori');
       return;
     }
 
@@ -97,9 +97,9 @@ export default function LoginPage() {
               </Alert>
             )}
 
-            {/* Username */}
+            {/* Username or email */}
             <TextField
-              label="Username"
+              label="Username o email"
               variant="outlined"
               fullWidth
               value={username}
@@ -0,0 +1,25 @@
+import api from './api';
+
+/**
+ * Batch Service
+ * Sends several API operations in one request (e.g. the offline queue)
+ */
+
+/**
+ * @param {Array<{method: string, path: string, body?: object, headers?: object}>} operations
+ *   Paths include the /api prefix, e.g. { method: 'PATCH', path: '/api/auth/profile/', body: {...} }
+ * @param {object} options
+ * @param {boolean} options.atomic All or nothing: the first failure rolls back every change
+ * @param {string} options.idempotencyKey Reuse it when retrying the same batch
+ * @returns {Promise<{committed: boolean, results: Array<{status: number, body: any, headers?: object}>}>}
+ */
+export const runBatch = async (operations, { atomic = false, idempotencyKey = crypto.randomUUID() } = {}) => {
+  const response = await api.post('/batch/', { operations, atomic }, {
+    headers: { 'Idempotency-Key': idempotencyKey },
+  });
+  return response.data;
+};
+
+export default {
+  runBatch,
+};
@@ -16,13 +16,25 @@ export const getUser = async (id) => {
   return response.data;
 };
 
-export const createUser = async (userData) => {
-  const response = await api.post('/auth/users/', userData);
+// Writes that must not run twice take an Idempotency-Key: reuse the same key
+// when retrying the same operation and the server replays its first response
+const idempotent = (key) => ({ headers: { 'Idempotency-Key': key } });
+
+export const createUser = async (userData, idempotencyKey = crypto.randomUUID()) => {
+  const response = await api.post('/auth/users/', userData, idempotent(idempotencyKey));
   return response.data;
 };
 
-export const updateUser = async (id, userData) => {
-  const response = await api.patch(`/auth/users/${id}/`, userData);
+// Optimistic locking: send back the etag of getUserForEdit and the update is
+// refused with 412 ({ detail, current }) if someone changed the user meanwhile
+export const getUserForEdit = async (id) => {
+  const response = await api.get(`/auth/users/${id}/`);
+  return { user: response.data, etag: response.headers.etag };
+};
+
+export const updateUser = async (id, userData, etag) => {
+  const config = etag ? { headers: { 'If-Match': etag } } : {};
+  const response = await api.patch(`/auth/users/${id}/`, userData, config);
   return response.data;
 };
 
@@ -32,12 +44,12 @@ export const deleteUser = async (id) => {
 };
 
 // Bulk operations
-export const bulkActions = async (action, userIds, extraData = {}) => {
+export const bulkActions = async (action, userIds, extraData = {}, idempotencyKey = crypto.randomUUID()) => {
   const response = await api.post('/auth/bulk-actions/', {
     user_ids: userIds,
     action,
     ...extraData,
-  });
+  }, idempotent(idempotencyKey));
   return response.data;
 };
 
@@ -65,7 +77,7 @@ export const previewCSVImport = async (file, sendCredentials = false) => {
 };
 
 // CSV Import - Confirm
-export const confirmCSVImport = async (file, sendCredentials = false) => {
+export const confirmCSVImport = async (file, sendCredentials = false, idempotencyKey = crypto.randomUUID()) => {
   const formData = new FormData();
   formData.append('file', file);
   formData.append('send_credentials', sendCredentials);
@@ -73,6 +85,29 @@ export const confirmCSVImport = async (file, sendCredentials = false) => {
   const response = await api.post('/auth/import/confirm/', formData, {
     headers: {
       'Content-Type': 'multipart/form-data',
+      'Idempotency-Key': idempotencyKey,
+    },
+  });
+  return response.data;
+};
+
+// Roster sync: creates, updates (only the columns in the file) and optionally
+// deactivates the users missing from it; dryRun returns the report only
+export const syncRoster = async (
+  file,
+  { deactivateMissing = false, dryRun = false, sendCredentials = false } = {},
+  idempotencyKey = crypto.randomUUID(),
+) => {
+  const formData = new FormData();
+  formData.append('file', file);
+  formData.append('deactivate_missing', deactivateMissing);
+  formData.append('dry_run', dryRun);
+  formData.append('send_credentials', sendCredentials);
+
+  const response = await api.post('/auth/import/sync/', formData, {
+    headers: {
+      'Content-Type': 'multipart/form-data',
+      'Idempotency-Key': idempotencyKey,
     },
   });
   return response.data;
@@ -84,9 +119,29 @@ export const getWorkAreas = async () => {
   return response.data;
 };
 
+// Delta sync: pass the cursor of the previous response; when `reset` is true
+// drop the local copy first, repeat while `has_more` is true
+export const syncUsers = async (since) => {
+  const response = await api.get('/auth/users/sync/', { params: since ? { since } : {} });
+  return response.data;
+};
+
+export const syncWorkAreas = async (since) => {
+  const response = await api.get('/auth/work-areas/sync/', { params: since ? { since } : {} });
+  return response.data;
+};
+
+// Many users by id in one request: { results (in request order), missing, forbidden }.
+// params may shape the results, e.g. { fields: 'id,full_name' }
+export const getUsersBatch = async (ids, params = {}) => {
+  const response = await api.post('/auth/users/batch/', { ids }, { params });
+  return response.data;
+};
+
 export default {
   getUsers,
   getUser,
+  getUserForEdit,
   createUser,
   updateUser,
   deleteUser,
@@ -94,5 +149,9 @@ export default {
   exportUsers,
   previewCSVImport,
   confirmCSVImport,
+  syncRoster,
   getWorkAreas,
+  syncUsers,
+  syncWorkAreas,
+  getUsersBatch,
 };
\ No newline at end of file
@@ -16,6 +16,9 @@ export const useAuthStore = create(
       isAuthenticated: false,
       isLoading: false,
       error: null,
+      workAreas: [],
+      capabilities: null,
+      serverConfig: null,
 
       // Actions
       setUser: (user) => set({ user, isAuthenticated: !!user }),
@@ -76,10 +79,32 @@ export const useAuthStore = create(
             refreshToken: null,
             isAuthenticated: false,
             error: null,
+            workAreas: [],
+            capabilities: null,
+            serverConfig: null,
           });
         }
       },
 
+      // Start-up data in one request; the browser revalidates it with the
+      // ETag, so warm starts are answered with a 304
+      bootstrap: async () => {
+        try {
+          const response = await api.get('/auth/bootstrap/');
+          const { user, work_areas, capabilities, config } = response.data;
+          set({
+            user,
+            workAreas: work_areas,
+            capabilities,
+            serverConfig: config,
+            isAuthenticated: true,
+          });
+          return { success: true, data: response.data };
+        } catch (error) {
+          return { success: false, error: error.message };
+        }
+      },
+
       fetchProfile: async () => {
         set({ isLoading: true });
         try {